@@ -0,0 +1,86 @@
+# app_factory.py
+import logging
+
+from flask import Flask, request, redirect
+from werkzeug.middleware.proxy_fix import ProxyFix
+from flask_migrate import Migrate
+
+from config import Config
+from routes import main_bp
+from db.models import db
+from db.view_buffer import view_buffer
+from db.likes import liked_ids_cache
+from db.catalog import item_catalog
+from db.commands import register_commands
+from fck_app.avatars import avatar_cache
+from fck_app.telegram_api import telegram_api
+from fck_app.static_assets import asset_manifest
+from fck_app.model_variants import model_variants
+from fck_app.item_previews import item_previews
+from fck_app.spa_bundle import spa_bundle
+from fck_app.auth import telegram_auth
+
+
+def configure_logging():
+    logging.basicConfig(
+        level=logging.DEBUG,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        handlers=[
+            logging.StreamHandler(),
+            logging.FileHandler("app.log")
+        ]
+    )
+    print("[LOGGING] Расширенное логирование настроено")
+
+def create_app(config_class=Config):
+    app = Flask(__name__, static_folder="static", template_folder="templates")
+    app.config.from_object(config_class)
+    app.config["SQLALCHEMY_DATABASE_URI"] = config_class.DATABASE_URI
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+    db.init_app(app)
+    migrate = Migrate(app, db)
+    view_buffer.init_app(app)
+    liked_ids_cache.init_app(app)
+    item_catalog.init_app(app)
+    telegram_api.init_app(app)
+    telegram_auth.init_app(app)
+    avatar_cache.init_app(app)
+    asset_manifest.init_app(app)
+    model_variants.init_app(app)
+    item_previews.init_app(app)
+    spa_bundle.init_app(app, rewrite=asset_manifest.rewrite_html)
+    register_commands(app)
+    
+    # Настройка ProxyFix для работы с Cloudflare
+    app.wsgi_app = ProxyFix(
+        app.wsgi_app,
+        x_for=2,
+        x_proto=2,
+        x_host=1,
+        x_prefix=1,
+        x_port=1
+    )
+
+    app.register_blueprint(main_bp)
+
+    with app.app_context():
+        db.create_all()
+        print("\nЗарегистрированные маршруты:")
+        for rule in app.url_map.iter_rules():
+            print(f"{rule.endpoint}: {rule.methods} {rule}")
+        print("\n")
+
+    @app.before_request
+    def before_request():
+        if Config.CLOUDFLARE_ENABLED:
+            if not request.is_secure and request.headers.get("X-Forwarded-Proto", "http") != "https":
+                if not request.host.startswith(("127.0.0.1", "localhost")):
+                    url = request.url.replace("http://", "https://", 1)
+                    return redirect(url, code=301)
+
+    @app.route("/health")
+    def health_check():
+        return {"status": "healthy"}, 200
+
+    return app
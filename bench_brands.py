@@ -0,0 +1,80 @@
+"""
+Проверка количества SQL-запросов для брендов (регрессия N+1).
+
+Для брендов с разным числом участников и пользователей с разным числом брендов
+убеждается, что get_brand_details / get_user_brands_data делают фиксированное
+число запросов, и печатает время ответа. Завершается с ошибкой, если число
+запросов начинает зависеть от размера данных.
+
+Запуск:
+    python bench_brands.py
+    python bench_brands.py --sizes 10 100 1000
+"""
+import argparse
+import sys
+import time
+
+from sqlalchemy import event
+
+from bench_feed import create_bench_app
+from db.models import db, User, Brand, BrandMember
+from db.brands import get_brand_details, get_user_brands_data
+
+BRAND_DETAILS_QUERIES = 3  # бренд + страница участников с пользователями + COUNT
+USER_BRANDS_QUERIES = 1  # участия с брендами одним JOIN
+
+
+def seed(size):
+    """Бренд 1 с size участниками и пользователь 1, состоящий в size брендах"""
+    db.drop_all()
+    db.create_all()
+    db.session.add_all([User(id=uid, username=f"user_{uid}") for uid in range(1, size + 2)])
+    db.session.add_all([Brand(id=bid, name=f"brand_{bid}", creator_id=1) for bid in range(1, size + 1)])
+    db.session.flush()
+    db.session.add_all([BrandMember(brand_id=1, user_id=uid, role="member") for uid in range(2, size + 2)])
+    db.session.add_all([BrandMember(brand_id=bid, user_id=1, role="owner") for bid in range(1, size + 1)])
+    db.session.commit()
+
+
+def count_queries(func, *args):
+    queries = []
+
+    def on_execute(*_args, **_kwargs):
+        queries.append(1)
+
+    db.session.expire_all()
+    event.listen(db.engine, "before_cursor_execute", on_execute)
+    try:
+        started = time.perf_counter()
+        func(*args)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+    finally:
+        event.remove(db.engine, "before_cursor_execute", on_execute)
+    return len(queries), elapsed_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка N+1 для брендов")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 500])
+    args = parser.parse_args()
+
+    failed = False
+    app = create_bench_app()
+    with app.app_context():
+        print(f"{'size':>6} | {'brand q':>7} | {'brand ms':>8} | {'user q':>6} | {'user ms':>7}")
+        print("-" * 48)
+        for size in args.sizes:
+            seed(size)
+            brand_q, brand_ms = count_queries(get_brand_details, 1)
+            user_q, user_ms = count_queries(get_user_brands_data, 1)
+            print(f"{size:>6} | {brand_q:>7} | {brand_ms:>8.1f} | {user_q:>6} | {user_ms:>7.1f}")
+            if brand_q != BRAND_DETAILS_QUERIES or user_q != USER_BRANDS_QUERIES:
+                failed = True
+
+    if failed:
+        print(f"ОШИБКА: ожидалось {BRAND_DETAILS_QUERIES} и {USER_BRANDS_QUERIES} запросов")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
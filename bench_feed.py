@@ -0,0 +1,129 @@
+"""
+Бенчмарк ленты /api/news/approved: старый N+1 цикл против db/feed.py.
+
+Поднимает временную SQLite-базу в памяти, наполняет её новостями, лайками,
+просмотрами и комментариями и для каждого размера ленты печатает число SQL-запросов
+и время ответа.
+
+Запуск:
+    python bench_feed.py
+    python bench_feed.py --sizes 10 100 1000 --repeat 5
+"""
+import argparse
+import random
+import time
+
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+
+from db.models import db, User, News, Like, Comment, NewsView
+from db.feed import get_approved_feed
+from db.counters import reconcile_news_counters
+
+
+@compiles(JSONB, "sqlite")
+def _compile_jsonb_sqlite(element, compiler, **kw):
+    # SQLite не знает JSONB, для бенчмарка достаточно обычного JSON
+    return "JSON"
+
+
+def legacy_approved_feed(user_id=None):
+    """Старая реализация get_approved_news: 4 запроса на каждую новость"""
+    results = []
+    for item in News.query.filter_by(is_approved=True).all():
+        data = item.to_dict()
+        data["likes_count"] = Like.query.filter_by(news_id=item.id).count()
+        liked_by_user = False
+        if user_id:
+            liked_by_user = bool(Like.query.filter_by(user_id=user_id, news_id=item.id).first())
+        data["is_liked_by_user"] = liked_by_user
+        data["comment_count"] = Comment.query.filter_by(news_id=item.id).count()
+        data["viewers_count"] = NewsView.query.filter_by(news_id=item.id).count()
+        results.append(data)
+    return results
+
+
+def assert_same_feed(legacy, feed):
+    """Новая лента должна содержать все поля старой с теми же значениями (новые поля допустимы)"""
+    assert len(legacy) == len(feed), "Разное количество новостей"
+    for old_item, new_item in zip(legacy, feed):
+        assert old_item == {key: new_item[key] for key in old_item}, f"Расхождение в новости {old_item['id']}"
+
+
+def create_bench_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    return app
+
+
+def seed(posts, users=50):
+    """Заполняет базу: posts новостей и случайные лайки/просмотры/комментарии"""
+    db.drop_all()
+    db.create_all()
+    rnd = random.Random(42)
+
+    db.session.add_all([User(id=uid, username=f"user_{uid}") for uid in range(1, users + 1)])
+    db.session.add_all([News(id=nid, title=f"news {nid}", text="text", is_approved=True)
+                        for nid in range(1, posts + 1)])
+    db.session.flush()
+
+    for nid in range(1, posts + 1):
+        for uid in rnd.sample(range(1, users + 1), rnd.randint(0, 10)):
+            db.session.add(Like(user_id=uid, news_id=nid))
+        for _ in range(rnd.randint(0, 30)):
+            db.session.add(NewsView(user_id=rnd.randint(1, users), news_id=nid))
+        for _ in range(rnd.randint(0, 5)):
+            db.session.add(Comment(user_id=rnd.randint(1, users), news_id=nid, text="comment"))
+    db.session.commit()
+    # Строки вставлены напрямую, минуя роуты, поэтому счётчики News нужно пересчитать
+    reconcile_news_counters()
+
+
+def measure(func, user_id, repeat):
+    """Возвращает (число запросов за один вызов, среднее время в мс)"""
+    queries = []
+
+    def count_query(*args, **kwargs):
+        queries.append(1)
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", count_query)
+    try:
+        db.session.expire_all()
+        func(user_id)
+        per_call = len(queries)
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            db.session.expire_all()
+            func(user_id)
+        elapsed_ms = (time.perf_counter() - started) * 1000 / repeat
+    finally:
+        event.remove(engine, "before_cursor_execute", count_query)
+    return per_call, elapsed_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк ленты новостей")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100, 250, 500])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    with app.app_context():
+        print(f"{'posts':>6} | {'legacy q':>8} | {'legacy ms':>10} | {'feed q':>6} | {'feed ms':>8}")
+        print("-" * 52)
+        for size in args.sizes:
+            seed(size)
+            assert_same_feed(legacy_approved_feed(1), get_approved_feed(1))
+            legacy_q, legacy_ms = measure(legacy_approved_feed, 1, args.repeat)
+            feed_q, feed_ms = measure(get_approved_feed, 1, args.repeat)
+            print(f"{size:>6} | {legacy_q:>8} | {legacy_ms:>10.1f} | {feed_q:>6} | {feed_ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,100 @@ class BaseConfig:
     CLOUDFLARE_ENABLED = True
     CLOUDFLARE_DOMAIN = "fckfsh.ru"
 
+    # Веб-сервер (python main.py web, gunicorn.conf.py)
+    WEB_BIND = "0.0.0.0:5000"
+    WEB_WORKERS = None  # None - 2 * число ядер + 1
+    WEB_THREADS = 4  # Потоков на воркер (на Windows через waitress - всего потоков)
+    WEB_TIMEOUT = 60
+    WEB_GRACEFUL_TIMEOUT = 30  # Сколько воркер дорабатывает запросы при перезагрузке/остановке
+
+    # Буфер просмотров новостей (db/view_buffer.py)
+    VIEW_MIN_INTERVAL_SECONDS = 30  # Повторный просмотр той же новости засчитывается не чаще
+    VIEW_BUFFER_FLUSH_SECONDS = 5  # Как часто сбрасывать буфер в БД (окно потери при падении)
+    VIEW_BUFFER_MAX_BATCH = 500  # Сбрасывать сразу, если накопилось столько просмотров
+    VIEW_BUFFER_MAX_PENDING = 50000  # Жёсткий предел буфера, если БД недоступна
+    NEWS_VIEWS_RETENTION_DAYS = 30  # Старше - сворачиваются в news_view_daily (`flask rollup-views`)
+
+    # Кэш лайкнутых новостей на пользователя (db/likes.py). Сбрасывается на like/unlike только
+    # в своём процессе, поэтому при нескольких воркерах данные могут отставать на TTL
+    LIKE_CACHE_ENABLED = False
+    LIKE_CACHE_TTL_SECONDS = 60
+    LIKE_CACHE_MAX_USERS = 10000
+
+    # Кэш каталога предметов (db/catalog.py): как часто сверять версию каталога с БД
+    ITEM_CATALOG_CHECK_SECONDS = 30
+
+    # Сохранение пользователей из /start ботом (fck_app/bot.py): пачка копится до N секунд или N штук
+    BOT_USER_BATCH_SECONDS = 0.2
+    BOT_USER_BATCH_SIZE = 200
+
+    # Сборка статики (fck_app/static_assets.py, flask build-static): имена с хэшем и предсжатые .br/.gz
+    STATIC_ASSETS_DIR = "static/dist"
+    STATIC_ASSETS_URL = "/assets"
+    STATIC_ASSETS_SOURCES = ("js", "css", "fonts")
+
+    # LOD-копии 3D-моделей (fck_app/model_variants.py, flask build-model-variants; нужен gltf-transform, для KTX2 - toktx)
+    MODEL_VARIANTS_DIR = "static/models/variants"
+    MODEL_COMPRESSION = "meshopt"  # meshopt или draco - оба понимает загрузчик Babylon
+    MODEL_TEXTURE_FORMAT = "ktx2"
+    MODEL_PROCESS_WORKERS = 2
+
+    # Миниатюры предметов и спрайт-листы (fck_app/item_previews.py, flask build-item-previews; нужен Pillow)
+    ITEM_PREVIEW_DIR = "static/previews/thumbs"
+    ITEM_PREVIEW_SIZE = 160  # Сторона миниатюры: карточка инвентаря ~80px на экранах 2x
+    ITEM_SPRITE_COLUMNS = 16  # Лист 16 x 16 = 256 предметов
+    ITEM_PREVIEW_WORKERS = None  # None - по числу ядер
+
+    # Экраны SPA одним пакетом (fck_app/spa_bundle.py, /spa/templates.json)
+    SPA_BUNDLE_CHECK_SECONDS = 2  # Как часто сверять mtime шаблонов для пересборки пакета
+    SPA_PRELOAD_HINTS = True  # Link: preload пакета экранов и spa.js в ответе index.html
+
+    # Сессии Mini App (fck_app/auth.py): токен выдаётся по initData один раз (POST /api/auth/session)
+    SESSION_TOKEN_SECRET = os.getenv("SESSION_TOKEN_SECRET")  # Обязателен для токенов; без него они отключены
+    SESSION_TOKEN_TTL_SECONDS = 3600
+    INIT_DATA_MAX_AGE_SECONDS = 24 * 3600  # initData старше не обменивается на токен
+    AUTH_REQUIRE_TOKEN = False  # True - user_id из параметров запроса больше не принимается
+
+    # Клиент Bot API веб-процесса (fck_app/telegram_api.py)
+    TELEGRAM_API_TIMEOUT_SECONDS = 10
+    TELEGRAM_API_POOL_SIZE = 20  # Одновременных соединений с api.telegram.org на процесс
+
+    # Прокси аватарок Telegram (fck_app/avatars.py): миниатюры хранятся на диске по хэшу содержимого
+    AVATAR_CACHE_DIR = "cache/avatars"
+    AVATAR_SIZE = 128  # Сторона миниатюры в пикселях (нужен Pillow, иначе хранится оригинал)
+    AVATAR_CACHE_TTL_SECONDS = 86400  # Сколько держать file_id -> файл в памяти
+    AVATAR_CACHE_MAX_ENTRIES = 10000
+
+    # Загрузка медиа Telethon-скрейпером (fck_app/media_downloader.py)
+    MEDIA_DOWNLOAD_CONCURRENCY = 6  # Одновременных загрузок всего
+    MEDIA_DOWNLOAD_PER_CHANNEL = 4  # Из них на один канал
+    MEDIA_DOWNLOAD_RETRIES = 3
+    MEDIA_DOWNLOAD_BACKOFF_SECONDS = 1.0  # Базовая задержка повтора, удваивается с каждой попыткой
+
+    # Адаптивные копии медиа новостей (fck_app/media_variants.py, нужен Pillow; кадр видео - ffmpeg)
+    MEDIA_PROCESS_WORKERS = 2  # Процессов для ресайза и кодирования
+    MEDIA_VARIANT_WIDTHS = (320, 640, 1080)
+    MEDIA_VARIANT_FORMATS = ("avif", "webp")
+
+    # Очередь между Telethon-скрейпером и БД (db/ingest.py)
+    INGEST_QUEUE_PATH = "db/ingest_queue.db"  # Локальная SQLite (WAL), переживает перезапуск
+    INGEST_BATCH_SIZE = 50  # Сколько постов писать в News одной транзакцией
+    INGEST_FLUSH_SECONDS = 1.0  # Как часто писатель проверяет очередь без явного сигнала
+    INGEST_MAX_ATTEMPTS = 5  # После стольких неудачных записей пост уходит в dead_posts очереди
+
+    # Сборка альбомов из частей (fck_app/album_assembler.py)
+    # Событие Album от Telethon сообщает число частей - тогда альбом собирается, как только
+    # все они пришли; пауза и предел работают, пока число неизвестно
+    ALBUM_IDLE_GAP_SECONDS = 0.5  # Альбом готов, если столько секунд не было новых частей
+    ALBUM_MAX_WAIT_SECONDS = 5.0  # Жёсткий предел ожидания с первой части
+
+    # Догон каналов после простоя (fck_app/catch_up.py)
+    CATCH_UP_ON_START = True
+    CATCH_UP_INITIAL_MESSAGES = 200  # Для канала без сохранённых новостей - сколько последних сообщений взять
+    CATCH_UP_MAX_IN_FLIGHT = 8  # Постов, собираемых одновременно
+    CATCH_UP_PAGE_SIZE = 100  # Граница догона сдвигается после каждых N прочитанных сообщений
+    SCRAPER_STATE_SECONDS = 2  # Как часто скрейпер публикует состояние для веб-процессов
+
 
 class ProductionConfig(BaseConfig):
     PUBLIC_URL = "https://fckfsh.ru"
@@ -0,0 +1,110 @@
+# brands.py
+import logging
+
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+
+from db.models import db, Brand, BrandMember
+from db.feed import encode_keyset, decode_cursor, keyset_order, keyset_after
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+DEFAULT_MEMBERS_PAGE_SIZE = 50
+MAX_MEMBERS_PAGE_SIZE = 200
+
+
+def member_dict(member):
+    """Участник бренда вместе с данными пользователя"""
+    return {
+        "user_id": member.user.id,
+        "username": member.user.username,
+        "photo_url": member.user.photo_url,
+        "role": member.role,
+        "joined_at": member.joined_at.isoformat() if member.joined_at else None
+    }
+
+
+def get_brand_members_page(brand_id, limit=None, cursor=None):
+    """
+    Страница участников бренда в порядке вступления; пользователи подгружаются
+    тем же запросом (JOIN). Возвращает (участники, курсор следующей страницы).
+    Без limit и cursor - все участники, как раньше (страница бренда не листает список).
+    """
+    query = (
+        BrandMember.query
+        .options(joinedload(BrandMember.user))
+        .filter(BrandMember.brand_id == brand_id)
+    )
+    order = keyset_order(BrandMember.joined_at, BrandMember.user_id)
+    if limit is None and cursor is None:
+        return [member_dict(member) for member in query.order_by(*order).all()], None
+
+    if not limit or limit < 1:
+        limit = DEFAULT_MEMBERS_PAGE_SIZE
+    limit = min(limit, MAX_MEMBERS_PAGE_SIZE)
+    if cursor:
+        joined_at, user_id = decode_cursor(cursor)
+        query = query.filter(keyset_after(BrandMember.joined_at, BrandMember.user_id, joined_at, user_id))
+
+    members = query.order_by(*order).limit(limit + 1).all()
+    has_more = len(members) > limit
+    members = members[:limit]
+
+    next_cursor = encode_keyset(members[-1].joined_at, members[-1].user_id) if has_more else None
+    return [member_dict(member) for member in members], next_cursor
+
+
+def count_brand_members(brand_id):
+    return (
+        db.session.query(func.count())
+        .select_from(BrandMember)
+        .filter(BrandMember.brand_id == brand_id)
+        .scalar()
+    )
+
+
+def get_brand_details(brand_id, members_limit=None, members_cursor=None):
+    """
+    Данные бренда с участниками: всеми или страницей, если передан members_limit/members_cursor.
+    Три запроса независимо от количества участников. None, если бренда нет.
+    """
+    brand = Brand.query.get(brand_id)
+    if not brand:
+        return None
+
+    members_data, next_cursor = get_brand_members_page(brand_id, members_limit, members_cursor)
+
+    brand_data = brand.to_dict()
+    brand_data["members"] = members_data
+    brand_data["members_count"] = count_brand_members(brand_id)
+    brand_data["members_next_cursor"] = next_cursor
+
+    # Преобразуем поля в проценты для отображения в интерфейсе
+    brand_data["reputation"] = brand.relevance  # процент репутации
+    brand_data["profitability"] = brand.popularity  # процент прибыльности
+    brand_data["innovation"] = brand.innovativeness  # процент инноваций
+    return brand_data
+
+
+def get_user_brands_data(user_id):
+    """Бренды пользователя с его ролью в каждом - один запрос с JOIN на brands"""
+    memberships = (
+        BrandMember.query
+        .options(joinedload(BrandMember.brand))
+        .filter(BrandMember.user_id == user_id)
+        .all()
+    )
+
+    user_brands = []
+    for membership in memberships:
+        brand = membership.brand
+        brand_data = brand.to_dict()
+        brand_data["role"] = membership.role  # роль пользователя в этом бренде
+        brand_data["joined_at"] = membership.joined_at.isoformat() if membership.joined_at else None
+
+        # Проверка, является ли пользователь создателем бренда
+        brand_data["is_creator"] = (brand.creator_id == user_id)
+
+        user_brands.append(brand_data)
+    return user_brands
@@ -0,0 +1,115 @@
+# catalog.py
+import logging
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from db.models import db, Item, CatalogVersion
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class ItemCatalog:
+    """
+    Кэш каталога предметов в памяти процесса: id -> готовый словарь Item.to_dict().
+
+    Актуальность проверяется по номеру версии каталога в таблице catalog_version не чаще
+    раза в check_interval секунд; при изменении версии каталог перечитывается целиком.
+    Изменения Item через ORM сами поднимают версию (см. _bump_on_item_changes), после
+    ручных правок SQL нужно выполнить `flask bump-catalog-version`.
+
+    Возвращаемые словари общие для всех запросов - их нельзя изменять.
+    """
+
+    def __init__(self, check_interval=30):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._items = {}
+        self._version = None
+        self._checked_at = 0.0
+
+    def init_app(self, app):
+        self.check_interval = app.config.get("ITEM_CATALOG_CHECK_SECONDS", self.check_interval)
+        app.extensions["item_catalog"] = self
+
+    def invalidate(self):
+        """Заставляет перечитать каталог при следующем обращении"""
+        with self._lock:
+            self._version = None
+            self._checked_at = 0.0
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_interval:
+            return
+
+        with self._lock:
+            if self._version is not None and now - self._checked_at < self.check_interval:
+                return
+            version = get_catalog_version()
+            if version != self._version:
+                items = {item.id: item.to_dict() for item in Item.query.all()}
+                self._items = items
+                self._version = version
+                logger.info(f"[ItemCatalog] Каталог загружен: {len(items)} предметов, версия {version}")
+            self._checked_at = now
+
+    def get(self, item_id):
+        self._ensure_fresh()
+        return self._items.get(item_id)
+
+    def get_many(self, item_ids):
+        """Словари предметов в порядке item_ids; неизвестные id пропускаются"""
+        if not item_ids:
+            return []
+        self._ensure_fresh()
+        items = self._items
+        return [items[item_id] for item_id in item_ids if item_id in items]
+
+
+item_catalog = ItemCatalog()
+
+
+def get_catalog_version():
+    return db.session.query(CatalogVersion.version).filter(CatalogVersion.id == 1).scalar() or 0
+
+
+def bump_catalog_version(session=None):
+    """
+    Поднимает версию каталога в текущей транзакции. Локальный кэш сбрасывается
+    после коммита, чтобы не успеть перечитать каталог со старой версией.
+    """
+    session = session or db.session
+    updated = session.query(CatalogVersion).filter(CatalogVersion.id == 1).update(
+        {CatalogVersion.version: CatalogVersion.version + 1}, synchronize_session=False
+    )
+    if not updated:
+        session.add(CatalogVersion(id=1, version=1))
+    session.info["catalog_changed"] = True
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_on_item_changes(session, flush_context, instances):
+    """Любое изменение Item через ORM поднимает версию каталога в той же транзакции"""
+    if session.info.get("catalog_changed"):
+        return
+    changed = any(
+        isinstance(obj, Item)
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+    )
+    if changed:
+        bump_catalog_version(session)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop("catalog_changed", False):
+        item_catalog.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session):
+    session.info.pop("catalog_changed", None)
@@ -0,0 +1,180 @@
+# commands.py
+import click
+
+
+def register_commands(app):
+    """Регистрирует служебные команды `flask ...` для обслуживания базы"""
+
+    @app.cli.command("reconcile-counters")
+    def reconcile_counters_command():
+        """Пересчитывает счётчики лайков/просмотров/комментариев News из исходных таблиц"""
+        from db.counters import reconcile_news_counters
+        drifted = reconcile_news_counters()
+        print(f"[COUNTERS] Счётчики пересчитаны, исправлено новостей: {drifted}")
+
+    @app.cli.command("backfill-viewer-sketches")
+    def backfill_viewer_sketches_command():
+        """Заполняет HyperLogLog-скетчи уникальных зрителей из news_views"""
+        from db.viewers import backfill_viewer_sketches
+        total = backfill_viewer_sketches()
+        print(f"[VIEWERS] Скетчи обновлены, обработано пар новость/зритель: {total}")
+
+    @app.cli.command("rollup-views")
+    @click.option("--retention-days", type=int, default=None,
+                  help="Сколько дней хранить сырые просмотры (по умолчанию NEWS_VIEWS_RETENTION_DAYS)")
+    def rollup_views_command(retention_days):
+        """Сворачивает старые строки news_views в дневные агрегаты news_view_daily"""
+        from db.viewers import rollup_old_views
+        if retention_days is None:
+            retention_days = app.config.get("NEWS_VIEWS_RETENTION_DAYS", 30)
+        removed = rollup_old_views(retention_days)
+        print(f"[VIEWERS] Свёрнуто просмотров старше {retention_days} дн.: {removed}")
+
+    @app.cli.command("bump-catalog-version")
+    def bump_catalog_version_command():
+        """Сбрасывает кэш каталога предметов во всех процессах (после ручных правок items)"""
+        from db.catalog import bump_catalog_version, get_catalog_version
+        from db.models import db
+        bump_catalog_version()
+        db.session.commit()
+        print(f"[CATALOG] Версия каталога: {get_catalog_version()}")
+
+    @app.cli.command("backfill-news-media")
+    def backfill_news_media_command():
+        """Заполняет news_media/media для новостей, сохранённых до хранилища по хэшу"""
+        from db.media_store import backfill_news_media
+        attached = backfill_news_media()
+        print(f"[MEDIA] Медиа привязаны к новостям: {attached}")
+
+    @app.cli.command("build-media-variants")
+    @click.option("--all", "rebuild", is_flag=True, help="Перестроить варианты и для новостей, у которых они уже есть")
+    def build_media_variants_command(rebuild):
+        """Строит WebP/AVIF-копии и LQIP для медиа уже сохранённых новостей"""
+        from concurrent.futures import ProcessPoolExecutor
+        from functools import partial
+        from db.feed import split_media_urls
+        from db.models import db, News
+        from fck_app.media_variants import build_variants, VARIANT_WIDTHS, VARIANT_FORMATS
+
+        build = partial(
+            build_variants,
+            widths=app.config.get("MEDIA_VARIANT_WIDTHS", VARIANT_WIDTHS),
+            formats=app.config.get("MEDIA_VARIANT_FORMATS", VARIANT_FORMATS),
+        )
+        query = News.query.order_by(News.id)
+        if not rebuild:
+            query = query.filter(News.media_variants.is_(None))
+
+        updated = 0
+        with ProcessPoolExecutor(max_workers=app.config.get("MEDIA_PROCESS_WORKERS", 2)) as pool:
+            for news_item in query.all():
+                paths = split_media_urls(news_item.image_url)
+                if news_item.video_url:
+                    paths.append(news_item.video_url)
+                results = pool.map(build, paths)
+                variants = {path.replace("\\", "/"): result for path, result in zip(paths, results) if result}
+                if variants:
+                    news_item.media_variants = variants
+                    db.session.commit()
+                    updated += 1
+        print(f"[MEDIA] Варианты построены для новостей: {updated}")
+
+    @app.cli.command("build-static")
+    def build_static_command():
+        """Собирает js/css/шрифты с хэшем в имени и предсжатыми .br/.gz (после сборки - перезапуск воркеров)"""
+        import os
+        from fck_app.static_assets import AssetBuilder
+
+        builder = AssetBuilder(
+            app.static_folder,
+            os.path.join(app.root_path, app.config.get("STATIC_ASSETS_DIR", "static/dist")),
+            app.config.get("STATIC_ASSETS_SOURCES", ("js", "css", "fonts")),
+            url_prefix=app.config.get("STATIC_ASSETS_URL", "/assets"),
+        )
+        builder.build()
+        stats = builder.stats
+        print(
+            f"[STATIC] Файлов в манифесте: {stats['files']}, новых: {stats['written']} - {stats['bytes']} байт "
+            f"(gzip: {stats['gzip_bytes']}, brotli: {stats['brotli_bytes']})"
+        )
+
+    @app.cli.command("build-model-variants")
+    def build_model_variants_command():
+        """Строит LOD-копии 3D-моделей каталога предметов (Item.model_path) и моделей из static/models"""
+        import os
+        from concurrent.futures import ThreadPoolExecutor
+        from functools import partial
+        from db.models import Item
+        from fck_app.model_variants import build_model_variants, write_manifest, source_key, MODELS_DIR
+
+        out_dir = os.path.join(app.root_path, app.config.get("MODEL_VARIANTS_DIR", "static/models/variants"))
+        # Сначала каталог, затем модели, которые страницы грузят напрямую (сцена, одежда на аватаре)
+        sources = [source_key(path) for (path,) in Item.query.with_entities(Item.model_path).distinct()]
+        for root, dirs, names in os.walk(os.path.join(app.root_path, MODELS_DIR)):
+            dirs[:] = [name for name in dirs if os.path.join(root, name) != out_dir]
+            for name in names:
+                if name.lower().endswith(".glb"):
+                    sources.append(source_key(os.path.relpath(os.path.join(root, name), app.root_path)))
+        sources = list(dict.fromkeys(path for path in sources if path.lower().endswith(".glb")))
+
+        build = partial(
+            build_model_variants,
+            out_dir=out_dir,
+            compression=app.config.get("MODEL_COMPRESSION", "meshopt"),
+            texture_format=app.config.get("MODEL_TEXTURE_FORMAT", "ktx2"),
+        )
+        # gltf-transform - отдельный процесс, потоков достаточно
+        with ThreadPoolExecutor(max_workers=app.config.get("MODEL_PROCESS_WORKERS", 2)) as pool:
+            results = pool.map(build, [os.path.join(app.root_path, path) for path in sources])
+            entries = {path: result for path, result in zip(sources, results) if result}
+        write_manifest(out_dir, entries)
+        for path, variants in entries.items():
+            sizes = ", ".join(f"{name} {lod['bytes']}" for name, lod in variants["lods"].items())
+            print(f"[MODELS] {path}: {variants['bytes']} -> {sizes}")
+        print(f"[MODELS] Собраны копии для моделей: {len(entries)} из {len(sources)}")
+
+    @app.cli.command("build-item-previews")
+    def build_item_previews_command():
+        """Собирает WebP-миниатюры всех предметов и спрайт-листы для инвентаря"""
+        import os
+        from concurrent.futures import ProcessPoolExecutor
+        from functools import partial
+        from sqlalchemy import func
+        from db.models import db, Item, InventoryEntry
+        from fck_app.item_previews import preview_source, build_thumbnail, build_sprite_sheets, write_manifest
+
+        preview_dir = app.config.get("ITEM_PREVIEW_DIR", "static/previews/thumbs")
+        out_dir = os.path.join(app.root_path, preview_dir)
+        url_prefix = "/" + preview_dir.strip("/")
+        size = app.config.get("ITEM_PREVIEW_SIZE", 160)
+        # Самые распространённые предметы - на первых листах: типичный инвентарь укладывается в один-два листа
+        owners = (
+            db.session.query(InventoryEntry.item_id, func.count().label("owners"))
+            .group_by(InventoryEntry.item_id)
+            .subquery()
+        )
+        items = (
+            db.session.query(Item.id, Item.preview_image)
+            .outerjoin(owners, owners.c.item_id == Item.id)
+            .order_by(func.coalesce(owners.c.owners, 0).desc(), Item.id)
+            .all()
+        )
+        sources = [(item_id, preview_source(item_id, preview_image, app.root_path)) for item_id, preview_image in items]
+        missing = [item_id for item_id, path in sources if path is None]
+        if missing:
+            print(f"[PREVIEWS] Нет картинки превью у предметов: {missing}")
+        sources = [(item_id, path) for item_id, path in sources if path]
+
+        build = partial(build_thumbnail, out_dir=out_dir, size=size)
+        with ProcessPoolExecutor(max_workers=app.config.get("ITEM_PREVIEW_WORKERS")) as pool:
+            paths = list(pool.map(build, [path for _, path in sources], chunksize=16))
+        thumbnails = [(item_id, path) for (item_id, _), path in zip(sources, paths) if path]
+        failed = [item_id for (item_id, _), path in zip(sources, paths) if not path]
+        if failed:
+            print(f"[PREVIEWS] Не удалось собрать миниатюры предметов (битые или нечитаемые картинки): {failed}")
+
+        sheets, positions = build_sprite_sheets(
+            thumbnails, out_dir, size, app.config.get("ITEM_SPRITE_COLUMNS", 16), url_prefix
+        )
+        write_manifest(out_dir, size, thumbnails, sheets, positions, url_prefix)
+        print(f"[PREVIEWS] Миниатюр: {len(thumbnails)} из {len(items)}, спрайт-листов: {len(sheets)}")
@@ -0,0 +1,116 @@
+# comments.py
+import logging
+
+from sqlalchemy import literal, select
+from sqlalchemy.orm import joinedload
+
+from db.models import db, Comment
+from db.feed import encode_cursor, decode_cursor, clamp_page_size, keyset_order, keyset_after
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+DEFAULT_MAX_DEPTH = 5
+MAX_DEPTH_LIMIT = 20
+
+
+def author_dict(user):
+    """Краткие данные автора комментария"""
+    return {
+        "id": user.id,
+        "username": user.username,
+        "photo_url": user.photo_url
+    }
+
+
+def comment_dict(comment):
+    data = comment.to_dict()
+    data["user"] = author_dict(comment.user)
+    return data
+
+
+def _descendants(root_ids, max_depth):
+    """
+    Все ответы на root_ids до глубины max_depth + 1 одним рекурсивным запросом
+    (лишний уровень нужен только чтобы узнать, есть ли ответы глубже лимита).
+    Строки идут по уровням, поэтому родитель всегда раньше ответа - независимо от
+    created_at (импорт, расхождение часов, одинаковые метки времени).
+    """
+    tree = (
+        select(Comment.id.label("id"), literal(1).label("depth"))
+        .where(Comment.parent_id.in_(root_ids))
+        .cte("comment_tree", recursive=True)
+    )
+    tree = tree.union_all(
+        select(Comment.id, tree.c.depth + 1)
+        .where(Comment.parent_id == tree.c.id)
+        .where(tree.c.depth <= max_depth)
+    )
+    return (
+        db.session.query(Comment, tree.c.depth)
+        .join(tree, tree.c.id == Comment.id)
+        .options(joinedload(Comment.user))
+        .order_by(tree.c.depth, *keyset_order(Comment.created_at, Comment.id))
+        .all()
+    )
+
+
+def get_comment_tree(news_id, limit=None, cursor=None, max_depth=DEFAULT_MAX_DEPTH):
+    """
+    Страница веток комментариев новости: корневые комментарии (старые сверху) с вложенными
+    ответами до max_depth уровней. Два запроса независимо от размера обсуждения,
+    дерево собирается за O(n).
+    """
+    limit = clamp_page_size(limit)
+    max_depth = max(0, min(max_depth, MAX_DEPTH_LIMIT))
+
+    roots_query = (
+        Comment.query
+        .options(joinedload(Comment.user))
+        .filter(Comment.news_id == news_id, Comment.parent_id.is_(None))
+    )
+    if cursor:
+        created_at, comment_id = decode_cursor(cursor)
+        roots_query = roots_query.filter(keyset_after(Comment.created_at, Comment.id, created_at, comment_id))
+    roots = roots_query.order_by(*keyset_order(Comment.created_at, Comment.id)).limit(limit + 1).all()
+    has_more = len(roots) > limit
+    roots = roots[:limit]
+
+    nodes = {}
+    items = []
+    for root in roots:
+        node = comment_dict(root)
+        node["replies"] = []
+        node["has_more_replies"] = False
+        nodes[root.id] = node
+        items.append(node)
+
+    if roots and max_depth > 0:
+        for comment, depth in _descendants(list(nodes), max_depth):
+            parent = nodes.get(comment.parent_id)
+            if parent is None:
+                # Строки идут по уровням - родителя нет, только если он сам глубже лимита
+                logger.warning(f"[get_comment_tree] Комментарий {comment.id}: родитель {comment.parent_id} не найден")
+                continue
+            if depth > max_depth:
+                parent["has_more_replies"] = True
+                continue
+            node = comment_dict(comment)
+            node["replies"] = []
+            node["has_more_replies"] = False
+            nodes[comment.id] = node
+            parent["replies"].append(node)
+    elif roots:
+        has_replies = {
+            row[0] for row in db.session.query(Comment.parent_id)
+            .filter(Comment.parent_id.in_(list(nodes)))
+            .distinct()
+        }
+        for comment_id in has_replies:
+            nodes[comment_id]["has_more_replies"] = True
+
+    logger.debug(f"[get_comment_tree] news_id={news_id}: {len(items)} веток, {len(nodes)} комментариев")
+    return {
+        "items": items,
+        "next_cursor": encode_cursor(roots[-1]) if has_more else None,
+    }
@@ -0,0 +1,74 @@
+# counters.py
+import logging
+
+from sqlalchemy import func, select, or_
+
+from db.models import db, News, Like, Comment, NewsView, NewsViewDaily
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# Счётчик на News -> таблица, из которой он считается
+COUNTER_SOURCES = {
+    "likes_count": Like,
+    "viewers_count": NewsView,
+    "comment_count": Comment,
+}
+
+
+def increment_counter(news_id, counter, delta=1):
+    """
+    Атомарно меняет счётчик новости (UPDATE news SET counter = counter + delta).
+    Не коммитит: вызывается в той же транзакции, что и вставка/удаление строки-источника.
+    """
+    if counter not in COUNTER_SOURCES:
+        raise ValueError(f"Неизвестный счётчик: {counter}")
+    column = getattr(News, counter)
+    db.session.query(News).filter(News.id == news_id).update(
+        {column: column + delta}, synchronize_session=False
+    )
+
+
+def get_counter(news_id, counter):
+    """Текущее значение счётчика одним запросом по первичному ключу"""
+    return db.session.query(getattr(News, counter)).filter(News.id == news_id).scalar() or 0
+
+
+def _actual_count(model):
+    """Коррелированный подзапрос COUNT(*) строк-источников для текущей новости"""
+    return (
+        select(func.count(model.id))
+        .where(model.news_id == News.id)
+        .scalar_subquery()
+    )
+
+
+def _actual_views():
+    """Просмотры = живые строки news_views + уже свёрнутые в news_view_daily"""
+    rolled_up = (
+        select(func.coalesce(func.sum(NewsViewDaily.views), 0))
+        .where(NewsViewDaily.news_id == News.id)
+        .scalar_subquery()
+    )
+    return _actual_count(NewsView) + rolled_up
+
+
+def reconcile_news_counters():
+    """
+    Пересчитывает все счётчики News из исходных таблиц.
+    Возвращает количество новостей, у которых счётчики расходились.
+    """
+    actual = {counter: _actual_count(model) for counter, model in COUNTER_SOURCES.items()}
+    actual["viewers_count"] = _actual_views()
+
+    drifted = News.query.filter(
+        or_(*[getattr(News, counter) != count for counter, count in actual.items()])
+    ).count()
+
+    db.session.query(News).update(
+        {getattr(News, counter): count for counter, count in actual.items()},
+        synchronize_session=False,
+    )
+    db.session.commit()
+    logger.info(f"[reconcile_news_counters] Пересчитаны счётчики, исправлено новостей: {drifted}")
+    return drifted
@@ -0,0 +1,14 @@
+# dialect.py
+from sqlalchemy.dialects import postgresql, sqlite
+
+from db.models import db
+
+
+def upsert_insert(table):
+    """
+    INSERT с поддержкой ON CONFLICT для диалекта текущей сессии: PostgreSQL в работе,
+    SQLite в бенчмарках и локальной базе. У результата есть on_conflict_do_nothing,
+    on_conflict_do_update и excluded - одинаково для обоих диалектов.
+    """
+    dialect = db.session.get_bind().dialect.name
+    return (sqlite if dialect == "sqlite" else postgresql).insert(table)
@@ -0,0 +1,180 @@
+# feed.py
+import base64
+import json
+import logging
+from datetime import datetime
+
+from sqlalchemy import and_, or_, tuple_
+
+from db.models import News
+from db.likes import get_liked_news_ids
+from db.media_store import get_news_media
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """Курсор пагинации повреждён или подделан"""
+
+
+def split_media_urls(image_url):
+    """Список путей медиа из News.image_url (альбомы хранятся через запятую)"""
+    if not image_url:
+        return []
+    return [url.strip() for url in image_url.split(",") if url.strip()]
+
+
+def media_sources(news_item, media_items=None):
+    """
+    Адреса для адаптивной загрузки медиа: по элементу на каждое фото альбома и видео.
+    media_items - файлы новости из news_media (см. db/media_store.py); для старых новостей
+    без news_media пути берутся из image_url/video_url.
+    srcset - готовые строки вида "a.webp 320w, b.webp 640w" по форматам; если варианты
+    ещё не построены, в элементе остаётся только url оригинала.
+    """
+    variants = news_item.media_variants or {}
+    if media_items:
+        entries = [media.to_dict() for media in media_items]
+    else:
+        entries = [{"url": url} for url in split_media_urls(news_item.image_url)]
+        if news_item.video_url:
+            entries.append({"url": news_item.video_url})
+
+    for entry in entries:
+        variant = variants.get(entry["url"].replace("\\", "/"))
+        if variant:
+            entry["srcset"] = {
+                fmt: ", ".join(f"/{path} {width}w" for width, path in sizes)
+                for fmt, sizes in variant.get("srcset", {}).items()
+            }
+            entry["lqip"] = variant.get("lqip")
+            if variant.get("poster"):
+                entry["poster"] = "/" + variant["poster"]
+    return entries
+
+
+def serialize_feed(news_items, user_id=None):
+    """
+    Превращает новости в словари того же вида, что отдавал старый /api/news/approved.
+    Лайки пользователя и медиа для всей страницы берутся одним запросом каждые
+    (см. db/likes.py и db/media_store.py).
+    """
+    news_ids = [item.id for item in news_items]
+    liked = get_liked_news_ids(user_id, news_ids)
+    media_by_news = get_news_media(news_ids)
+    results = []
+    for news_item in news_items:
+        data = news_item.to_dict()
+        data["likes_count"] = news_item.likes_count
+        data["is_liked_by_user"] = news_item.id in liked
+        data["comment_count"] = news_item.comment_count
+        data["viewers_count"] = news_item.viewers_count
+        data["unique_viewers_count"] = news_item.unique_viewers_count
+        data["media"] = media_sources(news_item, media_by_news.get(news_item.id))
+        results.append(data)
+    return results
+
+
+def get_approved_feed(user_id=None):
+    """Возвращает список одобренных новостей со счётчиками (не больше трёх запросов к БД)"""
+    news_items = News.query.filter(News.is_approved.is_(True)).order_by(News.id).all()
+    logger.debug(f"[get_approved_feed] Получено {len(news_items)} новостей, user_id={user_id}")
+    return serialize_feed(news_items, user_id)
+
+
+# ----------------------------------------------------------------------------------
+# Keyset-пагинация по (created_at, id)
+# ----------------------------------------------------------------------------------
+
+def encode_keyset(timestamp, key):
+    """Непрозрачный курсор из пары (метка времени, id)"""
+    payload = json.dumps(
+        {"c": timestamp.isoformat() if timestamp else None, "i": key},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def encode_cursor(news_item):
+    """Непрозрачный курсор на позицию сразу после news_item"""
+    return encode_keyset(news_item.created_at, news_item.id)
+
+
+def decode_cursor(cursor):
+    """Разбирает курсор обратно в (created_at, id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        created_at = datetime.fromisoformat(payload["c"]) if payload["c"] else None
+        return created_at, int(payload["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Некорректный курсор: {cursor}") from e
+
+
+def keyset_order(timestamp_column, id_column, descending=False):
+    """
+    ORDER BY для keyset-пагинации. Строки без времени идут в конце при возрастании и
+    в начале при убывании - так же, как их хранит индекс PostgreSQL.
+    """
+    if descending:
+        return timestamp_column.desc().nulls_first(), id_column.desc()
+    return timestamp_column.asc().nulls_last(), id_column.asc()
+
+
+def keyset_after(timestamp_column, id_column, timestamp, key, descending=False):
+    """
+    Условие "строго после позиции курсора" в порядке keyset_order. Сравнение кортежей с
+    NULL не работает, поэтому строки без времени (и курсор на такой строке) разбираются отдельно.
+    """
+    if descending:
+        if timestamp is None:
+            return or_(timestamp_column.isnot(None), and_(timestamp_column.is_(None), id_column < key))
+        return tuple_(timestamp_column, id_column) < tuple_(timestamp, key)
+    if timestamp is None:
+        return and_(timestamp_column.is_(None), id_column > key)
+    return or_(tuple_(timestamp_column, id_column) > tuple_(timestamp, key), timestamp_column.is_(None))
+
+
+def clamp_page_size(limit):
+    """Ограничивает размер страницы разумными пределами"""
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def paginate_news(query, limit=None, cursor=None):
+    """
+    Применяет keyset-пагинацию к запросу по News (новые сверху).
+    Возвращает (строки страницы, есть ли следующая страница).
+    """
+    limit = clamp_page_size(limit)
+    if cursor:
+        created_at, news_id = decode_cursor(cursor)
+        query = query.filter(keyset_after(News.created_at, News.id, created_at, news_id, descending=True))
+
+    # Берём на одну строку больше, чтобы понять, есть ли следующая страница
+    rows = query.order_by(*keyset_order(News.created_at, News.id, descending=True)).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    return rows[:limit], has_more
+
+
+def get_approved_feed_page(user_id=None, limit=None, cursor=None):
+    """Страница одобренных новостей со счётчиками (не больше трёх запросов на страницу)"""
+    rows, has_more = paginate_news(News.query.filter(News.is_approved.is_(True)), limit, cursor)
+    return {
+        "items": serialize_feed(rows, user_id),
+        "next_cursor": encode_cursor(rows[-1]) if has_more else None,
+    }
+
+
+def get_moderation_page(limit=None, cursor=None):
+    """Страница новостей, ожидающих модерации"""
+    rows, has_more = paginate_news(News.query.filter(News.is_approved.is_(False)), limit, cursor)
+    return {
+        "items": [item.to_dict() for item in rows],
+        "next_cursor": encode_cursor(rows[-1]) if has_more else None,
+    }
@@ -0,0 +1,416 @@
+# ingest.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+
+from db.models import db, News
+from db.media_store import register_media, attach_media
+from db.dialect import upsert_insert
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class IngestQueue:
+    """
+    Надёжная локальная очередь (SQLite в режиме WAL) между слушателем Telethon и записью в БД.
+
+    Сообщение проходит два этапа, каждый фиксируется на диске:
+      messages - id сообщения принят слушателем, медиа ещё не скачаны;
+      posts    - пост собран (альбом целиком, файлы скачаны), ждёт записи в News.
+    После падения процесса messages заново запрашиваются у Telegram по id, а posts
+    дописывает IngestWriter. channel_state хранит по каждому каналу id последнего
+    записанного в БД сообщения (last_message_id) и границу догона (catch_up_floor):
+    все сообщения до неё включительно уже приняты в очередь. Догон после простоя
+    начинается только от catch_up_floor - last_message_id сдвигают и живые сообщения,
+    пришедшие, пока догон ещё не дочитал старую историю.
+    """
+
+    def __init__(self, path="db/ingest_queue.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS messages (
+                chat_id INTEGER NOT NULL,
+                message_id INTEGER NOT NULL,
+                grouped_id INTEGER,
+                received_at REAL NOT NULL,
+                PRIMARY KEY (chat_id, message_id)
+            );
+            CREATE TABLE IF NOT EXISTS posts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chat_id INTEGER NOT NULL,
+                message_id INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS channel_state (
+                chat_id INTEGER PRIMARY KEY,
+                last_message_id INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS scraper_state (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS dead_posts (
+                id INTEGER PRIMARY KEY,
+                chat_id INTEGER NOT NULL,
+                message_id INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                error TEXT,
+                failed_at REAL NOT NULL
+            );
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(channel_state)")}
+        if "catch_up_floor" not in columns:
+            # Очередь, созданная до появления границы догона
+            self._conn.execute("ALTER TABLE channel_state ADD COLUMN catch_up_floor INTEGER")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(posts)")}
+        if "attempts" not in columns:
+            # Очередь, созданная до счётчика попыток
+            self._conn.execute("ALTER TABLE posts ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+
+    def add_message(self, chat_id, message_id, grouped_id=None):
+        """Фиксирует принятое сообщение до любой сетевой работы с ним"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO messages (chat_id, message_id, grouped_id, received_at) VALUES (?, ?, ?, ?)",
+                (chat_id, message_id, grouped_id, time.time()),
+            )
+
+    def pending_messages(self):
+        """Сообщения, для которых пост ещё не собран: {chat_id: [(message_id, grouped_id), ...]}"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chat_id, message_id, grouped_id FROM messages ORDER BY chat_id, message_id"
+            ).fetchall()
+        pending = {}
+        for chat_id, message_id, grouped_id in rows:
+            pending.setdefault(chat_id, []).append((message_id, grouped_id))
+        return pending
+
+    def complete_download(self, chat_id, message_ids, payload):
+        """Атомарно заменяет сообщения собранным постом (payload - словарь для IngestWriter)"""
+        payload = dict(payload, message_ids=sorted(message_ids))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "DELETE FROM messages WHERE chat_id = ? AND message_id = ?",
+                    [(chat_id, message_id) for message_id in message_ids],
+                )
+                self._conn.execute(
+                    "INSERT INTO posts (chat_id, message_id, payload) VALUES (?, ?, ?)",
+                    (chat_id, min(message_ids), json.dumps(payload, ensure_ascii=False)),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def drop_messages(self, chat_id, message_ids):
+        """Убирает сообщения, которые больше не существуют в канале"""
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM messages WHERE chat_id = ? AND message_id = ?",
+                [(chat_id, message_id) for message_id in message_ids],
+            )
+
+    def fetch_posts(self, limit):
+        """Самые старые собранные посты: [(id, chat_id, message_id, payload), ...]"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, chat_id, message_id, payload FROM posts ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        return [(post_id, chat_id, message_id, json.loads(payload)) for post_id, chat_id, message_id, payload in rows]
+
+    def ack_posts(self, posts):
+        """Удаляет записанные в БД посты и продвигает channel_state. posts - строки fetch_posts"""
+        last_ids = {}
+        for _, chat_id, message_id, payload in posts:
+            # Альбом записан под id первой части, но прочитан канал до последней
+            last_id = max(payload.get("message_ids") or [message_id])
+            last_ids[chat_id] = max(last_ids.get(chat_id, 0), last_id)
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("DELETE FROM posts WHERE id = ?", [(post[0],) for post in posts])
+                self._conn.executemany(
+                    """
+                    INSERT INTO channel_state (chat_id, last_message_id) VALUES (?, ?)
+                    ON CONFLICT (chat_id) DO UPDATE SET last_message_id = MAX(last_message_id, excluded.last_message_id)
+                    """,
+                    list(last_ids.items()),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def fail_post(self, post_id, error, max_attempts):
+        """
+        Отмечает неудачную запись поста. После max_attempts попыток пост переносится
+        в dead_posts и больше не задерживает очередь. Возвращает True, если перенесён.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("UPDATE posts SET attempts = attempts + 1 WHERE id = ?", (post_id,))
+                row = self._conn.execute(
+                    "SELECT chat_id, message_id, payload, attempts FROM posts WHERE id = ?", (post_id,)
+                ).fetchone()
+                dead = row is not None and row[3] >= max_attempts
+                if dead:
+                    self._conn.execute(
+                        """
+                        INSERT OR REPLACE INTO dead_posts (id, chat_id, message_id, payload, attempts, error, failed_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        (post_id, *row, str(error)[:2000], time.time()),
+                    )
+                    self._conn.execute("DELETE FROM posts WHERE id = ?", (post_id,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return dead
+
+    def dead_post_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM dead_posts").fetchone()[0]
+
+    def last_message_id(self, chat_id):
+        """id последнего записанного в БД сообщения канала или 0. Не годится как начало догона"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_message_id FROM channel_state WHERE chat_id = ?", (chat_id,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def catch_up_floor(self, chat_id):
+        """Граница догона канала (см. advance_catch_up_floor) или None, если догон ещё не проходил"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT catch_up_floor FROM channel_state WHERE chat_id = ?", (chat_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def advance_catch_up_floor(self, chat_id, message_id):
+        """
+        Сдвигает границу догона: все сообщения канала до message_id включительно уже
+        зафиксированы в очереди. Вызывается только догоном после каждой непрерывной страницы.
+        """
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO channel_state (chat_id, last_message_id, catch_up_floor) VALUES (?, 0, ?)
+                ON CONFLICT (chat_id) DO UPDATE
+                SET catch_up_floor = MAX(COALESCE(catch_up_floor, 0), excluded.catch_up_floor)
+                """,
+                (chat_id, message_id),
+            )
+
+    # ---------------------------------------------------------------------------
+    # Обмен состоянием между процессом скрейпера и веб-воркерами
+    # ---------------------------------------------------------------------------
+
+    def set_state(self, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO scraper_state (key, value, updated_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time()),
+            )
+
+    def get_state(self, key):
+        """(значение, возраст в секундах) или (None, None)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, updated_at FROM scraper_state WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None, None
+        return json.loads(row[0]), time.time() - row[1]
+
+    def pop_state(self, key):
+        """Забирает значение (например, запрос на догон) и удаляет его"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM scraper_state WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("DELETE FROM scraper_state WHERE key = ?", (key,))
+        return json.loads(row[0])
+
+    def post_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+
+def get_ingest_queue(app):
+    """Очередь из INGEST_QUEUE_PATH, одна на процесс (для веб-воркеров)"""
+    queue = app.extensions.get("ingest_queue")
+    if queue is None:
+        queue = app.extensions["ingest_queue"] = IngestQueue(app.config.get("INGEST_QUEUE_PATH", "db/ingest_queue.db"))
+    return queue
+
+
+class IngestWriter:
+    """
+    Фоновый поток, который пачками переносит собранные посты из IngestQueue в News.
+
+    Файлы к этому моменту уже лежат в хранилище по хэшу (db/media_store.py), здесь
+    только регистрируются их записи Media; все News пачки вставляются одной транзакцией.
+    Пост удаляется из очереди только после коммита; повтор после падения между коммитом
+    и ack отсекает уникальный индекс news (channel_id, telegram_message_id).
+    Если пачка не записалась, посты пишутся по одному: сбойный пост получает попытку,
+    а после max_attempts уходит в dead_posts, не задерживая остальные. Ошибка соединения
+    с БД (OperationalError) попыток не тратит - пачка повторяется через interval.
+    on_saved(news_id, paths) вызывается после коммита для каждой новой новости.
+    """
+
+    def __init__(self, queue, app, batch_size=50, interval=1.0, max_attempts=5, on_saved=None):
+        self.queue = queue
+        self.app = app
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.on_saved = on_saved
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ingest-writer", daemon=True)
+            self._thread.start()
+            logger.info(f"[IngestWriter] Запущен: пачки по {self.batch_size}, в очереди постов: {self.queue.post_count()}")
+
+    def wake(self):
+        """Просит записать очередь, не дожидаясь интервала"""
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                # Пишем, пока очередь не опустеет, а не по одной пачке за интервал
+                while self.flush() == self.batch_size:
+                    pass
+            except Exception as e:
+                logger.error(f"[IngestWriter] Ошибка записи: {e}")
+
+    def flush(self):
+        """Записывает одну пачку постов. Возвращает число взятых из очереди постов"""
+        posts = self.queue.fetch_posts(self.batch_size)
+        if not posts:
+            return 0
+
+        with self.app.app_context():
+            try:
+                saved = self._commit(posts)
+            except OperationalError:
+                raise
+            except Exception as e:
+                logger.warning(f"[IngestWriter] Пачка из {len(posts)} постов не записана ({e}), пишем по одному")
+                saved = self._write_one_by_one(posts)
+            else:
+                self.queue.ack_posts(posts)
+            finally:
+                db.session.remove()
+
+        logger.info(f"[IngestWriter] Записано новостей: {len(saved)} из {len(posts)} постов")
+        if self.on_saved:
+            for news_id, paths in saved:
+                self.on_saved(news_id, paths)
+        return len(posts)
+
+    def _commit(self, posts):
+        try:
+            saved = self._write_batch(posts)
+            db.session.commit()
+            return saved
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def _write_one_by_one(self, posts):
+        saved = []
+        for post in posts:
+            try:
+                saved += self._commit([post])
+            except OperationalError:
+                raise
+            except Exception as e:
+                if self.queue.fail_post(post[0], e, self.max_attempts):
+                    logger.error(f"[IngestWriter] Пост {post[1]}/{post[2]} перенесён в dead_posts: {e}")
+                else:
+                    logger.warning(f"[IngestWriter] Пост {post[1]}/{post[2]} не записан: {e}")
+                continue
+            self.queue.ack_posts([post])
+        return saved
+
+    def _write_batch(self, posts):
+        rows = []
+        media_by_key = {}
+        for _, _, message_id, payload in posts:
+            media_items = []
+            for path, kind, sha256 in payload["files"]:
+                if os.path.exists(path):
+                    media_items.append(register_media(path, kind, sha256))
+                else:
+                    logger.warning(f"[IngestWriter] Файл из хранилища пропал: {path}")
+            row = news_row(payload, message_id, media_items)
+            key = (row["channel_id"], row["telegram_message_id"])
+            if key not in media_by_key:
+                media_by_key[key] = media_items
+                rows.append(row)
+
+        # Один INSERT на пачку; уже сохранённые посты (повтор после падения, догон истории)
+        # отсекает уникальный индекс (channel_id, telegram_message_id)
+        table = News.__table__
+        stmt = (
+            upsert_insert(table)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=[table.c.channel_id, table.c.telegram_message_id])
+            .returning(table.c.id, table.c.channel_id, table.c.telegram_message_id)
+        )
+        saved = []
+        for news_id, channel_id, message_id in db.session.execute(stmt).all():
+            media_items = media_by_key[(channel_id, message_id)]
+            attach_media(news_id, media_items)
+            saved.append((news_id, [media.path for media in media_items]))
+        return saved
+
+
+def news_row(payload, message_id, media_items):
+    """Строка news из собранного поста; image_url/video_url заполняются для старых клиентов"""
+    paths = [media.path for media in media_items]
+    # Одно видео - в video_url, остальное через запятую в image_url
+    if len(media_items) == 1 and media_items[0].kind == "video":
+        image_url, video_url = None, paths[0]
+    else:
+        image_url, video_url = ",".join(paths) or None, None
+
+    text = payload.get("text") or ""
+    return {
+        "channel_id": payload["channel_id"],
+        "telegram_message_id": message_id,
+        "title": text[:50] if len(text) > 50 else text,
+        "text": text,
+        "image_url": image_url,
+        "video_url": video_url,
+        "is_approved": False,
+    }
@@ -0,0 +1,104 @@
+# inventory.py
+import logging
+from datetime import datetime
+
+from sqlalchemy import func
+
+from db.models import db, Item, InventoryEntry
+from db.dialect import upsert_insert
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class OutOfStock(Exception):
+    """Выдача предмета превысила бы его тираж (Item.default_quantity)"""
+
+
+def _lock_item(item_id):
+    """Блокирует строку предмета до конца транзакции: выдачи одного предмета идут по очереди"""
+    return (
+        db.session.query(Item.id, Item.default_quantity)
+        .filter(Item.id == item_id)
+        .with_for_update()
+        .first()
+    )
+
+
+def items_in_circulation(item_id):
+    """Сколько экземпляров предмета уже выдано всем пользователям"""
+    return (
+        db.session.query(func.coalesce(func.sum(InventoryEntry.quantity), 0))
+        .filter(InventoryEntry.item_id == item_id)
+        .scalar()
+    )
+
+
+def grant_item(user_id, item_id, quantity=1):
+    """
+    Атомарно выдаёт пользователю quantity экземпляров предмета (UPSERT).
+    Проверяет тираж Item.default_quantity под блокировкой строки предмета.
+    Не коммитит. Возвращает новое количество у пользователя.
+    """
+    if quantity < 1:
+        raise ValueError("quantity должно быть положительным")
+
+    item = _lock_item(item_id)
+    if item is None:
+        raise ValueError(f"Предмет {item_id} не найден")
+
+    if item.default_quantity is not None:
+        issued = items_in_circulation(item_id)
+        if issued + quantity > item.default_quantity:
+            raise OutOfStock(f"Предмет {item_id}: выдано {issued} из {item.default_quantity}")
+
+    table = InventoryEntry.__table__
+    stmt = upsert_insert(table).values(
+        user_id=user_id, item_id=item_id, quantity=quantity, acquired_at=datetime.utcnow()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.item_id],
+        set_={"quantity": table.c.quantity + stmt.excluded.quantity},
+    ).returning(table.c.quantity)
+    return db.session.execute(stmt).scalar()
+
+
+def revoke_item(user_id, item_id, quantity=None):
+    """
+    Забирает у пользователя quantity экземпляров (или все, если quantity=None).
+    Не коммитит. Возвращает False и ничего не меняет, если предмета нет или
+    экземпляров меньше quantity.
+    """
+    if quantity is not None and quantity < 1:
+        raise ValueError("quantity должно быть положительным")
+
+    table = InventoryEntry.__table__
+    owned = (table.c.user_id == user_id) & (table.c.item_id == item_id)
+
+    if quantity is not None:
+        # Экземпляров больше - уменьшаем количество одним UPDATE
+        updated = db.session.execute(
+            table.update()
+            .where(owned & (table.c.quantity > quantity))
+            .values(quantity=table.c.quantity - quantity)
+        ).rowcount
+        if updated:
+            return True
+        # Ровно quantity - забираем последние, удаляя запись; меньше - отказ
+        return bool(db.session.execute(
+            table.delete().where(owned & (table.c.quantity == quantity))
+        ).rowcount)
+
+    return bool(db.session.execute(table.delete().where(owned)).rowcount)
+
+
+def get_item_owner_ids(item_id, limit=None):
+    """id пользователей, владеющих предметом (по индексу inventory_entries.item_id)"""
+    query = (
+        db.session.query(InventoryEntry.user_id)
+        .filter(InventoryEntry.item_id == item_id)
+        .order_by(InventoryEntry.acquired_at)
+    )
+    if limit:
+        query = query.limit(limit)
+    return [row[0] for row in query]
@@ -0,0 +1,105 @@
+# likes.py
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from db.models import db, Like
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class LikedIdsCache:
+    """
+    Кэш множества лайкнутых новостей на пользователя (LRU + TTL).
+    Сбрасывается на like/unlike в этом процессе; в других процессах запись
+    устаревает не позже чем через ttl секунд.
+    """
+
+    def __init__(self, ttl=60, max_users=10000):
+        self.ttl = ttl
+        self.max_users = max_users
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # user_id -> (expires_at, frozenset(news_id))
+
+    def init_app(self, app):
+        self.enabled = app.config.get("LIKE_CACHE_ENABLED", self.enabled)
+        self.ttl = app.config.get("LIKE_CACHE_TTL_SECONDS", self.ttl)
+        self.max_users = app.config.get("LIKE_CACHE_MAX_USERS", self.max_users)
+        app.extensions["liked_ids_cache"] = self
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, liked = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return liked
+
+    def set(self, user_id, liked):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, frozenset(liked))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+liked_ids_cache = LikedIdsCache()
+
+
+def get_liked_news_ids(user_id, news_ids):
+    """
+    Возвращает множество id из news_ids, которые лайкнул пользователь.
+    Один запрос по индексу likes(user_id, news_id) или ноль при попадании в кэш.
+    """
+    news_ids = set(news_ids)
+    if not user_id or not news_ids:
+        return set()
+    user_id = int(user_id)
+
+    if liked_ids_cache.enabled:
+        liked = liked_ids_cache.get(user_id)
+        if liked is None:
+            # Кэшируем все лайки пользователя: их немного, а страница ленты меняется
+            liked = {row[0] for row in db.session.query(Like.news_id).filter(Like.user_id == user_id)}
+            liked_ids_cache.set(user_id, liked)
+        return news_ids & liked
+
+    rows = (
+        db.session.query(Like.news_id)
+        .filter(Like.user_id == user_id, Like.news_id.in_(news_ids))
+    )
+    return {row[0] for row in rows}
+
+
+def invalidate_user_likes(user_id):
+    """Сбрасывает кэш лайков пользователя (вызывать после like/unlike)"""
+    if user_id:
+        liked_ids_cache.invalidate(int(user_id))
+
+
+def is_liked(user_id, news_id):
+    """Лайкнул ли пользователь одну новость (тот же путь, что и для ленты)"""
+    return news_id in get_liked_news_ids(user_id, [news_id])
+
+
+def is_duplicate_like(error):
+    """IntegrityError вызван именно уникальным индексом uq_likes_user_news (а не, например, внешним ключом)"""
+    orig = getattr(error, "orig", error)
+    diag = getattr(orig, "diag", None)
+    if diag is not None:
+        # PostgreSQL (psycopg2) называет нарушенное ограничение
+        return getattr(diag, "constraint_name", None) == "uq_likes_user_news"
+    message = str(orig)
+    # SQLite: "UNIQUE constraint failed: likes.user_id, likes.news_id"
+    return "UNIQUE constraint failed" in message and "likes.user_id" in message
@@ -0,0 +1,152 @@
+# media_store.py
+import hashlib
+import logging
+import mimetypes
+import os
+
+from sqlalchemy.orm import joinedload
+
+from db.models import db, News, Media, NewsMedia
+from db.dialect import upsert_insert
+
+try:
+    from PIL import Image
+except ImportError:  # Без Pillow размеры фото не заполняются
+    Image = None
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+MEDIA_STORE_DIR = "static/media"
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path):
+    """sha256 файла, читая его кусками"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def store_path(sha256, extension, store_dir=MEDIA_STORE_DIR):
+    """static/media/ab/abcdef....jpg - две буквы хэша в имени папки, чтобы не копить миллион файлов в одной"""
+    return os.path.join(store_dir, sha256[:2], f"{sha256}{extension.lower()}").replace(os.sep, "/")
+
+
+def _image_size(path):
+    if Image is None:
+        return None, None
+    try:
+        with Image.open(path) as image:
+            return image.size
+    except Exception:
+        return None, None
+
+
+def register_media(path, kind, sha256=None):
+    """
+    Запись Media для файла, который уже лежит на своём месте. Если такие байты уже
+    есть в хранилище, возвращается существующая запись. Не коммитит.
+    """
+    sha256 = sha256 or file_sha256(path)
+    mime_type = mimetypes.guess_type(path)[0]
+    width, height = _image_size(path) if kind == "photo" else (None, None)
+
+    # Два процесса могут сохранить одно и то же фото одновременно - уникальный sha256 решает, кто первый
+    stmt = upsert_insert(Media.__table__).values(
+        sha256=sha256, path=path.replace(os.sep, "/"), kind=kind, mime_type=mime_type,
+        width=width, height=height, bytes=os.path.getsize(path),
+    ).on_conflict_do_nothing(index_elements=["sha256"])
+    db.session.execute(stmt)
+    return Media.query.filter_by(sha256=sha256).one()
+
+
+def move_to_store(tmp_path, store_dir=MEDIA_STORE_DIR):
+    """
+    Переносит скачанный файл в хранилище под именем его sha256 (без обращения к БД).
+    Если такие байты уже лежат в хранилище, скачанная копия удаляется. Возвращает (путь, sha256).
+    """
+    sha256 = file_sha256(tmp_path)
+    path = store_path(sha256, os.path.splitext(tmp_path)[1], store_dir)
+    if os.path.exists(path):
+        os.remove(tmp_path)
+        logger.info(f"[move_to_store] Повтор медиа {sha256[:12]}, используем {path}")
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+    return path, sha256
+
+
+def store_file(tmp_path, kind, store_dir=MEDIA_STORE_DIR):
+    """Переносит скачанный файл в хранилище и возвращает его запись Media. Не коммитит"""
+    path, sha256 = move_to_store(tmp_path, store_dir)
+    return register_media(path, kind, sha256)
+
+
+def attach_media(news_id, media_items):
+    """Привязывает медиа к новости по порядку (position 0, 1, ...). Не коммитит"""
+    for position, media in enumerate(media_items):
+        db.session.add(NewsMedia(news_id=news_id, position=position, media_id=media.id))
+
+
+def get_news_media(news_ids):
+    """
+    Медиа для страницы новостей одним запросом по первичному ключу news_media:
+    {news_id: [Media, ...]} в порядке position. Новостей без news_media в словаре нет.
+    """
+    if not news_ids:
+        return {}
+    rows = (
+        NewsMedia.query
+        .options(joinedload(NewsMedia.media))
+        .filter(NewsMedia.news_id.in_(news_ids))
+        .order_by(NewsMedia.news_id, NewsMedia.position)
+    )
+    result = {}
+    for row in rows:
+        result.setdefault(row.news_id, []).append(row.media)
+    return result
+
+
+def backfill_news_media(batch_size=200):
+    """
+    Заполняет news_media для новостей, сохранённых до хранилища. Файлы остаются на месте:
+    первый найденный файл с данными байтами становится каноническим, повторы ссылаются на него.
+    Возвращает число новостей, получивших медиа.
+    """
+    from db.feed import split_media_urls  # db.feed сам импортирует этот модуль
+
+    has_media = db.session.query(NewsMedia.news_id).filter(NewsMedia.news_id == News.id).exists()
+    last_id = 0
+    attached = 0
+    while True:
+        news_items = (
+            News.query
+            .filter(News.id > last_id, ~has_media)
+            .order_by(News.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not news_items:
+            break
+
+        for news_item in news_items:
+            urls = split_media_urls(news_item.image_url)
+            if news_item.video_url:
+                urls.append(news_item.video_url)
+            # Новости со ссылками на чужие сайты или пропавшими файлами остаются на image_url:
+            # частичный news_media разошёлся бы по порядку с image_url у старых клиентов
+            if not urls or not all(os.path.isfile(url) for url in urls):
+                continue
+            media_items = [
+                register_media(url, "video" if (mimetypes.guess_type(url)[0] or "").startswith("video") else "photo")
+                for url in urls
+            ]
+            attach_media(news_item.id, media_items)
+            attached += 1
+        db.session.commit()
+        last_id = news_items[-1].id
+        logger.info(f"[backfill_news_media] Обработаны новости до ID={last_id}, с медиа: {attached}")
+    return attached
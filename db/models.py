@@ -20,7 +20,8 @@ class User(db.Model):
     role = db.Column(db.String(20), default="user")  # 'user' / 'moderator' / 'admin'
     glams = db.Column(db.Integer, default=0)  # Валюта глэмы
     sapphires = db.Column(db.Integer, default=0)  # Донат валюта сапфиры
-    inventory = db.Column(JSONB, default=[])  # Инвентарь пользователя (массив ID предметов)
+    # Старый инвентарь массивом ID; перенесён в inventory_entries и больше не обновляется
+    legacy_inventory = db.Column('inventory', JSONB, default=[])
     additional_data = db.Column(JSONB)
     first_name = db.Column(db.String(64))
     last_name = db.Column(db.String(64))
@@ -30,36 +31,67 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    inventory_entries = db.relationship(
+        'InventoryEntry',
+        backref='user',
+        lazy=True,
+        order_by='InventoryEntry.acquired_at',
+        cascade='all, delete-orphan'
+    )
+
     def __repr__(self):
         return f"<User {self.username}>"
 
-    def add_item_to_inventory(self, item_id):
-        """Добавляет предмет в инвентарь"""
-        if self.inventory is None:
-            self.inventory = []
-        if item_id not in self.inventory:
-            self.inventory.append(item_id)
-            db.session.commit()
-            return True
-        return False
+    @property
+    def inventory(self):
+        """ID предметов в инвентаре (из inventory_entries, в порядке получения)"""
+        return [entry.item_id for entry in self.inventory_entries]
 
-    def remove_item_from_inventory(self, item_id):
-        """Удаляет предмет из инвентаря"""
-        if self.inventory and item_id in self.inventory:
-            self.inventory.remove(item_id)
+    def add_item_to_inventory(self, item_id, quantity=1):
+        """
+        Добавляет предмет в инвентарь атомарным UPSERT с проверкой тиража.
+        Возвращает False, если предмета нет или тираж исчерпан.
+        """
+        from db.inventory import grant_item, OutOfStock
+        try:
+            grant_item(self.id, item_id, quantity)
             db.session.commit()
-            return True
-        return False
+        except (OutOfStock, ValueError) as e:
+            db.session.rollback()
+            logger.warning(f"[add_item_to_inventory] user={self.id}, item={item_id}: {e}")
+            return False
+        db.session.expire(self, ['inventory_entries'])
+        return True
+
+    def remove_item_from_inventory(self, item_id, quantity=None):
+        """
+        Удаляет предмет из инвентаря (quantity экземпляров или все).
+        Возвращает False, если предмета нет или экземпляров меньше quantity.
+        """
+        from db.inventory import revoke_item
+        try:
+            removed = revoke_item(self.id, item_id, quantity)
+        except ValueError as e:
+            logger.warning(f"[remove_item_from_inventory] user={self.id}, item={item_id}: {e}")
+            return False
+        if not removed:
+            logger.warning(
+                f"[remove_item_from_inventory] user={self.id}, item={item_id}: "
+                f"нет {quantity or 'ни одного'} экз. для списания"
+            )
+            return False
+        db.session.commit()
+        db.session.expire(self, ['inventory_entries'])
+        return True
 
     def has_item(self, item_id):
-        """Проверяет, есть ли предмет в инвентаре"""
-        return self.inventory and item_id in self.inventory
+        """Проверяет, есть ли предмет в инвентаре (поиск по первичному ключу)"""
+        return db.session.get(InventoryEntry, (self.id, item_id)) is not None
 
     def get_inventory_items(self):
-        """Получает все предметы из инвентаря"""
-        if not self.inventory:
-            return []
-        return Item.query.filter(Item.id.in_(self.inventory)).all()
+        """Получает все предметы из инвентаря (готовые словари из кэша каталога, без запроса к БД)"""
+        from db.catalog import item_catalog
+        return item_catalog.get_many(self.inventory)
 
     def to_dict(self, include_items=False):
         """
@@ -85,9 +117,8 @@ class User(db.Model):
         }
         
         if include_items and self.inventory:
-            # Получаем полную информацию о предметах
-            items = Item.query.filter(Item.id.in_(self.inventory)).all()
-            data["inventory_items"] = [item.to_dict() for item in items]
+            # Полная информация о предметах берётся из кэша каталога
+            data["inventory_items"] = self.get_inventory_items()
         
         return data
 
@@ -124,6 +155,42 @@ class Item(db.Model):
         }
 
 
+class InventoryEntry(db.Model):
+    """Предмет в инвентаре пользователя"""
+    __tablename__ = 'inventory_entries'
+    __table_args__ = (
+        # Кто владеет предметом X / сколько экземпляров выдано
+        db.Index('ix_inventory_entries_item_id', 'item_id'),
+    )
+
+    user_id = db.Column(db.BigInteger, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('items.id', ondelete='CASCADE'), primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=1)
+    acquired_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<InventoryEntry user_id={self.user_id} item_id={self.item_id} quantity={self.quantity}>"
+
+    def to_dict(self):
+        return {
+            "user_id": self.user_id,
+            "item_id": self.item_id,
+            "quantity": self.quantity,
+            "acquired_at": self.acquired_at.isoformat() if self.acquired_at else None
+        }
+
+
+class CatalogVersion(db.Model):
+    """Номер версии каталога предметов: меняется при любом изменении items (см. db/catalog.py)"""
+    __tablename__ = 'catalog_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CatalogVersion {self.version}>"
+
+
 class Brand(db.Model):
     __tablename__ = 'brands'
 
@@ -163,6 +230,12 @@ class Brand(db.Model):
 
 class BrandMember(db.Model):
     __tablename__ = 'brand_members'
+    __table_args__ = (
+        # Постраничный список участников бренда в порядке вступления
+        db.Index('ix_brand_members_brand_joined_user', 'brand_id', 'joined_at', 'user_id'),
+        # Бренды пользователя
+        db.Index('ix_brand_members_user_id', 'user_id'),
+    )
 
     brand_id = db.Column(db.Integer, db.ForeignKey('brands.id'), primary_key=True)
     user_id = db.Column(db.BigInteger, db.ForeignKey('users.id'), primary_key=True)
@@ -187,6 +260,13 @@ class BrandMember(db.Model):
 
 class News(db.Model):
     __tablename__ = 'news'
+    __table_args__ = (
+        # Keyset-пагинация ленты: WHERE is_approved ORDER BY created_at DESC, id DESC
+        db.Index('ix_news_approved_created_at_id', 'is_approved', 'created_at', 'id'),
+        db.Index('ix_news_created_at_id', 'created_at', 'id'),
+        # Одно сообщение канала - одна новость: повторная запись скрейпером ничего не делает
+        db.Index('uq_news_channel_message', 'channel_id', 'telegram_message_id', unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     channel_id = db.Column(db.String(255), nullable=True)  # ID или username канала, откуда взято
@@ -200,6 +280,18 @@ class News(db.Model):
     is_approved = db.Column(db.Boolean, default=False)  # Статус модерации
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Денормализованные счётчики, обновляются в одной транзакции с likes/news_views/comments
+    # (см. db/counters.py), пересчитываются командой `flask reconcile-counters`
+    likes_count = db.Column(db.Integer, nullable=False, default=0)
+    viewers_count = db.Column(db.Integer, nullable=False, default=0)
+    comment_count = db.Column(db.Integer, nullable=False, default=0)
+    # Приблизительное число уникальных зрителей (оценка HyperLogLog из news_viewer_sketches)
+    unique_viewers_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # Уменьшенные копии медиа для srcset (fck_app/media_variants.py):
+    # {путь оригинала: {"srcset": {формат: [[ширина, путь], ...]}, "lqip": data-URI, ...}}
+    media_variants = db.Column(JSONB, nullable=True)
+
     def __repr__(self):
         return f"<News id={self.id} channel={self.channel_id} approved={self.is_approved}>"
 
@@ -217,10 +309,63 @@ class News(db.Model):
         }
 
 
+class Media(db.Model):
+    """Файл медиа в хранилище, адресуемом по содержимому: одинаковые байты хранятся один раз"""
+    __tablename__ = 'media'
+
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), nullable=False, unique=True)
+    path = db.Column(db.String(500), nullable=False)  # Путь к файлу относительно корня приложения
+    kind = db.Column(db.String(16), nullable=False)  # photo / video
+    mime_type = db.Column(db.String(100), nullable=True)
+    width = db.Column(db.Integer, nullable=True)
+    height = db.Column(db.Integer, nullable=True)
+    bytes = db.Column(db.BigInteger, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Media id={self.id} kind={self.kind} sha256={self.sha256[:12]}>"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "url": self.path,
+            "kind": self.kind,
+            "mime_type": self.mime_type,
+            "width": self.width,
+            "height": self.height,
+            "bytes": self.bytes
+        }
+
+
+class NewsMedia(db.Model):
+    """Медиа новости по порядку: альбом - несколько строк с position 0, 1, ..."""
+    __tablename__ = 'news_media'
+    __table_args__ = (
+        # В каких новостях используется файл (повторы одного фото в разных каналах)
+        db.Index('ix_news_media_media_id', 'media_id'),
+    )
+
+    news_id = db.Column(db.Integer, db.ForeignKey('news.id', ondelete='CASCADE'), primary_key=True)
+    position = db.Column(db.Integer, primary_key=True)
+    media_id = db.Column(db.Integer, db.ForeignKey('media.id'), nullable=False)
+
+    media = db.relationship('Media')
+
+    def __repr__(self):
+        return f"<NewsMedia news_id={self.news_id} position={self.position} media_id={self.media_id}>"
+
+
 # ----------------------------------------------------------------------------------
 
 class Comment(db.Model):
     __tablename__ = 'comments'
+    __table_args__ = (
+        # Страница корневых веток: WHERE news_id AND parent_id IS NULL ORDER BY created_at, id
+        db.Index('ix_comments_news_parent_created_id', 'news_id', 'parent_id', 'created_at', 'id'),
+        # Обход ответов в рекурсивном запросе дерева
+        db.Index('ix_comments_parent_id', 'parent_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.BigInteger, db.ForeignKey('users.id'), nullable=False)
@@ -257,6 +402,10 @@ class Comment(db.Model):
 
 class Like(db.Model):
     __tablename__ = 'likes'
+    __table_args__ = (
+        # Один лайк на пару пользователь/новость; заодно индекс для пакетной проверки лайков
+        db.UniqueConstraint('user_id', 'news_id', name='uq_likes_user_news'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.BigInteger, db.ForeignKey('users.id'), nullable=False)
@@ -273,11 +422,17 @@ class Like(db.Model):
 
 class NewsView(db.Model):
     __tablename__ = 'news_views'
+    __table_args__ = (
+        # Один просмотр пары пользователь/новость на окно VIEW_MIN_INTERVAL_SECONDS -
+        # общая для всех веб-воркеров дедупликация (см. db/view_buffer.py)
+        db.Index('uq_news_views_user_bucket', 'news_id', 'user_id', 'view_bucket', unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.BigInteger, db.ForeignKey('users.id'), nullable=False)
     news_id = db.Column(db.Integer, db.ForeignKey('news.id'), nullable=False)
     viewed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    view_bucket = db.Column(db.BigInteger)  # viewed_at // VIEW_MIN_INTERVAL_SECONDS
 
     # Опционально, чтобы иметь relationship
     user = db.relationship('User', backref='views')
@@ -294,6 +449,38 @@ class NewsView(db.Model):
             "viewed_at": self.viewed_at.isoformat() if self.viewed_at else None
         }
 
+class NewsViewerSketch(db.Model):
+    """HyperLogLog-скетч уникальных зрителей новости (см. db/hll.py)"""
+    __tablename__ = 'news_viewer_sketches'
+
+    news_id = db.Column(db.Integer, db.ForeignKey('news.id', ondelete='CASCADE'), primary_key=True)
+    registers = db.Column(db.LargeBinary, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<NewsViewerSketch news_id={self.news_id}>"
+
+
+class NewsViewDaily(db.Model):
+    """Дневной агрегат просмотров: сюда сворачиваются старые строки news_views"""
+    __tablename__ = 'news_view_daily'
+
+    news_id = db.Column(db.Integer, db.ForeignKey('news.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    views = db.Column(db.Integer, nullable=False, default=0)
+    unique_viewers = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<NewsViewDaily news_id={self.news_id} day={self.day} views={self.views}>"
+
+    def to_dict(self):
+        return {
+            "news_id": self.news_id,
+            "day": self.day.isoformat() if self.day else None,
+            "views": self.views,
+            "unique_viewers": self.unique_viewers
+        }
+
 # ----------------------------------------------------------------------------------
 
 class Friend(db.Model):
@@ -333,7 +520,7 @@ class Friend(db.Model):
 
 
 def save_user_data(user_data):
-    """Сохранение данных пользователя в БД."""
+    """Сохранение данных пользователя в БД. Роль существующего пользователя не меняется."""
     try:
         user_id = user_data.get("id")  # Telegram ID
         username = user_data.get("username", "unknown")
@@ -355,7 +542,6 @@ def save_user_data(user_data):
             # Обновляем все поля
             existing_user.username = username
             existing_user.photo_url = photo_url
-            existing_user.role = role
             existing_user.first_name = first_name
             existing_user.last_name = last_name
             existing_user.language_code = language_code
@@ -381,8 +567,7 @@ def save_user_data(user_data):
                 is_verified=is_verified,
                 additional_data=user_data.get("additional_data", {}),
                 glams=0,
-                sapphires=0,
-                inventory=[]
+                sapphires=0
             )
             db.session.add(new_user)
 
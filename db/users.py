@@ -0,0 +1,59 @@
+# users.py
+import logging
+from datetime import datetime
+
+from sqlalchemy import func
+
+from db.models import db, User
+from db.dialect import upsert_insert
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+# Поля профиля Telegram, которые обновляются у существующего пользователя (как в POST /get_user_data)
+PROFILE_FIELDS = ("username", "photo_url", "first_name", "last_name", "language_code")
+
+
+def upsert_users(users_data):
+    """
+    Создаёт или обновляет пачку пользователей одним INSERT ... ON CONFLICT.
+    Новые получают значения по умолчанию, у существующих обновляются только непустые
+    поля профиля; роль и валюты не трогаются. Не коммитит. Возвращает число строк.
+    """
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    rows = {}
+    for user_data in users_data:
+        user_id = int(user_data["id"])
+        # Повтор одного пользователя в пачке - берём последние данные
+        rows[user_id] = {
+            "id": user_id,
+            "username": user_data.get("username") or f"user_{user_id}",
+            "photo_url": user_data.get("photo_url"),
+            "first_name": user_data.get("first_name") or "",
+            "last_name": user_data.get("last_name") or "",
+            "language_code": user_data.get("language_code") or "en",
+            "role": "user",
+            "glams": 0,
+            "sapphires": 0,
+            "is_premium": bool(user_data.get("is_premium")),
+            "is_verified": bool(user_data.get("is_verified")),
+            "additional_data": {"registration_date": now, "last_active": now},
+        }
+    if not rows:
+        return 0
+
+    table = User.__table__
+    stmt = upsert_insert(table).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={
+            **{
+                field: func.coalesce(func.nullif(stmt.excluded[field], ""), table.c[field])
+                for field in PROFILE_FIELDS
+            },
+            "updated_at": datetime.utcnow(),
+        },
+    )
+    db.session.execute(stmt)
+    logger.info(f"[upsert_users] Сохранено пользователей: {len(rows)}")
+    return len(rows)
@@ -0,0 +1,194 @@
+# view_buffer.py
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from db.models import db, News, User, NewsView
+from db.counters import increment_counter
+from db.viewers import add_viewers
+from db.dialect import upsert_insert
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class ViewBuffer:
+    """
+    Буфер просмотров новостей с отложенной записью (write-behind).
+
+    Просмотры сначала дедуплицируются в памяти (не чаще одного раза в min_interval секунд
+    на пару пользователь/новость), а затем фоновым потоком пишутся в news_views пачкой
+    одним multi-row INSERT - раз в flush_interval секунд или сразу при накоплении max_batch.
+    flush_interval - это и есть окно возможной потери при аварийном завершении процесса.
+
+    Память у каждого воркера gunicorn своя, поэтому окончательно повторы отсекает
+    уникальный индекс (news_id, user_id, view_bucket) при записи: INSERT ... ON CONFLICT
+    DO NOTHING, счётчики растут только на реально вставленные строки.
+    Поток сброса запускается при первом просмотре - бот и скрейпер, которые тоже
+    вызывают create_app(), его не держат.
+    """
+
+    def __init__(self, app=None, flush_interval=5, max_batch=500, max_pending=50000, min_interval=30):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.min_interval = min_interval
+
+        self._lock = threading.Lock()
+        self._pending = []          # [(news_id, user_id, viewed_at)]
+        self._pending_counts = Counter()  # news_id -> число просмотров в _pending
+        self._last_seen = {}        # (news_id, user_id) -> time.monotonic() последнего принятого просмотра
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._app = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Читает настройки из конфига приложения"""
+        self._app = app
+        self.flush_interval = app.config.get("VIEW_BUFFER_FLUSH_SECONDS", self.flush_interval)
+        self.max_batch = app.config.get("VIEW_BUFFER_MAX_BATCH", self.max_batch)
+        self.max_pending = app.config.get("VIEW_BUFFER_MAX_PENDING", self.max_pending)
+        self.min_interval = app.config.get("VIEW_MIN_INTERVAL_SECONDS", self.min_interval)
+        app.extensions["view_buffer"] = self
+
+    def _start(self):
+        """Запускает фоновый поток сброса (вызывается под блокировкой)"""
+        self._thread = threading.Thread(target=self._run, name="view-buffer-flusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+        logger.info(
+            f"[ViewBuffer] Запущен: сброс каждые {self.flush_interval} сек. "
+            f"или по {self.max_batch} просмотров"
+        )
+
+    def record(self, news_id, user_id):
+        """
+        Принимает просмотр в буфер.
+        Возвращает True, если просмотр засчитан, и False, если он попал в окно дедупликации
+        этого процесса (повтор через другой воркер отсекается только при записи).
+        """
+        key = (news_id, user_id)
+        now = time.monotonic()
+        with self._lock:
+            if self._thread is None:
+                self._start()
+            last = self._last_seen.get(key)
+            if last is not None and now - last <= self.min_interval:
+                return False
+            if len(self._pending) >= self.max_pending:
+                logger.error(f"[ViewBuffer] Буфер переполнен ({self.max_pending}), просмотр отброшен: {key}")
+                return False
+            self._last_seen[key] = now
+            self._pending.append((news_id, user_id, datetime.utcnow()))
+            self._pending_counts[news_id] += 1
+            should_flush = len(self._pending) >= self.max_batch
+
+        if should_flush:
+            self._wakeup.set()
+        return True
+
+    def pending_for(self, news_id):
+        """Количество ещё не записанных в БД просмотров новости"""
+        with self._lock:
+            return self._pending_counts[news_id]
+
+    def flush(self):
+        """Записывает накопленные просмотры в БД. Возвращает количество вставленных строк."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._pending_counts = Counter()
+            self._forget_expired()
+        if not batch:
+            return 0
+
+        if self._app is None:
+            logger.error("[ViewBuffer] flush() без init_app(), просмотры потеряны")
+            return 0
+
+        with self._app.app_context():
+            try:
+                inserted = self._write_batch(batch)
+                db.session.commit()
+                logger.debug(f"[ViewBuffer] Записано просмотров: {inserted}")
+                return inserted
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"[ViewBuffer] Ошибка записи пачки из {len(batch)} просмотров: {e}")
+                self._requeue(batch)
+                return 0
+            finally:
+                db.session.remove()
+
+    def _write_batch(self, batch):
+        news_ids = {news_id for news_id, _, _ in batch}
+        user_ids = {user_id for _, user_id, _ in batch}
+
+        # Отбрасываем просмотры несуществующих новостей/пользователей, чтобы одна
+        # битая строка не откатила всю пачку по внешнему ключу
+        known_news = {row[0] for row in db.session.query(News.id).filter(News.id.in_(news_ids))}
+        known_users = {row[0] for row in db.session.query(User.id).filter(User.id.in_(user_ids))}
+        bucket_seconds = max(self.min_interval, 1)
+        rows = [
+            {
+                "news_id": news_id,
+                "user_id": user_id,
+                "viewed_at": viewed_at,
+                "view_bucket": int((viewed_at - EPOCH).total_seconds() // bucket_seconds),
+            }
+            for news_id, user_id, viewed_at in batch
+            if news_id in known_news and user_id in known_users
+        ]
+        if len(rows) != len(batch):
+            logger.warning(f"[ViewBuffer] Отброшено просмотров с неизвестными id: {len(batch) - len(rows)}")
+        if not rows:
+            return 0
+
+        # Повтор, уже записанный другим воркером в том же окне, не вставляется и не считается
+        table = NewsView.__table__
+        stmt = (
+            upsert_insert(table)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=[table.c.news_id, table.c.user_id, table.c.view_bucket])
+            .returning(table.c.news_id, table.c.user_id)
+        )
+        inserted = db.session.execute(stmt).all()
+        if len(inserted) != len(rows):
+            logger.debug(f"[ViewBuffer] Повторов из других воркеров: {len(rows) - len(inserted)}")
+        for news_id, count in Counter(news_id for news_id, _ in inserted).items():
+            increment_counter(news_id, "viewers_count", count)
+        add_viewers((news_id, user_id) for news_id, user_id in inserted)
+        return len(inserted)
+
+    def _requeue(self, batch):
+        """Возвращает пачку в буфер после ошибки, не превышая max_pending"""
+        with self._lock:
+            room = max(self.max_pending - len(self._pending), 0)
+            if room < len(batch):
+                logger.error(f"[ViewBuffer] Потеряно просмотров при повторной постановке: {len(batch) - room}")
+            self._pending[:0] = batch[:room]
+            self._pending_counts.update(news_id for news_id, _, _ in batch[:room])
+
+    def _forget_expired(self):
+        """Чистит записи дедупликации старше min_interval (вызывается под блокировкой)"""
+        threshold = time.monotonic() - self.min_interval
+        self._last_seen = {key: seen for key, seen in self._last_seen.items() if seen > threshold}
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"[ViewBuffer] Ошибка фонового сброса: {e}")
+
+
+view_buffer = ViewBuffer()
@@ -0,0 +1,136 @@
+# viewers.py
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from db.hll import HyperLogLog
+from db.models import db, News, NewsView, NewsViewerSketch, NewsViewDaily
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+def add_viewers(pairs):
+    """
+    Вливает пары (news_id, user_id) в HyperLogLog-скетчи новостей и обновляет
+    News.unique_viewers_count. Не коммитит: вызывается в транзакции записи просмотров.
+    """
+    users_by_news = defaultdict(set)
+    for news_id, user_id in pairs:
+        users_by_news[news_id].add(user_id)
+    if not users_by_news:
+        return 0
+
+    # FOR UPDATE: два процесса не перезапишут регистры друг друга
+    sketches = {
+        sketch.news_id: sketch
+        for sketch in NewsViewerSketch.query
+        .filter(NewsViewerSketch.news_id.in_(users_by_news.keys()))
+        .with_for_update()
+    }
+
+    changed = 0
+    for news_id, user_ids in users_by_news.items():
+        sketch = sketches.get(news_id)
+        hll = HyperLogLog.from_bytes(sketch.registers) if sketch else HyperLogLog()
+
+        modified = False
+        for user_id in user_ids:
+            modified |= hll.add(user_id)
+        if not modified:
+            continue
+
+        if sketch is None:
+            sketch = NewsViewerSketch(news_id=news_id, registers=hll.to_bytes())
+            db.session.add(sketch)
+        else:
+            sketch.registers = hll.to_bytes()
+        db.session.query(News).filter(News.id == news_id).update(
+            {News.unique_viewers_count: hll.count()}, synchronize_session=False
+        )
+        changed += 1
+    return changed
+
+
+def backfill_viewer_sketches(chunk_size=200):
+    """
+    Вливает в скетчи всех зрителей, которые ещё лежат в news_views.
+    Добавление в HyperLogLog идемпотентно, поэтому команду можно запускать повторно.
+    """
+    news_ids = [row[0] for row in db.session.query(NewsView.news_id).distinct()]
+    total = 0
+    for i in range(0, len(news_ids), chunk_size):
+        pairs = (
+            db.session.query(NewsView.news_id, NewsView.user_id)
+            .filter(NewsView.news_id.in_(news_ids[i:i + chunk_size]))
+            .distinct()
+            .all()
+        )
+        add_viewers(pairs)
+        db.session.commit()
+        total += len(pairs)
+    logger.info(f"[backfill_viewer_sketches] Обработано пар новость/зритель: {total}")
+    return total
+
+
+def rollup_old_views(retention_days=30, now=None):
+    """
+    Сворачивает строки news_views старше retention_days в дневные агрегаты news_view_daily
+    и удаляет их. Зрители перед удалением вливаются в скетчи, так что оценка уникальных
+    зрителей не теряется. Обрабатывает по одному дню на транзакцию.
+    Возвращает количество удалённых строк.
+    """
+    now = now or datetime.utcnow()
+    cutoff = datetime.combine(now.date() - timedelta(days=retention_days), datetime.min.time())
+
+    oldest = db.session.query(func.min(NewsView.viewed_at)).filter(NewsView.viewed_at < cutoff).scalar()
+    if oldest is None:
+        logger.info("[rollup_old_views] Нет просмотров старше срока хранения")
+        return 0
+
+    removed = 0
+    day_start = datetime.combine(oldest.date(), datetime.min.time())
+    while day_start < cutoff:
+        day_end = day_start + timedelta(days=1)
+        in_day = (NewsView.viewed_at >= day_start, NewsView.viewed_at < day_end)
+
+        aggregates = (
+            db.session.query(
+                NewsView.news_id,
+                func.count(NewsView.id),
+                func.count(func.distinct(NewsView.user_id)),
+            )
+            .filter(*in_day)
+            .group_by(NewsView.news_id)
+            .all()
+        )
+        if aggregates:
+            existing = {
+                row.news_id: row
+                for row in NewsViewDaily.query.filter(
+                    NewsViewDaily.day == day_start.date(),
+                    NewsViewDaily.news_id.in_([news_id for news_id, _, _ in aggregates]),
+                )
+            }
+            for news_id, views, unique_viewers in aggregates:
+                row = existing.get(news_id)
+                if row is None:
+                    db.session.add(NewsViewDaily(
+                        news_id=news_id, day=day_start.date(), views=views, unique_viewers=unique_viewers
+                    ))
+                else:
+                    # Повторный прогон за тот же день: дописываем к уже свёрнутому
+                    row.views += views
+                    row.unique_viewers = max(row.unique_viewers, unique_viewers)
+
+            add_viewers(db.session.query(NewsView.news_id, NewsView.user_id).filter(*in_day).distinct())
+            deleted = NewsView.query.filter(*in_day).delete(synchronize_session=False)
+            db.session.commit()
+            removed += deleted
+            logger.info(f"[rollup_old_views] {day_start.date()}: свёрнуто {deleted} просмотров")
+
+        day_start = day_end
+
+    return removed
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+TELEGRAM_MAX_ALBUM_PARTS = 10
+
+
+class AlbumAssembler:
+    """
+    Сборка альбомов из частей, приходящих отдельными сообщениями с общим grouped_id.
+
+    Альбом отдаётся в on_ready(messages), как только:
+      - пришло expected_parts частей (число из add() или expect(), иначе максимум
+        Telegram - 10), либо
+      - после последней части прошло idle_gap секунд без новых, либо
+      - с первой части прошло max_wait секунд (жёсткий предел).
+    Telegram присылает части альбома почти одновременно, поэтому короткая пауза
+    заменяет прежнее фиксированное ожидание в 2 секунды.
+
+    Создавать внутри работающего event loop скрейпера.
+    """
+
+    def __init__(self, on_ready, idle_gap=0.5, max_wait=5.0, history=500):
+        self.on_ready = on_ready
+        self.idle_gap = idle_gap
+        self.max_wait = max_wait
+        self._loop = asyncio.get_running_loop()
+        self._albums = {}  # grouped_id -> {"messages", "first_at", "last_at", "expected", "timer"}
+        self._recent = deque(maxlen=history)  # Метрики последних собранных альбомов
+        self._reasons = Counter()
+
+    def add(self, message, expected_parts=None):
+        """Принимает часть альбома; expected_parts - число частей, если оно известно заранее"""
+        now = time.monotonic()
+        album = self._albums.get(message.grouped_id)
+        if album is None:
+            album = self._albums[message.grouped_id] = {
+                "messages": [], "first_at": now, "last_at": now, "expected": expected_parts, "timer": None
+            }
+        album["messages"].append(message)
+        album["last_at"] = now
+        if expected_parts:
+            album["expected"] = expected_parts
+
+        if album["timer"] is not None:
+            album["timer"].cancel()
+
+        expected = album["expected"] or TELEGRAM_MAX_ALBUM_PARTS
+        if len(album["messages"]) >= expected:
+            self._flush(message.grouped_id, "complete")
+            return
+
+        until_deadline = album["first_at"] + self.max_wait - now
+        if until_deadline <= self.idle_gap:
+            album["timer"] = self._loop.call_later(max(until_deadline, 0), self._flush, message.grouped_id, "max_wait")
+        else:
+            album["timer"] = self._loop.call_later(self.idle_gap, self._flush, message.grouped_id, "idle")
+
+    def expect(self, grouped_id, parts):
+        """
+        Сообщает число частей уже ожидающего альбома (событие Album от Telethon).
+        Если все части уже пришли, альбом отдаётся сразу. Возвращает False, если такого
+        альбома нет (уже собран по таймеру или ни одна часть ещё не пришла).
+        """
+        album = self._albums.get(grouped_id)
+        if album is None:
+            return False
+        album["expected"] = parts
+        if len(album["messages"]) >= parts:
+            self._flush(grouped_id, "complete")
+        return True
+
+    def _flush(self, grouped_id, reason):
+        album = self._albums.pop(grouped_id, None)
+        if album is None:
+            return
+        if album["timer"] is not None:
+            album["timer"].cancel()
+
+        now = time.monotonic()
+        metrics = {
+            "grouped_id": grouped_id,
+            "parts": len(album["messages"]),
+            "reason": reason,
+            # Сколько пост ждал с первой части и сколько из них - после последней
+            "latency": round(now - album["first_at"], 3),
+            "idle_wait": round(now - album["last_at"], 3),
+        }
+        self._recent.append(metrics)
+        self._reasons[reason] += 1
+        logger.debug(f"[AlbumAssembler] Альбом {grouped_id}: частей {metrics['parts']}, {reason}, {metrics['latency']} с")
+
+        task = self._loop.create_task(self.on_ready(album["messages"]))
+        task.add_done_callback(self._log_failure)
+
+    @staticmethod
+    def _log_failure(task):
+        if not task.cancelled() and task.exception():
+            logger.error(f"[AlbumAssembler] Ошибка обработки альбома: {task.exception()}")
+
+    def stats(self):
+        """Сводка задержек сборки по последним альбомам (для /api/scraper/albums)"""
+        recent = list(self._recent)  # Снимок: вызывается из потока Flask, пока loop дописывает метрики
+        latencies = sorted(metrics["latency"] for metrics in recent)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+        return {
+            "pending": len(self._albums),
+            "assembled": len(latencies),
+            "by_reason": dict(self._reasons),
+            "latency_p50": percentile(0.5),
+            "latency_p95": percentile(0.95),
+            "latency_max": latencies[-1] if latencies else None,
+            "recent": recent[-20:],
+        }
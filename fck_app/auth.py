@@ -0,0 +1,161 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import time
+from urllib.parse import parse_qsl
+
+from flask import g, jsonify, request
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+SESSION_HEADER = "Authorization"
+SESSION_SCHEME = "Bearer "
+
+
+class AuthError(Exception):
+    """Неверный или просроченный initData / токен сессии"""
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class TelegramAuth:
+    """
+    Аутентификация Mini App. initData проверяется один раз (POST /api/auth/session),
+    в ответ выдаётся короткоживущий токен "<payload>.<подпись>" с id пользователя.
+    Дальше каждый запрос проверяется одной HMAC токена - без пересчёта ключа от
+    BOT_TOKEN и без запроса к БД. Оба ключа вычисляются при запуске; ключ токенов
+    берётся только из SESSION_TOKEN_SECRET (окружение), без него токены не выдаются.
+
+    Middleware кладёт пользователя в g.user_id (g.user_verified - по токену ли).
+    Пока AUTH_REQUIRE_TOKEN выключен, запросы без токена по-старому берут
+    user_id из параметров, JSON, формы или X-User-ID.
+    """
+
+    def __init__(self):
+        self.init_data_secret = None
+        self.token_secret = None
+        self.token_ttl = 3600
+        self.init_data_max_age = 24 * 3600
+        self.require_token = False
+
+    def init_app(self, app):
+        bot_token = app.config["BOT_TOKEN"].encode()
+        self.init_data_secret = hmac.new(b"WebAppData", bot_token, hashlib.sha256).digest()
+        self.token_ttl = app.config.get("SESSION_TOKEN_TTL_SECONDS", self.token_ttl)
+        self.init_data_max_age = app.config.get("INIT_DATA_MAX_AGE_SECONDS", self.init_data_max_age)
+        self.require_token = app.config.get("AUTH_REQUIRE_TOKEN", self.require_token)
+        token_secret = app.config.get("SESSION_TOKEN_SECRET")
+        if token_secret:
+            self.token_secret = token_secret.encode()
+        elif self.require_token:
+            raise RuntimeError("AUTH_REQUIRE_TOKEN включён, но не задан SESSION_TOKEN_SECRET")
+        else:
+            # Ключ нельзя выводить из BOT_TOKEN: он лежит в репозитории, и токены можно было бы подделать
+            self.token_secret = None
+            logger.error(
+                "[TelegramAuth] НЕ ЗАДАН SESSION_TOKEN_SECRET - токены сессии отключены, "
+                "пользователь берётся из параметров запроса без проверки"
+            )
+        app.before_request(self.authenticate)
+        app.extensions["telegram_auth"] = self
+
+    def verify_init_data(self, init_data):
+        """Проверяет строку initData из Telegram WebApp, возвращает пользователя (dict)"""
+        fields = dict(parse_qsl(init_data or "", keep_blank_values=True))
+        received_hash = fields.pop("hash", "")
+        data_check_string = "\n".join(f"{key}={fields[key]}" for key in sorted(fields))
+        computed_hash = hmac.new(self.init_data_secret, data_check_string.encode(), hashlib.sha256).hexdigest()
+        if not received_hash or not hmac.compare_digest(computed_hash, received_hash):
+            raise AuthError("Неверная подпись initData")
+
+        try:
+            auth_date = int(fields.get("auth_date", 0))
+            user = json.loads(fields["user"])
+            user_id = int(user["id"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise AuthError(f"Неполный initData: {e}") from e
+        if time.time() - auth_date > self.init_data_max_age:
+            raise AuthError("initData устарел")
+        return {**user, "id": user_id}
+
+    @property
+    def tokens_enabled(self):
+        return self.token_secret is not None
+
+    def issue_token(self, user_id):
+        """(токен, срок жизни в секундах)"""
+        if not self.tokens_enabled:
+            raise AuthError("Токены сессии отключены")
+        payload = _b64encode(json.dumps(
+            {"uid": int(user_id), "exp": int(time.time()) + self.token_ttl}, separators=(",", ":")
+        ).encode())
+        signature = _b64encode(hmac.new(self.token_secret, payload.encode(), hashlib.sha256).digest())
+        return f"{payload}.{signature}", self.token_ttl
+
+    def verify_token(self, token):
+        """id пользователя из токена сессии"""
+        if not self.tokens_enabled:
+            raise AuthError("Токены сессии отключены")
+        payload, _, signature = token.partition(".")
+        expected = _b64encode(hmac.new(self.token_secret, payload.encode(), hashlib.sha256).digest())
+        if not signature or not hmac.compare_digest(expected, signature):
+            raise AuthError("Неверная подпись токена")
+        try:
+            data = json.loads(_b64decode(payload))
+        except ValueError as e:
+            raise AuthError("Повреждённый токен") from e
+        if data.get("exp", 0) < time.time():
+            raise AuthError("Токен просрочен")
+        return int(data["uid"])
+
+    def authenticate(self):
+        """before_request: g.user_id из токена сессии или (переходный режим) из параметров запроса"""
+        g.user_id = None
+        g.user_verified = False
+
+        header = request.headers.get(SESSION_HEADER, "")
+        if header.startswith(SESSION_SCHEME):
+            try:
+                g.user_id = self.verify_token(header[len(SESSION_SCHEME):].strip())
+            except AuthError as e:
+                # 401 - клиент получает новый токен по initData и повторяет запрос
+                logger.info(f"[TelegramAuth] {request.path}: {e}")
+                return jsonify({"error": str(e)}), 401
+            g.user_verified = True
+            return None
+
+        if not self.require_token:
+            g.user_id = _legacy_user_id()
+        return None
+
+
+def _legacy_user_id():
+    """user_id так, как его передавали страницы до токенов сессии"""
+    json_data = request.get_json(silent=True) if request.is_json else None
+    user_id = (
+        request.args.get("user_id")
+        or (json_data.get("user_id") if isinstance(json_data, dict) else None)
+        or request.form.get("user_id")
+        or request.headers.get("X-User-ID")
+    )
+    try:
+        return int(user_id) if user_id else None
+    except (TypeError, ValueError):
+        return None
+
+
+def request_user_id():
+    """Пользователь текущего запроса (см. TelegramAuth.authenticate) или None"""
+    return g.get("user_id")
+
+
+telegram_auth = TelegramAuth()
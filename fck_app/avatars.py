@@ -0,0 +1,177 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from fck_app.telegram_api import telegram_api, TelegramApiError
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow не установлен - храним аватарки без уменьшения
+    Image = None
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+AvatarFile = namedtuple("AvatarFile", ["path", "etag", "mimetype"])
+
+
+class AvatarCache:
+    """
+    Кэширующий прокси аватарок Telegram.
+
+    file_id разрешается через getFile один раз: файл скачивается, уменьшается до
+    миниатюры и сохраняется на диск под именем sha256 содержимого. Сопоставление
+    file_id -> файл держится в LRU с TTL и дублируется маленьким индексным файлом,
+    чтобы после перезапуска не ходить в Telegram повторно. Токен бота наружу не уходит.
+    Запросы к Telegram идут через общий клиент fck_app/telegram_api.py.
+    """
+
+    def __init__(self, cache_dir="cache/avatars", size=128, ttl=86400, max_entries=10000, api=telegram_api):
+        self.cache_dir = cache_dir
+        self.size = size
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.api = api
+
+        self._entries = OrderedDict()  # file_id -> (expires_at, AvatarFile)
+        self._lock = threading.Lock()
+        self._fetch_locks = {}
+
+    def init_app(self, app):
+        # Относительный путь считается от корня приложения, как и у send_file
+        self.cache_dir = os.path.join(app.root_path, app.config.get("AVATAR_CACHE_DIR", self.cache_dir))
+        self.size = app.config.get("AVATAR_SIZE", self.size)
+        self.ttl = app.config.get("AVATAR_CACHE_TTL_SECONDS", self.ttl)
+        self.max_entries = app.config.get("AVATAR_CACHE_MAX_ENTRIES", self.max_entries)
+        os.makedirs(os.path.join(self.cache_dir, "files"), exist_ok=True)
+        os.makedirs(os.path.join(self.cache_dir, "index"), exist_ok=True)
+        app.extensions["avatar_cache"] = self
+
+    # ---------------------------------------------------------------------------
+    # LRU file_id -> AvatarFile
+    # ---------------------------------------------------------------------------
+
+    def _remember(self, file_id, avatar):
+        with self._lock:
+            self._entries[file_id] = (time.monotonic() + self.ttl, avatar)
+            self._entries.move_to_end(file_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _recall(self, file_id):
+        with self._lock:
+            entry = self._entries.get(file_id)
+            if entry is None:
+                return None
+            expires_at, avatar = entry
+            if expires_at < time.monotonic() or not os.path.exists(avatar.path):
+                del self._entries[file_id]
+                return None
+            self._entries.move_to_end(file_id)
+            return avatar
+
+    def lookup(self, file_id):
+        """Аватарка из памяти или дискового индекса без обращения к Telegram"""
+        avatar = self._recall(file_id)
+        if avatar is not None:
+            return avatar
+
+        index_path = self._index_path(file_id)
+        try:
+            with open(index_path, encoding="utf-8") as f:
+                name = f.read().strip()
+        except OSError:
+            return None
+
+        avatar = self._avatar_for(name)
+        if not os.path.exists(avatar.path):
+            return None
+        self._remember(file_id, avatar)
+        return avatar
+
+    # ---------------------------------------------------------------------------
+    # Загрузка из Telegram
+    # ---------------------------------------------------------------------------
+
+    def get(self, file_id):
+        """Возвращает AvatarFile для file_id, скачивая его при первом обращении; None при ошибке"""
+        avatar = self.lookup(file_id)
+        if avatar is not None:
+            return avatar
+
+        # Один поток скачивает, остальные запросы того же file_id ждут его результата
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(file_id, threading.Lock())
+        with fetch_lock:
+            try:
+                avatar = self.lookup(file_id)
+                if avatar is None:
+                    avatar = self._fetch(file_id)
+                return avatar
+            finally:
+                with self._lock:
+                    self._fetch_locks.pop(file_id, None)
+
+    def _fetch(self, file_id):
+        try:
+            data = self.api.get_file(file_id)
+        except TelegramApiError as e:
+            logger.warning(f"[AvatarCache] Не удалось получить файл из Telegram: {e}")
+            return None
+
+        data, extension = self._thumbnail(data)
+        return self.store(file_id, data, extension)
+
+    def store(self, file_id, data, extension):
+        """Сохраняет байты миниатюры под именем их хэша и записывает индекс для file_id"""
+        name = f"{hashlib.sha256(data).hexdigest()}.{extension}"
+        avatar = self._avatar_for(name)
+        if not os.path.exists(avatar.path):
+            self._write_atomic(avatar.path, data)
+        self._write_atomic(self._index_path(file_id), name.encode("utf-8"))
+        self._remember(file_id, avatar)
+        logger.info(f"[AvatarCache] Аватарка сохранена: {name} ({len(data)} байт)")
+        return avatar
+
+    def _thumbnail(self, data):
+        """Уменьшает картинку до size x size (WebP); без Pillow возвращает оригинал"""
+        if Image is None:
+            return data, "jpg"
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image = image.convert("RGB")
+                image.thumbnail((self.size, self.size))
+                out = io.BytesIO()
+                image.save(out, "WEBP", quality=80)
+                return out.getvalue(), "webp"
+        except Exception as e:
+            logger.warning(f"[AvatarCache] Не удалось уменьшить аватарку, сохраняем оригинал: {e}")
+            return data, "jpg"
+
+    # ---------------------------------------------------------------------------
+    # Пути
+    # ---------------------------------------------------------------------------
+
+    def _index_path(self, file_id):
+        key = hashlib.sha1(file_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, "index", key)
+
+    def _avatar_for(self, name):
+        digest, _, extension = name.partition(".")
+        mimetype = "image/webp" if extension == "webp" else "image/jpeg"
+        return AvatarFile(os.path.join(self.cache_dir, "files", digest[:2], name), digest, mimetype)
+
+    @staticmethod
+    def _write_atomic(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+avatar_cache = AvatarCache()
@@ -3,7 +3,6 @@ from aiogram.types import WebAppInfo, InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.filters import Command
 import asyncio
 import os
-import aiohttp
 import logging
 from config import Config
 
@@ -17,35 +16,82 @@ bot = Bot(token=BOT_TOKEN)
 dp = Dispatcher(bot=bot)
 
 
-async def save_user_to_server(user_data):
-    """Асинхронная функция для отправки данных пользователя на сервер"""
-    try:
-        logger.info(f"Отправляем на сервер данные: {user_data}")
-
-        base_url = Config.PUBLIC_URL
-        if not base_url:
-            logger.error("PUBLIC_URL не установлен в конфигурации")
+class UserBatchSaver:
+    """
+    Сохраняет пользователей из /start прямо в БД пачками.
+
+    Раньше каждый /start шёл POST-запросом на PUBLIC_URL/get_user_data - через DNS, TLS
+    и туннель Cloudflare обратно на тот же сервер. Теперь запросы, пришедшие в течение
+    delay секунд (или до max_batch штук), записываются одним INSERT ... ON CONFLICT
+    (db/users.py) в пуле потоков. save() ждёт коммита своей пачки, чтобы Mini App,
+    открытая по кнопке, уже нашла пользователя.
+    """
+
+    def __init__(self, app, delay=0.2, max_batch=200):
+        self.app = app
+        self.delay = delay
+        self.max_batch = max_batch
+        self._pending = []  # [(user_data, future), ...]
+        self._timer = None
+
+    async def save(self, user_data):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((user_data, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.delay, self._flush)
+        await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.create_task(self._write(batch))
+
+    async def _write(self, batch):
+        try:
+            await asyncio.to_thread(self._write_sync, [user_data for user_data, _ in batch])
+        except Exception as e:
+            logger.error(f"Ошибка сохранения пачки из {len(batch)} пользователей: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
             return
+        for _, future in batch:
+            if not future.done():
+                future.set_result(None)
 
-        # Подготавливаем данные для отправки
-        data_to_send = {
-            "id": user_data["id"],
-            "user": user_data  # Отправляем все данные пользователя в поле user
-        }
+    def _write_sync(self, users_data):
+        from db.models import db  # Импортируем здесь, чтобы избежать циклических импортов
+        from db.users import upsert_users
+
+        with self.app.app_context():
+            try:
+                count = upsert_users(users_data)
+                db.session.commit()
+                logger.info(f"Сохранено пользователей одной пачкой: {count}")
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+
+user_saver = None  # UserBatchSaver, создаётся в run_bot
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                    f"{base_url}/get_user_data",
-                    json=data_to_send,
-                    headers={"Content-Type": "application/json"}
-            ) as response:
-                if response.status == 200:
-                    logger.info(f"Пользователь {user_data['id']} успешно сохранён")
-                else:
-                    error_text = await response.text()
-                    logger.error(f"Ошибка сохранения пользователя {user_data['id']}: {error_text}")
+
+async def save_user_to_server(user_data):
+    """Сохраняет данные пользователя (пачкой вместе с другими /start)"""
+    try:
+        logger.info(f"Сохраняем данные пользователя: {user_data}")
+        await user_saver.save(user_data)
+        logger.info(f"Пользователь {user_data['id']} успешно сохранён")
     except Exception as e:
-        logger.error(f"Ошибка отправки данных пользователя: {e}")
+        logger.error(f"Ошибка сохранения пользователя {user_data['id']}: {e}")
 
 
 @dp.message(Command("start"))
@@ -116,8 +162,20 @@ async def main_polling():
         raise
 
 
-def run_bot():
-    """Функция для запуска бота из main.py"""
+def run_bot(app=None):
+    """
+    Функция для запуска бота из main.py. app - приложение Flask для доступа к БД;
+    если не передано, создаётся своё.
+    """
+    global user_saver
+    if app is None:
+        from app_factory import create_app  # app_factory импортирует routes, а routes - этот модуль
+        app = create_app()
+    user_saver = UserBatchSaver(
+        app,
+        delay=Config.BOT_USER_BATCH_SECONDS,
+        max_batch=Config.BOT_USER_BATCH_SIZE
+    )
     try:
         logger.info("Запуск бота...")
         asyncio.run(main_polling())
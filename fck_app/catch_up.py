@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import time
+
+from telethon import utils
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class ChannelCatchUp:
+    """
+    Догоняет каналы после простоя: читает историю после последнего сохранённого сообщения
+    через iter_messages и отдаёт посты (альбомы собираются по grouped_id) в тот же путь,
+    что и живые сообщения - очередь db/ingest.py и пакетную запись IngestWriter.
+    Повторы безопасны: News вставляется с ON CONFLICT (channel_id, telegram_message_id).
+
+    Начало догона - граница catch_up_floor(chat_id, channel_id), а не последнее записанное
+    сообщение: живые посты приходят параллельно и обгоняют историю. Граница сдвигается
+    через advance_floor(chat_id, message_id) только после того, как все посты очередной
+    страницы из page_size сообщений зафиксированы в очереди, поэтому падение посреди
+    догона не оставляет дыр.
+    enqueue(messages) - фиксирует сообщения поста в очереди и собирает его (корутина).
+    """
+
+    def __init__(self, client, channels, catch_up_floor, advance_floor, enqueue, initial_messages=200,
+                 max_in_flight=8, page_size=100, wait_time=1):
+        self.client = client
+        self.channels = list(channels)
+        self.catch_up_floor = catch_up_floor
+        self.advance_floor = advance_floor
+        self.enqueue = enqueue
+        self.initial_messages = initial_messages
+        self.max_in_flight = max_in_flight
+        self.page_size = page_size
+        self.wait_time = wait_time
+        self.running = False
+        self.last_run = []  # Метрики последнего прохода по каждому каналу
+
+    def status(self):
+        return {"running": self.running, "last_run": self.last_run}
+
+    async def run(self, channels=None):
+        if self.running:
+            return self.last_run
+        channels = channels or self.channels
+        self.running = True
+        try:
+            metrics = []
+            for channel in channels:
+                try:
+                    metrics.append(await self._catch_up_channel(channel))
+                except Exception as e:
+                    logger.error(f"[ChannelCatchUp] Канал {channel}: ошибка догона: {e}")
+                    metrics.append({"channel": channel, "error": str(e)})
+            self.last_run = metrics
+            return metrics
+        finally:
+            self.running = False
+
+    async def _catch_up_channel(self, channel):
+        entity = await self.client.get_entity(channel)
+        chat_id = utils.get_peer_id(entity)
+        min_id = self.catch_up_floor(chat_id, str(entity.id))
+        if not min_id:
+            # Канал ещё не читали - берём только последние initial_messages, а не всю историю
+            latest = await self.client.get_messages(entity, limit=1)
+            min_id = max(0, latest[0].id - self.initial_messages) if latest else 0
+
+        # Если последней сохранена часть альбома, остальные его части уже в той же новости
+        boundary = await self.client.get_messages(entity, ids=min_id) if min_id else None
+        saved_group = boundary.grouped_id if boundary else None
+
+        started = time.monotonic()
+        scanned = 0
+        posts = 0
+        slots = asyncio.Semaphore(self.max_in_flight)
+        tasks = []
+        floor = min_id
+        failed = False  # После ошибки граница больше не сдвигается - следующий догон повторит
+
+        async def submit(group):
+            nonlocal failed
+            try:
+                await self.enqueue(group)
+            except Exception as e:
+                failed = True
+                logger.error(f"[ChannelCatchUp] {channel}: пост {group[0].id} не собран: {e}")
+            finally:
+                slots.release()
+
+        async def advance(message_id):
+            """Дожидается постов страницы и сдвигает границу до message_id"""
+            nonlocal floor
+            await asyncio.gather(*tasks)
+            tasks.clear()
+            if not failed and message_id > floor:
+                self.advance_floor(chat_id, message_id)
+                floor = message_id
+
+        async def flush(group):
+            nonlocal posts
+            if group:
+                posts += 1
+                # Слот занимается до создания задачи - в памяти не больше max_in_flight постов
+                await slots.acquire()
+                tasks.append(asyncio.create_task(submit(group)))
+
+        # reverse=True - от старых к новым, части альбома идут подряд
+        group = []
+        last_id = min_id
+        async for message in self.client.iter_messages(entity, min_id=min_id, reverse=True, wait_time=self.wait_time):
+            scanned += 1
+            last_id = message.id
+            if scanned % self.page_size == 0:
+                # Незакрытый альбом ещё не отправлен - граница встаёт перед ним
+                await advance(group[0].id - 1 if group else last_id - 1)
+            if message.action:
+                continue  # Служебные сообщения (закрепы, смена названия) новостями не являются
+            if saved_group and message.grouped_id == saved_group:
+                continue
+            if group and message.grouped_id and group[-1].grouped_id == message.grouped_id:
+                group.append(message)
+                continue
+            await flush(group)
+            group = [message]
+        await flush(group)
+        await advance(last_id)
+
+        elapsed = time.monotonic() - started
+        metrics = {
+            "channel": channel,
+            "from_message_id": min_id,
+            "floor": floor,
+            "messages": scanned,
+            "posts": posts,
+            "seconds": round(elapsed, 2),
+            "messages_per_second": round(scanned / elapsed, 1) if elapsed else None,
+        }
+        logger.info(
+            f"[ChannelCatchUp] {channel}: сообщений {scanned}, постов {posts} "
+            f"за {metrics['seconds']} с ({metrics['messages_per_second']} сообщ./с)"
+        )
+        return metrics
@@ -0,0 +1,173 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow не установлен - превью не собираются, отдаются исходные картинки
+    Image = None
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+ITEM_PREVIEW_DIR = "static/previews/thumbs"
+ITEM_PREVIEW_URL = "/static/previews/thumbs"
+ITEM_PREVIEWS_SOURCE_DIR = "static/previews/items"
+MANIFEST_NAME = "manifest.json"
+
+
+def preview_source(item_id, preview_image, root="."):
+    """Файл превью предмета: Item.preview_image, иначе static/previews/items/<id>.png|.jpg"""
+    candidates = []
+    if preview_image and not preview_image.startswith(("http:", "https:")):
+        candidates.append(preview_image.lstrip("/"))
+    candidates += [os.path.join(ITEM_PREVIEWS_SOURCE_DIR, f"{item_id}{ext}") for ext in (".png", ".jpg", ".jpeg", ".webp")]
+    for candidate in candidates:
+        path = os.path.join(root, candidate)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _fit(image, size):
+    """Вписывает картинку в квадрат size x size по центру на прозрачном фоне"""
+    image = image.convert("RGBA")
+    image.thumbnail((size, size), Image.LANCZOS)
+    canvas = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    canvas.paste(image, ((size - image.width) // 2, (size - image.height) // 2), image)
+    return canvas
+
+
+def build_thumbnail(source_path, out_dir=ITEM_PREVIEW_DIR, size=160):
+    """
+    Квадратная WebP-миниатюра фиксированного размера. Выполняется в отдельном процессе.
+    Имя - хэш исходника и размера, поэтому повторная сборка ничего не пересчитывает.
+    Возвращает путь к миниатюре или None (в том числе если картинку не удалось прочитать -
+    один битый файл не должен останавливать сборку остальных).
+    """
+    if Image is None or not source_path:
+        return None
+    try:
+        with open(source_path, "rb") as f:
+            data = f.read()
+        name = f"{hashlib.sha256(data).hexdigest()[:16]}_{size}.webp"
+        out_path = os.path.join(out_dir, name)
+        if os.path.exists(out_path):
+            return out_path
+        os.makedirs(out_dir, exist_ok=True)
+        with Image.open(io.BytesIO(data)) as image:
+            thumbnail = _fit(image, size)
+        tmp_path = f"{out_path}.{os.getpid()}.tmp"
+        thumbnail.save(tmp_path, "WEBP", quality=80, method=6)
+        os.replace(tmp_path, out_path)
+        return out_path
+    except Exception as e:
+        logger.warning(f"[build_thumbnail] {source_path}: миниатюра не собрана: {e}")
+        return None
+
+
+def build_sprite_sheets(thumbnails, out_dir=ITEM_PREVIEW_DIR, size=160, columns=16, url_prefix=ITEM_PREVIEW_URL):
+    """
+    Склеивает миниатюры [(item_id, путь), ...] в листы columns x columns.
+    Возвращает (листы [{"url", "columns", "rows"}], {item_id: {"sheet", "column", "row"}}).
+    """
+    per_sheet = columns * columns
+    sheets = []
+    positions = {}
+    for start in range(0, len(thumbnails), per_sheet):
+        chunk = thumbnails[start:start + per_sheet]
+        rows = (len(chunk) + columns - 1) // columns
+        sheet = Image.new("RGBA", (columns * size, rows * size), (0, 0, 0, 0))
+        for index, (item_id, path) in enumerate(chunk):
+            column, row = index % columns, index // columns
+            with Image.open(path) as thumbnail:
+                sheet.paste(thumbnail, (column * size, row * size))
+            positions[item_id] = {"sheet": len(sheets), "column": column, "row": row}
+
+        buffer = io.BytesIO()
+        sheet.save(buffer, "WEBP", quality=80, method=6)
+        data = buffer.getvalue()
+        name = f"sprite_{hashlib.sha256(data).hexdigest()[:16]}.webp"
+        out_path = os.path.join(out_dir, name)
+        if not os.path.exists(out_path):
+            with open(out_path, "wb") as f:
+                f.write(data)
+        sheets.append({"url": f"{url_prefix}/{name}", "columns": columns, "rows": rows})
+    return sheets, positions
+
+
+def write_manifest(out_dir, size, thumbnails, sheets, positions, url_prefix=ITEM_PREVIEW_URL):
+    manifest = {
+        "size": size,
+        "sheets": sheets,
+        "items": {
+            str(item_id): {"thumb": f"{url_prefix}/{os.path.basename(path)}", **positions[item_id]}
+            for item_id, path in thumbnails
+        },
+    }
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+class ItemPreviews:
+    """
+    Миниатюры и спрайт-листы предметов (flask build-item-previews) для веб-процесса.
+    Манифест перечитывается при изменении mtime. Словари каталога общие, поэтому
+    with_previews() возвращает их копии.
+    """
+
+    def __init__(self, out_dir=ITEM_PREVIEW_DIR):
+        self.out_dir = out_dir
+        self._lock = threading.Lock()
+        self._manifest = None
+        self._mtime = None
+
+    def init_app(self, app):
+        self.out_dir = os.path.join(app.root_path, app.config.get("ITEM_PREVIEW_DIR", self.out_dir))
+        app.extensions["item_previews"] = self
+
+    def _current(self):
+        manifest_path = os.path.join(self.out_dir, MANIFEST_NAME)
+        try:
+            mtime = os.stat(manifest_path).st_mtime
+        except FileNotFoundError:
+            return None
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    with open(manifest_path, encoding="utf-8") as f:
+                        self._manifest = json.load(f)
+                    self._mtime = mtime
+                    logger.info(f"[ItemPreviews] Манифест загружен: {len(self._manifest['items'])} предметов")
+        return self._manifest
+
+    def with_previews(self, items):
+        """
+        (копии предметов с полем preview, используемые листы). preview - миниатюра и место
+        на листе: {"thumb", "sheet" (индекс в листах ответа), "column", "row", "size"}
+        """
+        manifest = self._current()
+        if not manifest:
+            return items, []
+        sheet_index = {}
+        result = []
+        for item in items:
+            entry = manifest["items"].get(str(item["id"]))
+            if entry is None:
+                result.append(item)
+                continue
+            # Нумеруем только листы, которые реально нужны этому ответу
+            sheet = sheet_index.setdefault(entry["sheet"], len(sheet_index))
+            result.append({**item, "preview": {**entry, "sheet": sheet, "size": manifest["size"]}})
+        sheets = [manifest["sheets"][index] for index in sorted(sheet_index, key=sheet_index.get)]
+        return result, sheets
+
+
+item_previews = ItemPreviews()
@@ -0,0 +1,58 @@
+import asyncio
+import logging
+import random
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class MediaDownloader:
+    """
+    Пул загрузок медиа для Telethon-скрейпера с ограничением параллельности.
+
+    Одновременно идёт не больше concurrency загрузок, причём один канал занимает
+    не больше per_channel из них - активный канал с большими альбомами не задерживает
+    посты остальных. Ошибки повторяются до retries раз с экспоненциальной задержкой;
+    FloodWait от Telegram выжидается столько, сколько он просит.
+
+    Создавать внутри работающего event loop скрейпера.
+    """
+
+    def __init__(self, client, concurrency=4, per_channel=2, retries=3, backoff=1.0):
+        self.client = client
+        self.per_channel = max(1, min(per_channel, concurrency))
+        self.retries = retries
+        self.backoff = backoff
+        self._slots = asyncio.Semaphore(concurrency)
+        self._channel_slots = {}
+
+    def _channel_slot(self, channel_id):
+        slot = self._channel_slots.get(channel_id)
+        if slot is None:
+            slot = self._channel_slots[channel_id] = asyncio.Semaphore(self.per_channel)
+        return slot
+
+    async def download(self, channel_id, media, folder):
+        """Скачивает одно медиа в folder. Возвращает путь к файлу или None, если попытки кончились"""
+        for attempt in range(1, self.retries + 1):
+            try:
+                # Сначала место канала, потом общее: ожидающий своей очереди канал не держит общий слот
+                async with self._channel_slot(channel_id), self._slots:
+                    return await self.client.download_media(media, file=folder)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt == self.retries:
+                    logger.error(f"[MediaDownloader] Канал {channel_id}: загрузка не удалась после {attempt} попыток: {e}")
+                    return None
+                # У FloodWaitError Telethon есть seconds - сколько Telegram просит подождать
+                delay = getattr(e, "seconds", None) or self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                logger.warning(f"[MediaDownloader] Канал {channel_id}: попытка {attempt} не удалась ({e}), повтор через {delay:.1f} с")
+                await asyncio.sleep(delay)
+
+    async def download_many(self, channel_id, jobs):
+        """
+        Скачивает [(media, folder), ...] параллельно и ждёт все части.
+        Пути возвращаются в порядке jobs; на месте неудавшихся загрузок - None.
+        """
+        return await asyncio.gather(*(self.download(channel_id, media, folder) for media, folder in jobs))
@@ -0,0 +1,136 @@
+import asyncio
+import base64
+import io
+import logging
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow не установлен - варианты не строятся, лента отдаёт оригиналы
+    Image = None
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+VARIANT_WIDTHS = (320, 640, 1080)
+VARIANT_FORMATS = ("avif", "webp")  # В порядке предпочтения для <picture>
+VARIANTS_DIR = "static/news_variants"
+LQIP_WIDTH = 16
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".webm", ".mkv")
+
+
+def _url_path(path):
+    """Путь в том же виде, в каком скрейпер хранит оригиналы (относительный, через /)"""
+    return path.replace(os.sep, "/")
+
+
+def _extract_poster(video_path, out_dir):
+    """Первый кадр видео через ffmpeg; None, если ffmpeg не установлен или не справился"""
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        return None
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    poster_path = os.path.join(out_dir, f"{stem}_poster.jpg")
+    result = subprocess.run(
+        [ffmpeg, "-y", "-loglevel", "error", "-i", video_path, "-frames:v", "1", poster_path],
+        capture_output=True,
+        timeout=60,
+    )
+    if result.returncode != 0 or not os.path.exists(poster_path):
+        logger.warning(f"[media_variants] ffmpeg не извлёк кадр из {video_path}: {result.stderr[-200:]!r}")
+        return None
+    return poster_path
+
+
+def build_variants(path, out_dir=VARIANTS_DIR, widths=VARIANT_WIDTHS, formats=VARIANT_FORMATS):
+    """
+    Строит уменьшенные копии картинки (или первого кадра видео) в out_dir.
+
+    Выполняется в отдельном процессе (см. MediaProcessor). Возвращает
+    {"srcset": {format: [[width, path], ...]}, "lqip": data-URI, "width": ширина оригинала}
+    или None, если обработать файл нельзя. Ширины больше оригинала пропускаются.
+    """
+    if Image is None or not path or not os.path.exists(path):
+        return None
+    os.makedirs(out_dir, exist_ok=True)
+
+    poster = None
+    source = path
+    if path.lower().endswith(VIDEO_EXTENSIONS):
+        source = poster = _extract_poster(path, out_dir)
+        if source is None:
+            return None
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    with Image.open(source) as image:
+        image = image.convert("RGB")
+        original_width = image.width
+        targets = [w for w in widths if w < original_width]
+        if len(targets) < len(widths):
+            # Экраны шире оригинала получают сам оригинал в пересжатом виде, без апскейла
+            targets.append(original_width)
+
+        srcset = {}
+        for fmt in formats:
+            entries = []
+            for width in targets:
+                out_path = os.path.join(out_dir, f"{stem}_{width}w.{fmt}")
+                if not os.path.exists(out_path):
+                    resized = image.resize((width, round(image.height * width / original_width)), Image.LANCZOS)
+                    try:
+                        resized.save(out_path, fmt.upper(), quality=60 if fmt == "avif" else 75)
+                    except (KeyError, OSError) as e:
+                        # Сборка Pillow без поддержки формата - просто не отдаём его
+                        logger.warning(f"[media_variants] Формат {fmt} недоступен: {e}")
+                        break
+                entries.append([width, _url_path(out_path)])
+            if entries:
+                srcset[fmt] = entries
+
+        # LQIP: крошечная размытая копия прямо в ответе API, пока грузится картинка
+        tiny = image.resize((LQIP_WIDTH, max(1, round(image.height * LQIP_WIDTH / original_width))))
+        buffer = io.BytesIO()
+        tiny.save(buffer, "WEBP", quality=30)
+        lqip = "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+    variants = {"srcset": srcset, "lqip": lqip, "width": original_width}
+    if poster:
+        variants["poster"] = _url_path(poster)
+    return variants
+
+
+class MediaProcessor:
+    """
+    Обработка скачанных медиа в пуле процессов, чтобы ресайз и кодирование
+    не блокировали event loop скрейпера.
+    """
+
+    def __init__(self, workers=2, out_dir=VARIANTS_DIR, widths=VARIANT_WIDTHS, formats=VARIANT_FORMATS):
+        self.out_dir = out_dir
+        self.widths = tuple(widths)
+        self.formats = tuple(formats)
+        self._pool = ProcessPoolExecutor(max_workers=workers)
+
+    async def process(self, paths):
+        """Строит варианты для всех paths параллельно. Возвращает {путь: варианты} для удавшихся"""
+        loop = asyncio.get_running_loop()
+        paths = [path for path in paths if path]
+        results = await asyncio.gather(
+            *(loop.run_in_executor(self._pool, build_variants, path, self.out_dir, self.widths, self.formats)
+              for path in paths),
+            return_exceptions=True,
+        )
+        variants = {}
+        for path, result in zip(paths, results):
+            if isinstance(result, Exception):
+                logger.error(f"[MediaProcessor] Не удалось обработать {path}: {result}")
+            elif result:
+                variants[_url_path(path)] = result
+        return variants
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+MODELS_DIR = "static/models"
+MODEL_VARIANTS_DIR = "static/models/variants"
+MODEL_VARIANTS_URL = "/models/variants"
+MANIFEST_NAME = "manifest.json"
+
+# Уровни детализации от лучшего к худшему: (имя, доля треугольников, сторона текстур)
+MODEL_LODS = (("high", 1.0, 2048), ("medium", 0.5, 1024), ("low", 0.15, 512))
+TIERS = tuple(name for name, _, _ in MODEL_LODS)
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_key(path):
+    """static/models/clothes/pants.glb - ключ манифеста для /static/..., static/... и путей Windows"""
+    return path.replace("\\", "/").lstrip("/")
+
+
+def build_model_variants(path, out_dir=MODEL_VARIANTS_DIR, url_prefix=MODEL_VARIANTS_URL,
+                         lods=MODEL_LODS, compression="meshopt", texture_format="ktx2", tool=None):
+    """
+    Строит LOD-копии GLB через gltf-transform: упрощение сетки, сжатие геометрии
+    (meshopt или draco) и текстур (KTX2/Basis, без toktx - WebP).
+
+    Имена содержат хэш исходника, поэтому готовые копии не пересобираются и кэшируются
+    навсегда. Возвращает {"sha256", "bytes", "compression", "textures", "lods": {имя:
+    {"url", "bytes"}}} или None, если gltf-transform не установлен или не справился.
+    """
+    tool = tool or shutil.which("gltf-transform")
+    if not tool:
+        logger.error("[model_variants] gltf-transform не найден (npm install -g @gltf-transform/cli)")
+        return None
+    if not os.path.isfile(path):
+        logger.warning(f"[model_variants] Нет файла модели: {path}")
+        return None
+    if texture_format == "ktx2" and not shutil.which("toktx"):
+        # KTX2 кодирует toktx из KTX-Software; без него текстуры хотя бы в WebP
+        logger.warning("[model_variants] toktx не найден, текстуры сжимаются в WebP")
+        texture_format = "webp"
+
+    os.makedirs(out_dir, exist_ok=True)
+    sha256 = _sha256(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    variants = {
+        "sha256": sha256,
+        "bytes": os.path.getsize(path),
+        "compression": compression,
+        "textures": texture_format,
+        "lods": {},
+    }
+    for name, ratio, texture_size in lods:
+        file_name = f"{stem}.{sha256[:10]}.{name}.glb"
+        out_path = os.path.join(out_dir, file_name)
+        if not os.path.exists(out_path):
+            tmp_path = f"{out_path}.{os.getpid()}.tmp.glb"
+            command = [
+                tool, "optimize", path, tmp_path,
+                "--compress", compression,
+                "--texture-compress", texture_format,
+                "--texture-size", str(texture_size),
+            ]
+            if ratio < 1:
+                command += ["--simplify", "true", "--simplify-ratio", str(ratio), "--simplify-error", "0.01"]
+            else:
+                command += ["--simplify", "false"]
+            result = subprocess.run(command, capture_output=True, text=True, timeout=600)
+            if result.returncode != 0 or not os.path.exists(tmp_path):
+                logger.warning(f"[model_variants] {path} ({name}) не собран: {result.stderr[-300:]!r}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                continue
+            os.replace(tmp_path, out_path)
+        variants["lods"][name] = {"url": f"{url_prefix}/{file_name}", "bytes": os.path.getsize(out_path)}
+        logger.info(f"[model_variants] {path} -> {file_name}: {variants['lods'][name]['bytes']} байт")
+
+    return variants if variants["lods"] else None
+
+
+def write_manifest(out_dir, entries):
+    """Дописывает {ключ исходника: варианты} в манифест, не трогая остальные модели"""
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        manifest = {}
+    manifest.update(entries)
+    os.makedirs(out_dir, exist_ok=True)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+def device_tier(request):
+    """
+    Уровень детализации для устройства: явный ?tier=, иначе Client Hints
+    (Save-Data, ECT, Device-Memory). Без подсказок - high.
+    """
+    tier = request.args.get("tier")
+    if tier in TIERS:
+        return tier
+    if request.headers.get("Save-Data", "").lower() == "on":
+        return "low"
+    ect = request.headers.get("ECT", "").lower()
+    if ect in ("slow-2g", "2g"):
+        return "low"
+    try:
+        memory = float(request.headers.get("Device-Memory", ""))
+    except ValueError:
+        memory = None
+    if memory is not None and memory <= 2:
+        return "low"
+    if ect == "3g" or (memory is not None and memory <= 4):
+        return "medium"
+    return "high"
+
+
+class ModelVariants:
+    """
+    Манифест LOD-копий моделей (flask build-model-variants) для веб-процесса.
+    Файл перечитывается, когда меняется его mtime, - пересборка не требует перезапуска.
+    """
+
+    def __init__(self, out_dir=MODEL_VARIANTS_DIR):
+        self.out_dir = out_dir
+        self._lock = threading.Lock()
+        self._manifest = {}
+        self._mtime = None
+
+    def init_app(self, app):
+        self.out_dir = os.path.join(app.root_path, app.config.get("MODEL_VARIANTS_DIR", self.out_dir))
+        app.extensions["model_variants"] = self
+
+    def _current(self):
+        manifest_path = os.path.join(self.out_dir, MANIFEST_NAME)
+        try:
+            mtime = os.stat(manifest_path).st_mtime
+        except FileNotFoundError:
+            return {}
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    with open(manifest_path, encoding="utf-8") as f:
+                        self._manifest = json.load(f)
+                    self._mtime = mtime
+                    logger.info(f"[ModelVariants] Манифест загружен: {len(self._manifest)} моделей")
+        return self._manifest
+
+    def get(self, path):
+        return self._current().get(source_key(path))
+
+    def choose(self, path, tier):
+        """URL копии нужного уровня; если его нет - ближайший более лёгкий, затем более тяжёлый"""
+        variants = self.get(path)
+        if not variants:
+            return None
+        lods = variants["lods"]
+        index = TIERS.index(tier)
+        for name in TIERS[index:] + TIERS[:index][::-1]:
+            if name in lods:
+                return lods[name]["url"]
+        return None
+
+
+model_variants = ModelVariants()
@@ -0,0 +1,95 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from flask import Response, request
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+
+class SpaBundle:
+    """
+    Все экраны SPA (фрагменты из templates/) одним JSON: {"templates": {имя: html}}.
+
+    Вместо цепочки запросов /templates/<экран>.html через туннель приложение получает
+    один сжатый ответ, который браузер перепроверяет по ETag (304 без тела). Полные
+    страницы (<!DOCTYPE ...>, например index.html) в пакет не входят. Ссылки /static/...
+    переписываются на собранную статику, как и в serve_template_file.
+    Пакет пересобирается, когда меняются файлы шаблонов (проверка не чаще check_interval).
+    """
+
+    def __init__(self, templates_dir="templates", check_interval=2.0):
+        self.templates_dir = templates_dir
+        self.check_interval = check_interval
+        self.rewrite = None
+        self._lock = threading.Lock()
+        self._signature = None
+        self._checked_at = 0.0
+        self._payload = None  # (json, gzip, etag)
+
+    def init_app(self, app, rewrite=None):
+        self.templates_dir = os.path.join(app.root_path, app.template_folder or self.templates_dir)
+        self.check_interval = app.config.get("SPA_BUNDLE_CHECK_SECONDS", self.check_interval)
+        self.rewrite = rewrite
+        app.extensions["spa_bundle"] = self
+
+    def _current_signature(self):
+        return tuple(
+            (entry.name, entry.stat().st_mtime_ns)
+            for entry in sorted(os.scandir(self.templates_dir), key=lambda entry: entry.name)
+            if entry.is_file() and entry.name.endswith(".html")
+        )
+
+    def _build(self):
+        templates = {}
+        for name in sorted(os.listdir(self.templates_dir)):
+            if not name.endswith(".html"):
+                continue
+            with open(os.path.join(self.templates_dir, name), encoding="utf-8") as f:
+                html = f.read()
+            if html.lstrip()[:9].lower() == "<!doctype":
+                continue
+            templates[name[:-len(".html")]] = self.rewrite(html) if self.rewrite else html
+
+        body = json.dumps({"templates": templates}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        etag = hashlib.sha256(body).hexdigest()[:20]
+        logger.info(f"[SpaBundle] Собран пакет шаблонов: {len(templates)} экранов, {len(body)} байт")
+        return body, gzip.compress(body, compresslevel=9, mtime=0), etag
+
+    def payload(self):
+        now = time.monotonic()
+        if self._payload is not None and now - self._checked_at < self.check_interval:
+            return self._payload
+        with self._lock:
+            signature = self._current_signature()
+            if self._payload is None or signature != self._signature:
+                self._payload = self._build()
+                self._signature = signature
+            self._checked_at = now
+            return self._payload
+
+    @property
+    def etag(self):
+        return self.payload()[2]
+
+    def send(self):
+        """Ответ с пакетом: gzip по Accept-Encoding, 304 при совпадении ETag"""
+        body, compressed, etag = self.payload()
+        use_gzip = "gzip" in request.headers.get("Accept-Encoding", "").lower()
+        response = Response(compressed if use_gzip else body, mimetype="application/json")
+        # У сжатого и несжатого тела разные ETag: это разные представления
+        response.set_etag(f"{etag}-gz" if use_gzip else etag)
+        if use_gzip:
+            response.headers["Content-Encoding"] = "gzip"
+        response.headers["Vary"] = "Accept-Encoding"
+        # Хранить можно, но перед использованием - перепроверить (обычно 304)
+        response.headers["Cache-Control"] = "no-cache"
+        return response.make_conditional(request)
+
+
+spa_bundle = SpaBundle()
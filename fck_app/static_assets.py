@@ -0,0 +1,241 @@
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+
+from flask import abort, request, send_file
+from werkzeug.utils import safe_join
+
+try:
+    import brotli
+except ImportError:  # Без brotli собираются только .gz
+    brotli = None
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+MANIFEST_NAME = "manifest.json"
+ASSET_MAX_AGE = 365 * 24 * 3600  # Имя файла содержит хэш, поэтому содержимое по адресу не меняется
+COMPRESSIBLE = {".js", ".mjs", ".css", ".svg", ".json", ".wasm", ".ttf", ".otf", ".eot", ".html", ".txt"}
+MIN_SAVING = 0.9  # Сжатую копию храним, только если она меньше 90% оригинала
+
+# import ... from './x.js', import('./x.js'), "/static/js/pages/main.js"
+JS_REFERENCE = re.compile(r"""(?P<quote>['"`])(?P<ref>(?:\.{1,2}/|/static/)[^'"`\n?#]+)(?P<suffix>[?#][^'"`\n]*)?(?P=quote)""")
+# url(fonts/x.ttf), url('../fonts/x.woff2'), url("/static/icons/x.png")
+CSS_REFERENCE = re.compile(r"""url\(\s*(?P<quote>['"]?)(?P<ref>[^'")?#]+)(?P<suffix>[?#][^'")]*)?(?P=quote)\s*\)""")
+# src="/static/js/spa.js", href="/static/css/main.css" в HTML
+HTML_REFERENCE = re.compile(r"""(?P<quote>['"])(?P<ref>/static/[^'"\n?#]+)(?P<suffix>[?#][^'"\n]*)?(?P=quote)""")
+
+
+def hashed_name(path, data):
+    """js/spa.js -> js/spa.3f9a0c1d2e.js"""
+    stem, extension = posixpath.splitext(path)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{extension}"
+
+
+class AssetBuilder:
+    """
+    Сборка статики: каждому файлу из sources даётся имя с хэшем содержимого, рядом
+    кладутся .br (если установлен brotli) и .gz, а manifest.json сопоставляет исходный
+    путь с собранным.
+
+    Ссылки между файлами (import в ES-модулях, url() в CSS, строки "/static/..." в JS)
+    переписываются на собранные имена, поэтому хэш файла меняется и при изменении
+    того, что он подключает. Старые сборки не удаляются - открытые у клиентов
+    страницы продолжают получать свои файлы.
+    """
+
+    def __init__(self, static_dir, out_dir, sources, url_prefix="/assets"):
+        self.static_dir = static_dir
+        self.out_dir = out_dir
+        self.url_prefix = url_prefix.rstrip("/")
+        self.files = set()
+        for source in sources:
+            for root, _, names in os.walk(os.path.join(static_dir, source)):
+                for name in names:
+                    full_path = os.path.join(root, name)
+                    self.files.add(os.path.relpath(full_path, static_dir).replace(os.sep, "/"))
+        self.manifest = {}
+        self._building = set()
+        # bytes/gzip_bytes/brotli_bytes - только по новым файлам этой сборки
+        self.stats = {"files": 0, "written": 0, "bytes": 0, "gzip_bytes": 0, "brotli_bytes": 0}
+
+    def build(self):
+        for path in sorted(self.files):
+            self._build(path)
+        os.makedirs(self.out_dir, exist_ok=True)
+        manifest_path = os.path.join(self.out_dir, MANIFEST_NAME)
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, manifest_path)
+        return self.manifest
+
+    def _build(self, path):
+        if path in self.manifest:
+            return self.manifest[path]
+        if path in self._building:
+            # Циклический импорт: ссылка остаётся на исходный файл
+            logger.warning(f"[AssetBuilder] Циклическая ссылка на {path}")
+            return None
+        self._building.add(path)
+        try:
+            with open(os.path.join(self.static_dir, path), "rb") as f:
+                data = f.read()
+            data = self._rewrite(path, data)
+            target = hashed_name(path, data)
+            self._write(target, data)
+            self.manifest[path] = target
+            return target
+        finally:
+            self._building.discard(path)
+
+    def _rewrite(self, path, data):
+        extension = posixpath.splitext(path)[1]
+        if extension in (".js", ".mjs"):
+            pattern = JS_REFERENCE
+        elif extension == ".css":
+            pattern = CSS_REFERENCE
+        else:
+            return data
+        text = data.decode("utf-8")
+        base_dir = posixpath.dirname(path)
+
+        def replace(match):
+            ref = match.group("ref").strip()
+            if ref.startswith("/static/"):
+                target = ref[len("/static/"):]
+            elif ref.startswith(("data:", "http:", "https:", "//", "/")):
+                return match.group(0)
+            else:
+                target = posixpath.normpath(posixpath.join(base_dir, ref))
+            if target not in self.files:
+                return match.group(0)
+            built = self._build(target)
+            if built is None:
+                return match.group(0)
+
+            if ref.startswith("/static/"):
+                new_ref = f"{self.url_prefix}/{built}"
+            else:
+                # Меняем только имя файла, относительная часть пути остаётся как была
+                new_ref = ref[:len(ref) - len(posixpath.basename(ref))] + posixpath.basename(built)
+            return match.group(0).replace(match.group("ref"), new_ref, 1)
+
+        return pattern.sub(replace, text).encode("utf-8")
+
+    def _write(self, target, data):
+        out_path = os.path.join(self.out_dir, target)
+        self.stats["files"] += 1
+        if os.path.exists(out_path):
+            return  # Тот же хэш - файл уже собран раньше
+        self.stats["written"] += 1
+        self.stats["bytes"] += len(data)
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        _write_atomic(out_path, data)
+
+        if posixpath.splitext(target)[1] not in COMPRESSIBLE:
+            return
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(compressed) < len(data) * MIN_SAVING:
+            _write_atomic(f"{out_path}.gz", compressed)
+            self.stats["gzip_bytes"] += len(compressed)
+        if brotli is not None:
+            compressed = brotli.compress(data, quality=11)
+            if len(compressed) < len(data) * MIN_SAVING:
+                _write_atomic(f"{out_path}.br", compressed)
+                self.stats["brotli_bytes"] += len(compressed)
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class AssetManifest:
+    """
+    Адреса собранной статики для шаблонов и отдача её с предсжатыми копиями.
+
+    asset_url("css/main.css") -> /assets/css/main.3f9a0c1d2e.css, если файл есть в
+    manifest.json (flask build-static), иначе обычный /static/css/main.css.
+    """
+
+    def __init__(self, out_dir="static/dist", url_prefix="/assets"):
+        self.out_dir = out_dir
+        self.url_prefix = url_prefix
+        self.manifest = {}
+        self.files = set()  # Собранные файлы текущего манифеста - только их и отдаёт send()
+
+    def init_app(self, app):
+        self.out_dir = os.path.join(app.root_path, app.config.get("STATIC_ASSETS_DIR", self.out_dir))
+        self.url_prefix = app.config.get("STATIC_ASSETS_URL", self.url_prefix).rstrip("/")
+        self.load()
+        app.jinja_env.globals["asset_url"] = self.url_for
+        app.extensions["asset_manifest"] = self
+
+    def load(self):
+        manifest_path = os.path.join(self.out_dir, MANIFEST_NAME)
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                self.manifest = json.load(f)
+            logger.info(f"[AssetManifest] Загружен манифест: {len(self.manifest)} файлов")
+        except FileNotFoundError:
+            self.manifest = {}
+            logger.info("[AssetManifest] Манифест не собран (flask build-static), статика отдаётся как есть")
+        self.files = set(self.manifest.values())
+
+    def url_for(self, path):
+        path = path.lstrip("/")
+        built = self.manifest.get(path)
+        return f"{self.url_prefix}/{built}" if built else f"/static/{path}"
+
+    def rewrite_html(self, text):
+        """Заменяет ссылки /static/... в HTML на собранные файлы"""
+        if not self.manifest:
+            return text
+
+        def replace(match):
+            path = match.group("ref")[len("/static/"):]
+            if path not in self.manifest:
+                return match.group(0)
+            return match.group(0).replace(match.group("ref"), self.url_for(path), 1)
+
+        return HTML_REFERENCE.sub(replace, text)
+
+    def send(self, filename):
+        """
+        Отдаёт собранный файл из манифеста: .br или .gz по Accept-Encoding, кэш на год.
+        Всё остальное в out_dir (manifest.json, временные файлы) - 404.
+        """
+        if filename not in self.files:
+            abort(404)
+        path = safe_join(self.out_dir, filename)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+
+        accepted = {
+            part.split(";")[0].strip()
+            for part in request.headers.get("Accept-Encoding", "").lower().split(",")
+        }
+        encoding = None
+        for candidate, extension in (("br", ".br"), ("gzip", ".gz")):
+            if candidate in accepted and os.path.isfile(path + extension):
+                encoding, path = candidate, path + extension
+                break
+
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        response = send_file(path, mimetype=mimetype, max_age=ASSET_MAX_AGE, conditional=True)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.headers["Vary"] = "Accept-Encoding"
+        response.headers["Cache-Control"] = f"public, max-age={ASSET_MAX_AGE}, immutable"
+        return response
+
+
+asset_manifest = AssetManifest()
@@ -0,0 +1,136 @@
+import asyncio
+import atexit
+import concurrent.futures
+import logging
+import os
+import threading
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+TELEGRAM_API_URL = "https://api.telegram.org"
+
+
+class TelegramApiError(Exception):
+    """Telegram ответил ok=false или не ответил вовсе"""
+
+
+class TelegramApi:
+    """
+    Клиент Bot API для веб-процесса: один долгоживущий event loop в фоновом потоке
+    и одна aiohttp-сессия с пулом соединений на процесс.
+
+    Синхронные обработчики Flask вызывают call()/download() и ждут результат, а сами
+    запросы выполняются в общем loop: одновременные запросы разных потоков идут
+    параллельно по уже открытым TLS-соединениям, без создания loop и рукопожатия
+    на каждый запрос. Корутины call_async()/download_async() можно объединять
+    через run(asyncio.gather(...)).
+
+    Loop запускается при первом обращении, поэтому после fork (воркеры gunicorn)
+    у каждого процесса он свой.
+    """
+
+    def __init__(self, token=None, timeout=10, pool_size=20):
+        self.token = token
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._loop = None
+        self._pid = None
+        self._session = None
+
+    def init_app(self, app):
+        self.token = app.config.get("BOT_TOKEN", self.token)
+        self.timeout = app.config.get("TELEGRAM_API_TIMEOUT_SECONDS", self.timeout)
+        self.pool_size = app.config.get("TELEGRAM_API_POOL_SIZE", self.pool_size)
+        app.extensions["telegram_api"] = self
+
+    # ---------------------------------------------------------------------------
+    # Фоновый event loop
+    # ---------------------------------------------------------------------------
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._pid = os.getpid()
+                self._session = None
+                threading.Thread(target=self._loop.run_forever, name="telegram-api", daemon=True).start()
+                logger.info(f"[TelegramApi] Event loop запущен, соединений в пуле: {self.pool_size}")
+            return self._loop
+
+    def run(self, coro, timeout=None):
+        """Выполняет корутину в общем loop и ждёт результат из синхронного кода"""
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        try:
+            return future.result(timeout if timeout is not None else self.timeout * 2)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TelegramApiError("Нет ответа от Telegram") from None
+
+    async def _get_session(self):
+        # Создаётся и используется только внутри фонового loop, поэтому без блокировки
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    def close(self):
+        loop = self._loop
+        if loop is None or self._pid != os.getpid() or not loop.is_running():
+            return
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), loop).result(self.timeout)
+        loop.call_soon_threadsafe(loop.stop)
+
+    # ---------------------------------------------------------------------------
+    # Bot API
+    # ---------------------------------------------------------------------------
+
+    async def call_async(self, method, **params):
+        """Вызов метода Bot API; возвращает result или бросает TelegramApiError"""
+        if not self.token:
+            raise TelegramApiError("BOT_TOKEN не установлен")
+        session = await self._get_session()
+        try:
+            async with session.post(f"{TELEGRAM_API_URL}/bot{self.token}/{method}", json=params) as response:
+                payload = await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise TelegramApiError(f"{method}: {e!r}") from e
+        if not payload.get("ok"):
+            raise TelegramApiError(f"{method}: {payload.get('description')}")
+        return payload["result"]
+
+    async def download_async(self, file_path):
+        """Байты файла по file_path из getFile"""
+        session = await self._get_session()
+        try:
+            async with session.get(f"{TELEGRAM_API_URL}/file/bot{self.token}/{file_path}") as response:
+                response.raise_for_status()
+                return await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise TelegramApiError(f"Загрузка {file_path}: {e!r}") from e
+
+    async def get_file_async(self, file_id):
+        """getFile и загрузка файла за один заход в loop"""
+        file = await self.call_async("getFile", file_id=file_id)
+        if not file.get("file_path"):
+            raise TelegramApiError(f"getFile: нет file_path для {file_id}")
+        return await self.download_async(file["file_path"])
+
+    def call(self, method, **params):
+        return self.run(self.call_async(method, **params))
+
+    def download(self, file_path):
+        return self.run(self.download_async(file_path))
+
+    def get_file(self, file_id):
+        return self.run(self.get_file_async(file_id))
+
+
+telegram_api = TelegramApi()
+atexit.register(telegram_api.close)
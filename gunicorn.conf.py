@@ -0,0 +1,37 @@
+# gunicorn.conf.py
+"""
+Настройки gunicorn для веб-процесса (python main.py web или gunicorn -c gunicorn.conf.py wsgi:app).
+
+Каждый воркер - отдельный процесс со своим create_app(), пулом соединений БД и
+буфером просмотров, поэтому запросы не упираются в одно ядро и один GIL.
+Плавная перезагрузка кода: kill -HUP <pid мастера> - новые воркеры поднимаются,
+старые дорабатывают текущие запросы в пределах graceful_timeout.
+"""
+import multiprocessing
+
+from config import Config
+
+bind = Config.WEB_BIND
+workers = Config.WEB_WORKERS or multiprocessing.cpu_count() * 2 + 1
+worker_class = "gthread"
+threads = Config.WEB_THREADS
+timeout = Config.WEB_TIMEOUT
+graceful_timeout = Config.WEB_GRACEFUL_TIMEOUT
+keepalive = 5
+
+# Воркер перезапускается после стольких запросов - страховка от утечек памяти
+max_requests = 2000
+max_requests_jitter = 200
+
+# Приложение создаётся в каждом воркере после fork: фоновые потоки (буфер просмотров)
+# и соединения с БД не должны делиться между процессами
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
+
+
+def worker_exit(server, worker):
+    """Записывает буфер просмотров остановленного воркера (SIGHUP/SIGTERM)"""
+    from db.view_buffer import view_buffer
+    view_buffer.flush()
@@ -1,4 +1,8 @@
 import os
+import sys
+import signal
+import argparse
+import importlib.util
 import threading
 import subprocess
 import time
@@ -6,14 +10,16 @@ import requests
 import logging
 import webbrowser
 
-from flask import Flask, request, redirect, send_from_directory
-from werkzeug.middleware.proxy_fix import ProxyFix
-from flask_migrate import Migrate
+from sqlalchemy import func
 
 from config import Config
+from app_factory import configure_logging, create_app
 from fck_app.bot import run_bot
-from routes import main_bp
 from db.models import db
+from fck_app.media_downloader import MediaDownloader
+from fck_app.media_variants import MediaProcessor
+from fck_app.catch_up import ChannelCatchUp
+from fck_app.album_assembler import AlbumAssembler
 
 # =============== Импорт Telethon и asyncio ===================
 import asyncio
@@ -35,19 +41,6 @@ CHANNELS = [
 CLOUDFLARED_PATH = r"C:\Program Files\Cloudflare\cloudflared.exe"
 TUNNEL_ID = "3794b256-70f9-4f6c-a5a9-6ae640e8854b"
 
-FLASK_READY = threading.Event()
-
-def configure_logging():
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler("app.log")
-        ]
-    )
-    print("[LOGGING] Расширенное логирование настроено")
-
 def start_cloudflare_tunnel():
     """Запускает Cloudflare туннель"""
     try:
@@ -102,223 +95,332 @@ def check_site_status(url, timeout=30):
     print(f"[SITE] 🔴 Сайт недоступен: {url}")
     return False
 
-def create_app(config_class=Config):
-    app = Flask(__name__, static_folder="static", template_folder="templates")
-    app.config.from_object(config_class)
-    app.config["SQLALCHEMY_DATABASE_URI"] = config_class.DATABASE_URI
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-
-    db.init_app(app)
-    migrate = Migrate(app, db)
-    
-    # Настройка ProxyFix для работы с Cloudflare
-    app.wsgi_app = ProxyFix(
-        app.wsgi_app,
-        x_for=2,
-        x_proto=2,
-        x_host=1,
-        x_prefix=1,
-        x_port=1
-    )
-
-    app.register_blueprint(main_bp)
-
-    with app.app_context():
-        db.create_all()
-        print("\nЗарегистрированные маршруты:")
-        for rule in app.url_map.iter_rules():
-            print(f"{rule.endpoint}: {rule.methods} {rule}")
-        print("\n")
-
-    @app.before_request
-    def before_request():
-        if Config.CLOUDFLARE_ENABLED:
-            if not request.is_secure and request.headers.get("X-Forwarded-Proto", "http") != "https":
-                if not request.host.startswith(("127.0.0.1", "localhost")):
-                    url = request.url.replace("http://", "https://", 1)
-                    return redirect(url, code=301)
-
-    @app.route("/health")
-    def health_check():
-        return {"status": "healthy"}, 200
-
-    return app
-
-def run_flask(app):
-    app.run(
-        host="0.0.0.0",
-        port=5000,
-        debug=False,
-        use_reloader=False
-    )
+def run_web():
+    """
+    Веб-процесс: gunicorn с несколькими воркерами (Linux), waitress (Windows, где gunicorn
+    не работает) или, если ни один не установлен, dev-сервер Flask.
+    """
+    if os.name != "nt" and importlib.util.find_spec("gunicorn"):
+        # Процесс целиком становится мастером gunicorn: SIGHUP - плавная перезагрузка воркеров
+        os.execvp(sys.executable, [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"])
 
-def start_telegram_scraper(flask_app):
+    from wsgi import app
+    host, port = Config.WEB_BIND.rsplit(":", 1)
+    try:
+        from waitress import serve
+    except ImportError:
+        logging.warning("[WEB] gunicorn/waitress не установлены, запускаем dev-сервер Flask")
+        app.run(host=host, port=int(port), debug=False, use_reloader=False, threaded=True)
+        return
+    logging.info(f"[WEB] waitress на {Config.WEB_BIND}, потоков: {Config.WEB_THREADS}")
+    serve(app, host=host, port=int(port), threads=Config.WEB_THREADS)
+
+def run_scraper():
     """
-    Запускает Telethon-клиента в отдельном потоке (daemon=True).
+    Процесс Telethon-скрейпера. Своё приложение Flask нужно только для доступа к БД.
     """
+    configure_logging()
+    flask_app = create_app()
+
     async def runner():
         client = TelegramClient(SESSION_NAME, API_ID, API_HASH)
         async with client:
             await client.start(phone=PHONE_NUMBER)
             logging.info("[TELETHON] Клиент авторизован")
             await telegram_scraper(client, flask_app)
-    def thread_target():
-        asyncio.run(runner())
-    thread = threading.Thread(target=thread_target, daemon=True)
-    thread.start()
+    asyncio.run(runner())
+
+# ============== ОБРАБОТКА СООБЩЕНИЙ ===================
+MEDIA_INCOMING_DIR = "static/media/incoming/"  # Сюда качает Telethon, потом файл уходит в db/media_store.py
 
-# ============== ALBUM ОБРАБОТКА ===================
-pending_albums = {}   # Ключ: grouped_id, значение: список сообщений
-ALBUM_TIMEOUT = 2     # Задержка в секундах для сбора частей альбома
+def media_kind(message):
+    """photo / video или None, если медиа сообщения не нужно скачивать"""
+    if not message.media:
+        return None
+    if isinstance(message.media, MessageMediaPhoto):
+        return "photo"
+    if isinstance(message.media, MessageMediaDocument):
+        if message.file and message.file.mime_type and message.file.mime_type.startswith("video"):
+            return "video"
+    return None
 
 async def telegram_scraper(client, flask_app):
     """
     Телеграм-скрейпер, который слушает новые сообщения в каналах.
     Если сообщение имеет grouped_id (альбом), объединяет все части в один пост.
+
+    Слушатель только фиксирует id сообщения в локальной очереди (db/ingest.py), медиа
+    качаются отдельно, а в БД посты пачками пишет IngestWriter в своём потоке -
+    медленный коммит не задерживает приём сообщений, а падение процесса ничего не теряет.
     """
     from db.models import News  # Импортируем здесь, чтобы избежать циклических импортов
+    from db.media_store import move_to_store
+    from db.ingest import IngestQueue, IngestWriter
+
+    loop = asyncio.get_running_loop()
+    downloader = MediaDownloader(
+        client,
+        concurrency=Config.MEDIA_DOWNLOAD_CONCURRENCY,
+        per_channel=Config.MEDIA_DOWNLOAD_PER_CHANNEL,
+        retries=Config.MEDIA_DOWNLOAD_RETRIES,
+        backoff=Config.MEDIA_DOWNLOAD_BACKOFF_SECONDS
+    )
+    processor = MediaProcessor(
+        workers=Config.MEDIA_PROCESS_WORKERS,
+        widths=Config.MEDIA_VARIANT_WIDTHS,
+        formats=Config.MEDIA_VARIANT_FORMATS
+    )
 
-    @client.on(events.NewMessage(chats=CHANNELS))
-    async def new_message_listener(event):
-        message = event.message
-        # Если сообщение принадлежит альбому
-        if message.grouped_id:
-            gid = message.grouped_id
-            if gid not in pending_albums:
-                pending_albums[gid] = []
-                # Запускаем обработчик альбома через ALBUM_TIMEOUT секунд
-                asyncio.create_task(process_album(gid, client, flask_app))
-            pending_albums[gid].append(message)
+    async def attach_media_variants(news_id, paths):
+        """Строит варианты медиа уже сохранённой новости в пуле процессов и записывает их в News"""
+        variants = await processor.process(paths)
+        if not variants:
             return
-        else:
-            # Одиночное сообщение – стандартная обработка
-            await process_single_message(message, client, flask_app)
-
-    async def process_single_message(message, client, flask_app):
-        text = message.message or ""
-        image_url = None
-        video_url = None
-
-        if message.media:
-            if isinstance(message.media, MessageMediaPhoto):
-                file_path = await client.download_media(message.media, file="static/news_photos/")
-                image_url = file_path
-            elif isinstance(message.media, MessageMediaDocument):
-                if message.file and message.file.mime_type and message.file.mime_type.startswith("video"):
-                    file_path = await client.download_media(message.media, file="static/news_videos/")
-                    video_url = file_path
-
-        title = text[:50] if len(text) > 50 else text
-        channel = await message.get_chat()
-
         with flask_app.app_context():
-            news_item = News(
-                channel_id=str(channel.id),
-                telegram_message_id=message.id,
-                title=title,
-                text=text,
-                image_url=image_url,
-                video_url=video_url,
-                is_approved=False
-            )
-            db.session.add(news_item)
+            News.query.filter_by(id=news_id).update({News.media_variants: variants})
             db.session.commit()
-            logging.info(f"[TELEGRAM] Одиночная новость из канала {channel.title} сохранена, ID={news_item.id}")
+            logging.info(f"[TELEGRAM] Варианты медиа для новости ID={news_id} готовы: {len(variants)} файлов")
+
+    ingest_queue = IngestQueue(Config.INGEST_QUEUE_PATH)
+    writer = IngestWriter(
+        ingest_queue,
+        flask_app,
+        batch_size=Config.INGEST_BATCH_SIZE,
+        interval=Config.INGEST_FLUSH_SECONDS,
+        max_attempts=Config.INGEST_MAX_ATTEMPTS,
+        # Писатель работает в своём потоке, варианты медиа строятся в event loop скрейпера
+        on_saved=lambda news_id, paths: asyncio.run_coroutine_threadsafe(attach_media_variants(news_id, paths), loop)
+    )
+    writer.start()
+
+    async def download_files(messages):
+        """
+        Скачивает медиа сообщений параллельно и переносит их в хранилище по хэшу.
+        Возвращает [(путь, вид, sha256), ...] в порядке сообщений.
+        """
+        media_messages = [(msg, kind) for msg in messages if (kind := media_kind(msg))]
+        if not media_messages:
+            return []
+        jobs = [(msg.media, MEDIA_INCOMING_DIR) for msg, _ in media_messages]
+        paths = await downloader.download_many(messages[0].chat_id, jobs)
+
+        files = []
+        for path, (_, kind) in zip(paths, media_messages):
+            if path:
+                stored_path, sha256 = await asyncio.to_thread(move_to_store, path)
+                files.append((stored_path, kind, sha256))
+        return files
+
+    async def assemble_post(messages):
+        """Качает медиа поста (одиночного или альбома целиком) и передаёт его писателю"""
+        messages = sorted(messages, key=lambda msg: msg.id)
+        files = await download_files(messages)
+        channel = await messages[0].get_chat()
+
+        payload = {
+            "channel_id": str(channel.id),
+            # Подпись альбома Telegram кладёт в одну из частей, обычно в первую
+            "text": next((msg.message for msg in messages if msg.message), ""),
+            "files": files
+        }
+        ingest_queue.complete_download(messages[0].chat_id, [msg.id for msg in messages], payload)
+        writer.wake()
+        logging.info(f"[TELEGRAM] Пост из канала {channel.title} собран: сообщений {len(messages)}, файлов {len(files)}")
+
+    async def recover_pending():
+        """Досбирает посты, принятые слушателем, но не собранные до остановки процесса"""
+        for chat_id, rows in ingest_queue.pending_messages().items():
+            message_ids = [message_id for message_id, _ in rows]
+            messages = await client.get_messages(chat_id, ids=message_ids)
+
+            deleted = [message_id for message_id, msg in zip(message_ids, messages) if msg is None]
+            if deleted:
+                ingest_queue.drop_messages(chat_id, deleted)
+
+            groups = {}
+            for msg in messages:
+                if msg is not None:
+                    groups.setdefault(msg.grouped_id or -msg.id, []).append(msg)
+            logging.info(f"[TELEGRAM] Восстановление канала {chat_id}: постов {len(groups)}")
+            for group in groups.values():
+                await assemble_post(group)
+
+    def catch_up_floor(chat_id, channel_id):
+        """
+        С какого сообщения догонять канал: граница догона из очереди. Пока догон ни разу
+        не проходил (новая или старая очередь), - последнее записанное сообщение, иначе News.
+        """
+        floor = ingest_queue.catch_up_floor(chat_id)
+        if floor is not None:
+            return floor
+        last_id = ingest_queue.last_message_id(chat_id)
+        if last_id:
+            return last_id
+        with flask_app.app_context():
+            return db.session.query(func.max(News.telegram_message_id)).filter(News.channel_id == channel_id).scalar() or 0
+
+    async def enqueue_post(messages):
+        for msg in messages:
+            ingest_queue.add_message(msg.chat_id, msg.id, msg.grouped_id)
+        await assemble_post(messages)
+
+    catch_up = ChannelCatchUp(
+        client,
+        CHANNELS,
+        catch_up_floor,
+        ingest_queue.advance_catch_up_floor,
+        enqueue_post,
+        initial_messages=Config.CATCH_UP_INITIAL_MESSAGES,
+        max_in_flight=Config.CATCH_UP_MAX_IN_FLIGHT,
+        page_size=Config.CATCH_UP_PAGE_SIZE
+    )
 
-    async def process_album(grouped_id, client, flask_app):
-        # Ждем ALBUM_TIMEOUT секунд для сбора всех частей альбома
-        await asyncio.sleep(ALBUM_TIMEOUT)
-        album_messages = pending_albums.pop(grouped_id, [])
-        if not album_messages:
-            return
+    # Все части альбома качаются параллельно, пост уходит в очередь, когда загрузятся все
+    albums = AlbumAssembler(
+        assemble_post,
+        idle_gap=Config.ALBUM_IDLE_GAP_SECONDS,
+        max_wait=Config.ALBUM_MAX_WAIT_SECONDS
+    )
 
-        media_urls = []
-        text = album_messages[0].message or ""
-        title = text[:50] if len(text) > 50 else text
-        channel = await album_messages[0].get_chat()
-
-        for msg in album_messages:
-            if msg.media:
-                if isinstance(msg.media, MessageMediaPhoto):
-                    file_path = await client.download_media(msg.media, file="static/news_photos/")
-                    media_urls.append(file_path)
-                elif isinstance(msg.media, MessageMediaDocument):
-                    if msg.file and msg.file.mime_type and msg.file.mime_type.startswith("video"):
-                        file_path = await client.download_media(msg.media, file="static/news_videos/")
-                        media_urls.append(file_path)
-        # Сохраняем одну новость для всего альбома.
-        # Вместо сохранения JSON-строки, сохраняем список URL как строку, разделённую запятыми.
-        media_str = ",".join(media_urls)
-        with flask_app.app_context():
-            news_item = News(
-                channel_id=str(channel.id),
-                telegram_message_id=album_messages[0].id,  # Можно сохранить grouped_id вместо id первого сообщения
-                title=title,
-                text=text,
-                image_url=media_str,  # Здесь теперь строка с запятыми, например: "url1,url2"
-                video_url=None,
-                is_approved=False
-            )
-            db.session.add(news_item)
-            db.session.commit()
-            logging.info(f"[TELEGRAM] Альбом из {len(album_messages)} сообщений сохранён, ID={news_item.id}, media={media_urls}")
+    async def publish_state():
+        """
+        Веб работает в других процессах, поэтому состояние догона и сборки альбомов
+        публикуется в очередь (scraper_state), а запрос на догон из API забирается оттуда же
+        """
+        while True:
+            try:
+                ingest_queue.set_state("catch_up", catch_up.status())
+                ingest_queue.set_state("albums", albums.stats())
+                if ingest_queue.pop_state("catch_up_request") is not None and not catch_up.running:
+                    logging.info("[TELETHON] Догон каналов запрошен через API")
+                    asyncio.create_task(catch_up.run())
+            except Exception as e:
+                logging.error(f"[TELETHON] Ошибка публикации состояния: {e}")
+            await asyncio.sleep(Config.SCRAPER_STATE_SECONDS)
 
+    @client.on(events.NewMessage(chats=CHANNELS))
+    async def new_message_listener(event):
+        message = event.message
+        ingest_queue.add_message(message.chat_id, message.id, message.grouped_id)
+
+        # Если сообщение принадлежит альбому - ждём остальные части (см. fck_app/album_assembler.py)
+        if message.grouped_id:
+            albums.add(message)
+        else:
+            # Одиночное сообщение – собираем, не задерживая слушателя
+            asyncio.create_task(assemble_post([message]))
+
+    @client.on(events.Album(chats=CHANNELS))
+    async def album_listener(event):
+        # Части приходят через NewMessage выше; событие Album только сообщает их число,
+        # чтобы не ждать idle_gap, когда все части уже на месте
+        albums.expect(event.grouped_id, len(event.messages))
+
+    asyncio.create_task(publish_state())
+    await recover_pending()
+    if Config.CATCH_UP_ON_START:
+        # Всё, что вышло в каналах, пока процесс не работал; живые сообщения принимаются параллельно
+        asyncio.create_task(catch_up.run())
     logging.info("[TELETHON] Telegram клиент запущен, ждём новые сообщения...")
-    await client.run_until_disconnected()
+    try:
+        await client.run_until_disconnected()
+    finally:
+        processor.shutdown()
 
-def main():
-    configure_logging()
-    app = create_app()
-    
+ROLES = ("web", "bot", "scraper")
+RESTART_BACKOFF_MAX = 60  # Максимальная пауза перед перезапуском упавшего процесса
+
+def start_role(role):
+    """Запускает роль отдельным процессом: python main.py <роль>"""
+    print(f"[MAIN] Запуск процесса {role}")
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), role])
+
+def supervise():
+    """
+    Веб, бот и скрейпер работают отдельными процессами: падение или зависание одного
+    не останавливает остальные, упавший процесс перезапускается с нарастающей паузой.
+    SIGHUP пересылается веб-процессу - gunicorn плавно перезапускает воркеры.
+    """
     print("\n=== Запуск приложения ===")
     print(f"[CONFIG] Домен: {Config.CLOUDFLARE_DOMAIN}")
     print(f"[CONFIG] Cloudflare: {'Включен' if Config.CLOUDFLARE_ENABLED else 'Отключен'}")
     print(f"[CONFIG] Режим: {'Production' if not Config.DEBUG else 'Development'}")
     print(f"[CONFIG] URL: {Config.PUBLIC_URL}")
+    print(f"[CONFIG] Веб: {Config.WEB_BIND}, воркеров: {Config.WEB_WORKERS or 'авто'}, потоков: {Config.WEB_THREADS}")
     print("=======================\n")
-    
+
     # Запускаем Cloudflare туннель
+    tunnel_process = None
     if Config.CLOUDFLARE_ENABLED:
         tunnel_process = start_cloudflare_tunnel()
         if not tunnel_process:
             print("[CLOUDFLARE] ⚠️ Не удалось запустить туннель")
             return
-        
+
         # Даем туннелю время на запуск
         time.sleep(5)
-    
-    # Запускаем Flask в отдельном потоке
-    flask_thread = threading.Thread(target=run_flask, args=(app,))
-    flask_thread.daemon = True
-    flask_thread.start()
-    
-    # Запускаем Telegram бота
-    bot_thread = threading.Thread(target=run_bot)
-    bot_thread.daemon = True
-    bot_thread.start()
-    
-    # Запускаем Telegram скрейпер
-    scraper_thread = threading.Thread(target=start_telegram_scraper, args=(app,))
-    scraper_thread.daemon = True
-    scraper_thread.start()
-    
+
+    processes = {role: start_role(role) for role in ROLES}
+    backoff = {role: 1 for role in ROLES}
+    started_at = {role: time.time() for role in ROLES}
+
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda *_: processes["web"].send_signal(signal.SIGHUP))
+
     # Проверяем доступность сайта
     if Config.CLOUDFLARE_ENABLED:
         site_url = f"https://{Config.CLOUDFLARE_DOMAIN}"
         if check_site_status(site_url):
             print(f"[SITE] 🎉 Сайт успешно запущен на {site_url}")
-    
+
     try:
         while True:
             time.sleep(1)
+            for role, process in processes.items():
+                code = process.poll()
+                if code is None:
+                    continue
+                # Процесс проработал дольше минуты - считаем, что он был здоров, и сбрасываем паузу
+                if time.time() - started_at[role] > RESTART_BACKOFF_MAX:
+                    backoff[role] = 1
+                print(f"[MAIN] 🔴 Процесс {role} завершился с кодом {code}, перезапуск через {backoff[role]} с")
+                time.sleep(backoff[role])
+                backoff[role] = min(backoff[role] * 2, RESTART_BACKOFF_MAX)
+                processes[role] = start_role(role)
+                started_at[role] = time.time()
     except KeyboardInterrupt:
         print("\n=== Завершение работы приложения ===")
         print("[SITE] Сайт будет недоступен")
         print("[CLOUDFLARE] Туннель будет закрыт")
         print("===============================\n")
-        if Config.CLOUDFLARE_ENABLED and tunnel_process:
+        for process in processes.values():
+            if process.poll() is None:
+                process.terminate()
+        for process in processes.values():
+            try:
+                process.wait(timeout=Config.WEB_GRACEFUL_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if tunnel_process:
             tunnel_process.terminate()
-        os._exit(0)
+
+def main():
+    parser = argparse.ArgumentParser(description="FCK: веб, бот и скрейпер")
+    parser.add_argument(
+        "role", nargs="?", default="all", choices=("all",) + ROLES,
+        help="all - все роли отдельными процессами под присмотром (по умолчанию)"
+    )
+    role = parser.parse_args().role
+
+    if role == "web":
+        run_web()
+    elif role == "bot":
+        configure_logging()
+        run_bot()
+    elif role == "scraper":
+        run_scraper()
+    else:
+        supervise()
 
 if __name__ == "__main__":
     main()
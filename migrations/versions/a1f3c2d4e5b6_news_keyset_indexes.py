@@ -0,0 +1,33 @@
+"""news keyset pagination indexes
+
+Revision ID: a1f3c2d4e5b6
+Revises:
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1f3c2d4e5b6'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # IF NOT EXISTS: на свежей базе индексы уже создал db.create_all()
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_news_approved_created_at_id "
+        "ON news (is_approved, created_at, id)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_news_created_at_id "
+        "ON news (created_at, id)"
+    )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_news_created_at_id")
+    op.execute("DROP INDEX IF EXISTS ix_news_approved_created_at_id")
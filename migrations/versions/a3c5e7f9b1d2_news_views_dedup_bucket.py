@@ -0,0 +1,29 @@
+"""news_views dedup bucket (news_id, user_id, view_bucket)
+
+Revision ID: a3c5e7f9b1d2
+Revises: e1f3a5b7c9d0
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c5e7f9b1d2'
+down_revision = 'e1f3a5b7c9d0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Старые строки остаются с NULL - уникальный индекс их не сравнивает
+    op.add_column('news_views', sa.Column('view_bucket', sa.BigInteger(), nullable=True))
+    op.create_index(
+        'uq_news_views_user_bucket', 'news_views', ['news_id', 'user_id', 'view_bucket'], unique=True
+    )
+
+
+def downgrade():
+    op.drop_index('uq_news_views_user_bucket', table_name='news_views')
+    op.drop_column('news_views', 'view_bucket')
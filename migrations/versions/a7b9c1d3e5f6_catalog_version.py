@@ -0,0 +1,30 @@
+"""catalog version for item cache invalidation
+
+Revision ID: a7b9c1d3e5f6
+Revises: f6a8b0c2d4e5
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7b9c1d3e5f6'
+down_revision = 'f6a8b0c2d4e5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    op.execute("INSERT INTO catalog_version (id, version) VALUES (1, 1) ON CONFLICT (id) DO NOTHING")
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS catalog_version")
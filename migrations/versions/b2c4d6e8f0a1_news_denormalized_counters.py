@@ -0,0 +1,34 @@
+"""news denormalized counters
+
+Revision ID: b2c4d6e8f0a1
+Revises: a1f3c2d4e5b6
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2c4d6e8f0a1'
+down_revision = 'a1f3c2d4e5b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for column in ("likes_count", "viewers_count", "comment_count"):
+        op.execute(f"ALTER TABLE news ADD COLUMN IF NOT EXISTS {column} INTEGER NOT NULL DEFAULT 0")
+
+    # Заполняем счётчики из исходных таблиц
+    op.execute("""
+        UPDATE news SET
+            likes_count = (SELECT COUNT(*) FROM likes WHERE likes.news_id = news.id),
+            viewers_count = (SELECT COUNT(*) FROM news_views WHERE news_views.news_id = news.id),
+            comment_count = (SELECT COUNT(*) FROM comments WHERE comments.news_id = news.id)
+    """)
+
+
+def downgrade():
+    for column in ("comment_count", "viewers_count", "likes_count"):
+        op.execute(f"ALTER TABLE news DROP COLUMN IF EXISTS {column}")
@@ -0,0 +1,57 @@
+"""inventory_entries table replacing users.inventory JSONB
+
+Revision ID: b8c0d2e4f6a7
+Revises: a7b9c1d3e5f6
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8c0d2e4f6a7'
+down_revision = 'a7b9c1d3e5f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_entries (
+            user_id BIGINT NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            item_id INTEGER NOT NULL REFERENCES items (id) ON DELETE CASCADE,
+            quantity INTEGER NOT NULL DEFAULT 1,
+            acquired_at TIMESTAMP,
+            PRIMARY KEY (user_id, item_id)
+        )
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_inventory_entries_item_id ON inventory_entries (item_id)")
+
+    # Переносим JSONB-массивы: повторы одного id превращаются в quantity,
+    # id несуществующих предметов пропускаются
+    op.execute("""
+        INSERT INTO inventory_entries (user_id, item_id, quantity, acquired_at)
+        SELECT u.id, elem.value::int, COUNT(*), COALESCE(u.updated_at, now())
+        FROM users u
+        CROSS JOIN LATERAL jsonb_array_elements_text(
+            CASE WHEN jsonb_typeof(u.inventory) = 'array' THEN u.inventory ELSE '[]'::jsonb END
+        ) AS elem(value)
+        WHERE elem.value ~ '^[0-9]+$'
+          AND EXISTS (SELECT 1 FROM items i WHERE i.id = elem.value::int)
+        GROUP BY u.id, elem.value::int, u.updated_at
+        ON CONFLICT (user_id, item_id) DO NOTHING
+    """)
+    # Колонка users.inventory остаётся как резервная копия до следующего релиза
+
+
+def downgrade():
+    # Возвращаем инвентарь в JSONB (quantity разворачивается в повторы id)
+    op.execute("""
+        UPDATE users u SET inventory = COALESCE((
+            SELECT jsonb_agg(e.item_id ORDER BY e.acquired_at)
+            FROM inventory_entries e, generate_series(1, e.quantity)
+            WHERE e.user_id = u.id
+        ), '[]'::jsonb)
+    """)
+    op.execute("DROP TABLE IF EXISTS inventory_entries")
@@ -0,0 +1,43 @@
+"""news viewer sketches and daily view rollup
+
+Revision ID: c3d5e7f9a1b2
+Revises: b2c4d6e8f0a1
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d5e7f9a1b2'
+down_revision = 'b2c4d6e8f0a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("ALTER TABLE news ADD COLUMN IF NOT EXISTS unique_viewers_count INTEGER NOT NULL DEFAULT 0")
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS news_viewer_sketches (
+            news_id INTEGER PRIMARY KEY REFERENCES news (id) ON DELETE CASCADE,
+            registers BYTEA NOT NULL,
+            updated_at TIMESTAMP
+        )
+    """)
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS news_view_daily (
+            news_id INTEGER NOT NULL REFERENCES news (id) ON DELETE CASCADE,
+            day DATE NOT NULL,
+            views INTEGER NOT NULL DEFAULT 0,
+            unique_viewers INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (news_id, day)
+        )
+    """)
+    # Сами скетчи заполняются командой `flask backfill-viewer-sketches`
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS news_view_daily")
+    op.execute("DROP TABLE IF EXISTS news_viewer_sketches")
+    op.execute("ALTER TABLE news DROP COLUMN IF EXISTS unique_viewers_count")
@@ -0,0 +1,25 @@
+"""news media variants
+
+Revision ID: c9d1e3f5a7b8
+Revises: b8c0d2e4f6a7
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9d1e3f5a7b8'
+down_revision = 'b8c0d2e4f6a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Варианты для уже сохранённых новостей строит `flask build-media-variants`
+    op.execute("ALTER TABLE news ADD COLUMN IF NOT EXISTS media_variants JSONB")
+
+
+def downgrade():
+    op.execute("ALTER TABLE news DROP COLUMN IF EXISTS media_variants")
@@ -0,0 +1,47 @@
+"""content-addressed media store and news_media
+
+Revision ID: d0e2f4a6b8c9
+Revises: c9d1e3f5a7b8
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd0e2f4a6b8c9'
+down_revision = 'c9d1e3f5a7b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS media (
+            id SERIAL PRIMARY KEY,
+            sha256 VARCHAR(64) NOT NULL UNIQUE,
+            path VARCHAR(500) NOT NULL,
+            kind VARCHAR(16) NOT NULL,
+            mime_type VARCHAR(100),
+            width INTEGER,
+            height INTEGER,
+            bytes BIGINT NOT NULL,
+            created_at TIMESTAMP
+        )
+    """)
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS news_media (
+            news_id INTEGER NOT NULL REFERENCES news (id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            media_id INTEGER NOT NULL REFERENCES media (id),
+            PRIMARY KEY (news_id, position)
+        )
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_news_media_media_id ON news_media (media_id)")
+    # Файлы уже сохранённых новостей регистрирует `flask backfill-news-media`
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS news_media")
+    op.execute("DROP TABLE IF EXISTS media")
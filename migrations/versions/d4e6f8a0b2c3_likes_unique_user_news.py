@@ -0,0 +1,40 @@
+"""likes unique (user_id, news_id)
+
+Revision ID: d4e6f8a0b2c3
+Revises: c3d5e7f9a1b2
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4e6f8a0b2c3'
+down_revision = 'c3d5e7f9a1b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Убираем дубли лайков, оставшиеся от гонок в like_news (оставляем самый ранний)
+    op.execute("""
+        DELETE FROM likes a
+        USING likes b
+        WHERE a.user_id = b.user_id AND a.news_id = b.news_id AND a.id > b.id
+    """)
+    op.execute("""
+        UPDATE news SET likes_count = (SELECT COUNT(*) FROM likes WHERE likes.news_id = news.id)
+    """)
+    op.execute("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uq_likes_user_news') THEN
+                ALTER TABLE likes ADD CONSTRAINT uq_likes_user_news UNIQUE (user_id, news_id);
+            END IF;
+        END $$;
+    """)
+
+
+def downgrade():
+    op.execute("ALTER TABLE likes DROP CONSTRAINT IF EXISTS uq_likes_user_news")
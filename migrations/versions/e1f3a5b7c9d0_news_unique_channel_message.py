@@ -0,0 +1,42 @@
+"""news unique (channel_id, telegram_message_id)
+
+Revision ID: e1f3a5b7c9d0
+Revises: d0e2f4a6b8c9
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1f3a5b7c9d0'
+down_revision = 'd0e2f4a6b8c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Повторы, записанные до индекса, не удаляем (на них могут быть лайки и комментарии):
+    # у всех копий, кроме самой ранней, просто забываем id сообщения
+    op.execute("""
+        UPDATE news SET telegram_message_id = NULL
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY channel_id, telegram_message_id ORDER BY id
+                ) AS copy_number
+                FROM news
+                WHERE telegram_message_id IS NOT NULL
+            ) copies
+            WHERE copy_number > 1
+        )
+    """)
+    op.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_news_channel_message
+        ON news (channel_id, telegram_message_id)
+    """)
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS uq_news_channel_message")
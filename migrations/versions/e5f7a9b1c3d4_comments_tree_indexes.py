@@ -0,0 +1,29 @@
+"""comments tree indexes
+
+Revision ID: e5f7a9b1c3d4
+Revises: d4e6f8a0b2c3
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5f7a9b1c3d4'
+down_revision = 'd4e6f8a0b2c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_comments_news_parent_created_id "
+        "ON comments (news_id, parent_id, created_at, id)"
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_comments_parent_id ON comments (parent_id)")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_comments_parent_id")
+    op.execute("DROP INDEX IF EXISTS ix_comments_news_parent_created_id")
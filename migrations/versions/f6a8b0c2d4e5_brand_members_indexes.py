@@ -0,0 +1,29 @@
+"""brand members indexes
+
+Revision ID: f6a8b0c2d4e5
+Revises: e5f7a9b1c3d4
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6a8b0c2d4e5'
+down_revision = 'e5f7a9b1c3d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_brand_members_brand_joined_user "
+        "ON brand_members (brand_id, joined_at, user_id)"
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_brand_members_user_id ON brand_members (user_id)")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_brand_members_user_id")
+    op.execute("DROP INDEX IF EXISTS ix_brand_members_brand_joined_user")
@@ -1,12 +1,23 @@
 import os
-import hmac
-import hashlib
 import logging
-from urllib.parse import parse_qs
 
-from flask import Blueprint, render_template, request, jsonify, send_from_directory, redirect
-from db.models import save_user_data, get_user_by_id, News, db, Like, User, Comment, NewsView, Brand, BrandMember, Item
-from fck_app.bot import BOT_TOKEN, bot
+from flask import Blueprint, abort, current_app, g, render_template, request, jsonify, send_from_directory, send_file, redirect, make_response
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from db.models import save_user_data, get_user_by_id, News, db, Like, User, Comment, Brand, BrandMember
+from db.counters import increment_counter, get_counter
+from db.view_buffer import view_buffer
+from db.likes import get_liked_news_ids, invalidate_user_likes, is_liked, is_duplicate_like
+from db.comments import get_comment_tree, comment_dict, author_dict, DEFAULT_MAX_DEPTH
+from db.brands import get_brand_details, get_brand_members_page, get_user_brands_data
+from db.ingest import get_ingest_queue
+from db.feed import get_approved_feed, get_approved_feed_page, get_moderation_page, InvalidCursor, MAX_PAGE_SIZE
+from fck_app.avatars import avatar_cache
+from fck_app.static_assets import asset_manifest
+from fck_app.model_variants import model_variants, device_tier
+from fck_app.item_previews import item_previews
+from fck_app.spa_bundle import spa_bundle
+from fck_app.auth import telegram_auth, request_user_id, AuthError
 from datetime import datetime, timedelta
 
 # Настройка логирования
@@ -15,15 +26,38 @@ logger.setLevel(logging.DEBUG)
 
 main_bp = Blueprint("main", __name__)
 
+AVATAR_MAX_AGE = 365 * 24 * 3600  # Миниатюры аватарок адресуются по содержимому
+MODEL_VARIANT_MAX_AGE = 365 * 24 * 3600  # В имени копии модели хэш исходника
+MODEL_CLIENT_HINTS = "Device-Memory, ECT, Save-Data"
+SPA_TEMPLATES_URL = "/spa/templates.json"  # Должен совпадать с TEMPLATE_BUNDLE_URL в static/js/spa.js
+SCRAPER_STATE_MAX_AGE = 30  # Скрейпер публикует состояние каждые SCRAPER_STATE_SECONDS
+
 @main_bp.route("/favicon.ico")
 def favicon():
     return send_from_directory(os.path.join(main_bp.root_path, 'static'),
                                'favicon.ico', mimetype='image/vnd.microsoft.icon')
 
+def _spa_shell(**context):
+    """
+    Оболочка SPA (index.html). Ответ перепроверяется по ETag, а Link: preload
+    запускает загрузку пакета экранов и spa.js параллельно с разбором HTML.
+    """
+    response = make_response(render_template("index.html", **context))
+    # Подсказки об устройстве для выбора детализации 3D-моделей (/models/...)
+    response.headers["Accept-CH"] = MODEL_CLIENT_HINTS
+    if current_app.config.get("SPA_PRELOAD_HINTS", True):
+        response.headers["Link"] = ", ".join([
+            f"<{SPA_TEMPLATES_URL}>; rel=preload; as=fetch; crossorigin",
+            f"<{asset_manifest.url_for('js/spa.js')}>; rel=preload; as=script",
+        ])
+    response.headers["Cache-Control"] = "no-cache"
+    response.add_etag()
+    return response.make_conditional(request)
+
 @main_bp.route("/")
 def index():
     """Главная страница"""
-    return render_template("index.html")
+    return _spa_shell()
 
 @main_bp.route('/app', methods=['GET'])
 def app_page():
@@ -31,7 +65,12 @@ def app_page():
     user_id = request.args.get('user_id')
     if not user_id:
         return jsonify({"error": "User ID is required"}), 400
-    return render_template("index.html", user_id=user_id)
+    return _spa_shell(user_id=user_id)
+
+@main_bp.route(SPA_TEMPLATES_URL)
+def spa_templates():
+    """Все экраны SPA одним сжатым JSON вместо запросов /templates/<экран>.html"""
+    return spa_bundle.send()
 
 @main_bp.route('/api/user_avatar', methods=['GET'])
 def user_avatar():
@@ -54,8 +93,8 @@ def user_avatar():
         return jsonify({"error": "Internal server error"}), 500
 
 @main_bp.route('/get_avatar')
-async def get_avatar():
-    """Получение аватарки пользователя"""
+def get_avatar():
+    """Получение аватарки пользователя (миниатюры Telegram отдаются из локального кэша)"""
     try:
         photo_url = request.args.get('photo_url')
         if not photo_url:
@@ -65,24 +104,24 @@ async def get_avatar():
         # Если это file_id от Telegram
         if photo_url.startswith('AgACAgI'):
             try:
-                # Проверяем наличие BOT_TOKEN
-                if not BOT_TOKEN:
-                    logger.error("[get_avatar] BOT_TOKEN не установлен")
-                    return send_from_directory('static/icons', 'default-avatar.png')
-
-                # Получаем файл через Telegram API
-                file = await bot.get_file(photo_url)
-                if file and file.file_path:
-                    # Получаем URL файла
-                    file_url = f"https://api.telegram.org/file/bot{BOT_TOKEN}/{file.file_path}"
-                    logger.info(f"[get_avatar] Получен URL файла: {file_url}")
-                    return redirect(file_url)
-                else:
-                    logger.warning("[get_avatar] Не удалось получить file_path")
-                    return send_from_directory('static/icons', 'default-avatar.png')
+                avatar = avatar_cache.get(photo_url)
             except Exception as e:
                 logger.error(f"[get_avatar] Ошибка при получении файла из Telegram: {e}")
+                avatar = None
+
+            if avatar is None:
                 return send_from_directory('static/icons', 'default-avatar.png')
+
+            # Имя файла - хэш содержимого, поэтому ответ для file_id никогда не меняется
+            response = send_file(
+                avatar.path,
+                mimetype=avatar.mimetype,
+                etag=avatar.etag,
+                max_age=AVATAR_MAX_AGE,
+                conditional=True
+            )
+            response.cache_control.immutable = True
+            return response
         
         # Если это обычный URL
         if photo_url.startswith('http'):
@@ -95,6 +134,19 @@ async def get_avatar():
         logger.error(f"[get_avatar] Внутренняя ошибка сервера: {e}")
         return send_from_directory('static/icons', 'default-avatar.png')
 
+def _self_user_id(legacy_id=None):
+    """
+    Пользователь запроса из middleware (fck_app/auth.py). Без токена, пока
+    AUTH_REQUIRE_TOKEN выключен, принимается и id, которым страницы представлялись раньше.
+    """
+    user_id = request_user_id()
+    if user_id is None and legacy_id and not telegram_auth.require_token:
+        try:
+            return int(legacy_id)
+        except (TypeError, ValueError):
+            return None
+    return user_id
+
 @main_bp.route('/init_user_data', methods=['POST'])
 def init_user_data():
     """Сохранение данных пользователя, включая реальный URL аватарки"""
@@ -103,7 +155,8 @@ def init_user_data():
         if not user_data:
             return jsonify({"error": "Нет данных"}), 400
 
-        user_id = user_data.get("id")
+        # id и роль из тела не принимаются: пользователь - из токена сессии
+        user_id = _self_user_id(user_data.get("id"))
         if not user_id:
             return jsonify({"error": "Не передан ID пользователя"}), 400
 
@@ -115,7 +168,6 @@ def init_user_data():
             "id": user_id,
             "username": user_data.get("username", "unknown"),
             "photo_url": user_data.get("photo_url", "").strip(),
-            "role": user_data.get("role", "user"),
             "first_name": user_data.get("first_name", ""),
             "last_name": user_data.get("last_name", ""),
             "language_code": user_data.get("language_code", "en"),
@@ -156,12 +208,12 @@ def get_user_data():
                 logging.error('[get_user_data] Не получены данные JSON')
                 return jsonify({"error": "Не получены данные JSON"}), 400
                 
-            user_id = data.get('id')
+            user_id = _self_user_id(data.get('id'))
             user_data = data.get('user', {})
             logging.info(f"[get_user_data] Метод: POST, user_id: {user_id}")
             logging.info(f"[get_user_data] Данные из Telegram: {user_data}")
         else:  # GET
-            user_id = request.args.get('id') or request.args.get('user_id')
+            user_id = _self_user_id(request.args.get('id'))
             user_data = None
             logging.info(f"[get_user_data] Метод: GET, user_id: {user_id}")
         
@@ -197,19 +249,20 @@ def get_user_data():
                     # Получаем обновленные данные
                     user = get_user_by_id(user_id)
             
-            # Получаем полную информацию о предметах в инвентаре
+            # Получаем полную информацию о предметах в инвентаре (из кэша каталога)
             items = []
             if user.inventory:
                 try:
-                    items = Item.query.filter(Item.id.in_(user.inventory)).all()
-                    items = [item.to_dict() for item in items]
+                    items = user.get_inventory_items()
                     logging.info(f"[get_user_data] Найдено {len(items)} предметов в инвентаре: {items}")
                 except Exception as e:
                     logging.error(f"[get_user_data] Ошибка при получении предметов: {e}")
             
-            # Получаем данные пользователя с предметами
+            # Получаем данные пользователя с предметами (и миниатюрами на спрайт-листах)
+            items, sprite_sheets = item_previews.with_previews(items)
             user_dict = user.to_dict()
             user_dict['items'] = items
+            user_dict['sprite_sheets'] = sprite_sheets
             
             logging.info(f"[get_user_data] Отправляем данные пользователя с {len(items)} предметами: {user_dict}")
             return jsonify(user_dict), 200
@@ -263,71 +316,74 @@ def get_user_data():
 @main_bp.route("/verify_init_data", methods=['POST'])
 def verify_init_data():
     """Проверка корректности initData из Telegram WebApp"""
-    data = request.get_json()
-    init_data = data.get("initData", "")
-
-    if verify_telegram_init_data(parse_qs(init_data)):
-        return jsonify({"valid": True})
-    return jsonify({"valid": False}), 400
-
-
-def verify_telegram_init_data(init_data):
-    """Проверка корректности initData из Telegram WebApp"""
+    data = request.get_json(silent=True) or {}
     try:
-        data_check_arr = []
-        data_to_check = init_data.copy()
-        received_hash = data_to_check.pop("hash", "")
+        telegram_auth.verify_init_data(data.get("initData", ""))
+    except AuthError as e:
+        logger.info(f"[verify_init_data] {e}")
+        return jsonify({"valid": False}), 400
+    return jsonify({"valid": True})
 
-        for key in sorted(data_to_check.keys()):
-            data_check_arr.append(f"{key}={data_to_check[key]}")
-        data_check_string = "\n".join(data_check_arr)
 
-        secret_key = hmac.new(b"WebAppData", BOT_TOKEN.encode(), hashlib.sha256).digest()
-        computed_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+@main_bp.route("/api/auth/session", methods=["POST"])
+def create_session():
+    """
+    Токен сессии по initData из Telegram WebApp. Клиент передаёт его в заголовке
+    Authorization: Bearer <токен> и получает новый, когда сервер ответит 401.
+    """
+    if not telegram_auth.tokens_enabled:
+        return jsonify({"error": "Токены сессии отключены"}), 503
+    data = request.get_json(silent=True) or {}
+    try:
+        user = telegram_auth.verify_init_data(data.get("initData", ""))
+    except AuthError as e:
+        logger.warning(f"[create_session] {e}")
+        return jsonify({"error": str(e)}), 401
 
-        return hmac.compare_digest(computed_hash, received_hash)
-    except Exception as e:
-        logger.error(f"Error in verify_telegram_init_data: {e}")
-        return False
+    token, expires_in = telegram_auth.issue_token(user["id"])
+    logger.info(f"[create_session] Выдан токен сессии пользователю {user['id']}")
+    return jsonify({"token": token, "expires_in": expires_in, "user_id": user["id"]}), 200
 
 
 @main_bp.route("/api/news/approved", methods=["GET"])
 def get_approved_news():
-    user_id = request.args.get('user_id', type=int)
-    news_items = News.query.filter_by(is_approved=True).all()
-
-    results = []
-    for item in news_items:
-        data = item.to_dict()
-
-        # Подсчитываем уникальные просмотры
-        viewers_count = NewsView.query.filter_by(news_id=item.id).count()
-
-        # Количество лайков (уже считаете)
-        likes_count = Like.query.filter_by(news_id=item.id).count()
-
-        # Проверяем, лайкнул ли юзер
-        liked_by_user = False
-        if user_id:
-            liked = Like.query.filter_by(user_id=user_id, news_id=item.id).first()
-            liked_by_user = bool(liked)
-
-
-        data = item.to_dict()
-        data["likes_count"] = likes_count
-        data["is_liked_by_user"] = liked_by_user
-        data["comment_count"] = Comment.query.filter_by(news_id=item.id).count()
-        data["viewers_count"] = viewers_count
+    """
+    Лента одобренных новостей.
+    С параметрами limit/cursor отдаёт страницу {"items": [...], "next_cursor": ...},
+    без них - весь список, как раньше.
+    """
+    user_id = request_user_id()
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
 
-        results.append(data)
+    if limit is None and cursor is None:
+        # Лента со счётчиками собирается одним сгруппированным запросом (см. db/feed.py)
+        results = get_approved_feed(user_id)
+        return jsonify(results), 200
 
-    return jsonify(results), 200
+    try:
+        page = get_approved_feed_page(user_id, limit, cursor)
+    except InvalidCursor as e:
+        logger.warning(f"[get_approved_news] {e}")
+        return jsonify({"error": "Invalid cursor"}), 400
+    return jsonify(page), 200
 
 
 @main_bp.route("/api/news/moderation", methods=["GET"])
 def get_unapproved_news():
-    news_items = News.query.filter_by(is_approved=False).all()
-    return jsonify([item.to_dict() for item in news_items]), 200
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+
+    if limit is None and cursor is None:
+        news_items = News.query.filter_by(is_approved=False).all()
+        return jsonify([item.to_dict() for item in news_items]), 200
+
+    try:
+        page = get_moderation_page(limit, cursor)
+    except InvalidCursor as e:
+        logger.warning(f"[get_unapproved_news] {e}")
+        return jsonify({"error": "Invalid cursor"}), 400
+    return jsonify(page), 200
 
 
 @main_bp.route("/api/news/approve/<int:news_id>", methods=["POST"])
@@ -350,14 +406,93 @@ def delete_news(news_id):
     db.session.commit()
     return jsonify({"status": "success"}), 200
 
+def _scraper_state(key):
+    """Состояние, которое процесс скрейпера публикует в очереди db/ingest.py; None, если он не запущен"""
+    value, age = get_ingest_queue(current_app).get_state(key)
+    if value is None or age > SCRAPER_STATE_MAX_AGE:
+        return None
+    return value
+
+
+@main_bp.route("/api/scraper/albums", methods=["GET"])
+def scraper_album_stats():
+    """Задержки сборки альбомов скрейпером: перцентили и последние альбомы"""
+    stats = _scraper_state("albums")
+    if stats is None:
+        return jsonify({"error": "Скрейпер не запущен"}), 503
+    return jsonify(stats), 200
+
+@main_bp.route("/api/scraper/catch-up", methods=["GET", "POST"])
+def scraper_catch_up():
+    """
+    GET - состояние и метрики последнего догона каналов,
+    POST - запустить догон вручную (только модератор с токеном сессии).
+    """
+    status = _scraper_state("catch_up")
+    if status is None:
+        return jsonify({"error": "Скрейпер не запущен"}), 503
+
+    if request.method == "GET":
+        return jsonify(status), 200
+
+    # user_id из параметров запроса (переходный режим) подделывается - нужен токен
+    if not g.get("user_verified"):
+        return jsonify({"error": "Требуется токен сессии"}), 401
+    user_id = request_user_id()
+    user = User.query.get(user_id) if user_id else None
+    if not user or user.role != "moderator":
+        return jsonify({"error": "Доступно только модераторам"}), 403
+
+    if status.get("running"):
+        return jsonify({"status": "already_running", **status}), 409
+    # Скрейпер забирает запрос при следующей публикации состояния
+    get_ingest_queue(current_app).set_state("catch_up_request", {"user_id": user_id})
+    logger.info(f"[scraper_catch_up] Догон каналов запрошен модератором {user_id}")
+    return jsonify({"status": "started"}), 202
+
+@main_bp.route("/assets/<path:filename>")
+def serve_asset(filename):
+    """Собранная статика (flask build-static): имена с хэшем, предсжатые .br/.gz"""
+    return asset_manifest.send(filename)
+
+@main_bp.route("/models/variants/<path:filename>")
+def serve_model_variant(filename):
+    """LOD-копия модели; conditional=True - Range-запросы для потоковой загрузки"""
+    # Навсегда кэшируются только копии с хэшем в имени; manifest.json и прочее здесь не отдаём
+    if not filename.endswith(".glb"):
+        abort(404)
+    response = send_from_directory(
+        model_variants.out_dir, filename, max_age=MODEL_VARIANT_MAX_AGE, conditional=True
+    )
+    response.headers["Cache-Control"] = f"public, max-age={MODEL_VARIANT_MAX_AGE}, immutable"
+    return response
+
+@main_bp.route("/models/<path:filename>")
+def serve_model(filename):
+    """
+    Модель из static/models в варианте для устройства (?tier=low|medium|high или Client Hints).
+    Пока копии не собраны (flask build-model-variants), отдаёт исходный файл.
+    """
+    source = f"static/models/{filename}"
+    url = model_variants.choose(source, device_tier(request)) or f"/{source}"
+    response = redirect(url, code=302)
+    # Выбор зависит от устройства - кэшируется только в браузере
+    response.headers["Cache-Control"] = "private, max-age=3600"
+    response.headers["Vary"] = "Save-Data, ECT, Device-Memory"
+    return response
+
 @main_bp.route("/templates/<path:filename>")
 def serve_template_file(filename):
-    return send_from_directory("templates", filename)
+    response = send_from_directory("templates", filename)
+    if asset_manifest.manifest and filename.endswith(".html"):
+        # Фрагменты SPA подключают скрипты и стили по /static/... - подменяем на собранные
+        response.direct_passthrough = False
+        response.set_data(asset_manifest.rewrite_html(response.get_data(as_text=True)))
+    return response
 
 @main_bp.route("/api/news/<int:news_id>/like", methods=["POST"])
 def like_news(news_id):
-    data = request.json or {}
-    user_id = data.get("user_id")
+    user_id = request_user_id()
     if not user_id:
         return jsonify({"error": "No user_id provided"}), 400
 
@@ -370,15 +505,24 @@ def like_news(news_id):
     if not news_item:
         return jsonify({"error": "News not found"}), 404
 
-    existing_like = Like.query.filter_by(user_id=user_id, news_id=news_id).first()
-    if existing_like:
-        return jsonify({"error": "Already liked"}), 400
-
+    # Повторный лайк отсекает уникальный индекс likes(user_id, news_id),
+    # в том числе при двух одновременных запросах
     new_like = Like(user_id=user_id, news_id=news_id)
-    db.session.add(new_like)
-    db.session.commit()
+    try:
+        db.session.add(new_like)
+        # flush до счётчика: иначе autoflush в UPDATE поднимет IntegrityError вне try
+        db.session.flush()
+        increment_counter(news_id, "likes_count")
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if is_duplicate_like(e):
+            return jsonify({"error": "Already liked"}), 400
+        logger.error(f"[like_news] Ошибка целостности при лайке {news_id} пользователем {user_id}: {e}")
+        return jsonify({"error": "Could not save like"}), 409
+    invalidate_user_likes(user_id)
 
-    likes_count = Like.query.filter_by(news_id=news_id).count()
+    likes_count = get_counter(news_id, "likes_count")
     return jsonify({
         "status": "success",
         "message": "Like added",
@@ -391,7 +535,9 @@ def like_news(news_id):
 # --------------------
 @main_bp.route("/api/news/<int:news_id>/like", methods=["DELETE"])
 def unlike_news(news_id):
-    user_id = request.json.get("user_id", 1)
+    user_id = request_user_id()
+    if not user_id:
+        return jsonify({"error": "No user_id provided"}), 400
     news_item = News.query.get(news_id)
     if not news_item:
         return jsonify({"error": "News not found"}), 404
@@ -401,10 +547,12 @@ def unlike_news(news_id):
         return jsonify({"error": "Like not found"}), 404
 
     db.session.delete(existing_like)
+    increment_counter(news_id, "likes_count", -1)
     db.session.commit()
+    invalidate_user_likes(user_id)
 
     # Количество лайков после удаления
-    likes_count = Like.query.filter_by(news_id=news_id).count()
+    likes_count = get_counter(news_id, "likes_count")
 
     return jsonify({
         "status": "success",
@@ -413,6 +561,34 @@ def unlike_news(news_id):
     }), 200
 
 
+@main_bp.route("/api/news/likes/status", methods=["GET", "POST"])
+def get_likes_status():
+    """
+    Какие из переданных новостей лайкнул пользователь - одним запросом.
+    GET: ?news_ids=1,2,3   POST: {"news_ids": [1, 2, 3]}
+    """
+    if request.method == "POST":
+        data = request.get_json() or {}
+        raw_ids = data.get("news_ids") or []
+    else:
+        raw_ids = [part for part in request.args.get("news_ids", "").split(",") if part]
+
+    user_id = request_user_id()
+    if not user_id:
+        return jsonify({"error": "user_id is required"}), 400
+
+    try:
+        news_ids = [int(news_id) for news_id in raw_ids]
+    except (TypeError, ValueError):
+        return jsonify({"error": "news_ids must be integers"}), 400
+
+    if len(news_ids) > MAX_PAGE_SIZE:
+        return jsonify({"error": f"Too many news_ids (max {MAX_PAGE_SIZE})"}), 400
+
+    liked = get_liked_news_ids(user_id, news_ids)
+    return jsonify({"user_id": user_id, "liked_news_ids": sorted(liked)}), 200
+
+
 @main_bp.route("/log-device-info", methods=["POST"])
 def log_device_info():
     """Принимает и логирует информацию об устройстве пользователя."""
@@ -433,7 +609,7 @@ def log_device_info():
 def get_current_user():
     """Получение текущего пользователя"""
     try:
-        user_id = request.args.get('user_id')
+        user_id = request_user_id()
         if not user_id:
             logger.error("[get_current_user] Не передан user_id")
             return jsonify({"error": "User ID is required"}), 400
@@ -461,7 +637,7 @@ def get_current_user():
 def check_user():
     """Проверка существования пользователя"""
     try:
-        user_id = request.args.get('user_id')
+        user_id = request_user_id()
         if not user_id:
             return jsonify({"exists": False}), 200
 
@@ -483,29 +659,44 @@ def get_comments_for_news(news_id):
     if not news_item:
         return jsonify({"error": "News not found"}), 404
 
-    # Если нужны все комментарии плоским списком:
-    comments = Comment.query.filter_by(news_id=news_id).order_by(Comment.created_at.asc()).all()
-
-    # Хотите вместе с данными о пользователе?
-    # Можно собрать результат так:
-    response_data = []
-    for c in comments:
-        c_dict = c.to_dict()
-        # Добавляем данные о юзере, чтобы не делать лишних запросов
-        c_dict["user"] = {
-            "id": c.user.id,
-            "username": c.user.username,
-            "photo_url": c.user.photo_url
-        }
-        response_data.append(c_dict)
+    # Все комментарии плоским списком, авторы подгружаются тем же запросом (JOIN)
+    comments = (
+        Comment.query
+        .options(joinedload(Comment.user))
+        .filter_by(news_id=news_id)
+        .order_by(Comment.created_at.asc())
+        .all()
+    )
+    response_data = [comment_dict(c) for c in comments]
 
     return jsonify(response_data), 200
 
+
+@main_bp.route("/api/news/<int:news_id>/comments/tree", methods=["GET"])
+def get_comment_tree_for_news(news_id):
+    """
+    Комментарии новости деревом: страница корневых веток с вложенными ответами.
+    Параметры: limit, cursor, max_depth.
+    """
+    if not db.session.query(News.id).filter(News.id == news_id).scalar():
+        return jsonify({"error": "News not found"}), 404
+
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    max_depth = request.args.get('max_depth', DEFAULT_MAX_DEPTH, type=int)
+
+    try:
+        page = get_comment_tree(news_id, limit, cursor, max_depth)
+    except InvalidCursor as e:
+        logger.warning(f"[get_comment_tree_for_news] {e}")
+        return jsonify({"error": "Invalid cursor"}), 400
+    return jsonify(page), 200
+
 @main_bp.route("/api/news/<int:news_id>/comments", methods=["POST"])
 def add_comment_to_news(news_id):
     """Добавляет новый комментарий к новости."""
     data = request.json
-    user_id = data.get("user_id")
+    user_id = request_user_id()
     text = data.get("text")
     parent_id = data.get("parent_id")  # Если реализуем треды
 
@@ -535,43 +726,33 @@ def add_comment_to_news(news_id):
             new_comment.parent_id = parent_id
 
     db.session.add(new_comment)
+    increment_counter(news_id, "comment_count")
     db.session.commit()
 
     # Возвращаем свежесозданный комментарий
     # (Добавим сюда и данные пользователя)
     response_data = new_comment.to_dict()
-    response_data["user"] = {
-        "id": user.id,
-        "username": user.username,
-        "photo_url": user.photo_url
-    }
+    response_data["user"] = author_dict(user)
     return jsonify(response_data), 201
 
 @main_bp.route("/api/news/<int:news_id>", methods=["GET"])
 def get_single_news(news_id):
-    user_id = request.args.get('user_id', type=int)
+    user_id = request_user_id()
     news_item = News.query.get(news_id)
 
     if not news_item:
         return jsonify({"error": "News not found"}), 404
 
-    # Считаем количество лайков
-    likes_count = Like.query.filter_by(news_id=news_id).count()
-
     # Проверяем, лайкал ли пользователь
-    is_liked_by_user = False
-    if user_id:
-        liked = Like.query.filter_by(user_id=user_id, news_id=news_id).first()
-        is_liked_by_user = bool(liked)
-
-    # Считаем количество комментариев
-    comment_count = Comment.query.filter_by(news_id=news_id).count()
+    is_liked_by_user = is_liked(user_id, news_id)
 
+    # Счётчики хранятся прямо в News (см. db/counters.py)
     data = news_item.to_dict()
-    data["likes_count"] = likes_count
+    data["likes_count"] = news_item.likes_count
     data["is_liked_by_user"] = is_liked_by_user
-    data["comment_count"] = comment_count  # <-- добавили
-    data["viewers_count"] = NewsView.query.filter_by(news_id=news_id).count()
+    data["comment_count"] = news_item.comment_count
+    data["viewers_count"] = news_item.viewers_count
+    data["unique_viewers_count"] = news_item.unique_viewers_count
 
     return jsonify(data), 200
 
@@ -581,8 +762,7 @@ from datetime import datetime, timedelta
 
 @main_bp.route("/api/news/<int:news_id>/view", methods=["POST"])
 def add_news_view(news_id):
-    data = request.get_json() or {}
-    user_id = data.get("user_id")
+    user_id = request_user_id()
 
     logger.info(f"[add_news_view] Запрос на добавление просмотра: news_id={news_id}, user_id={user_id}")
 
@@ -590,59 +770,20 @@ def add_news_view(news_id):
         logger.warning("[add_news_view] user_id отсутствует в запросе")
         return jsonify({"error": "user_id is required"}), 400
 
-    # Проверяем, что новость существует
-    news_item = News.query.get(news_id)
-    if not news_item:
+    # Один запрос по первичному ключу: проверка существования + текущий счётчик
+    viewers_count = db.session.query(News.viewers_count).filter(News.id == news_id).scalar()
+    if viewers_count is None:
         logger.warning(f"[add_news_view] Новость {news_id} не найдена")
         return jsonify({"error": "News not found"}), 404
 
-    # Проверяем, что пользователь существует
-    user = User.query.get(user_id)
-    if not user:
-        logger.warning(f"[add_news_view] Пользователь {user_id} не найден")
-        return jsonify({"error": f"User {user_id} not found"}), 404
-
-    # Находим последнюю запись просмотра пользователя этой новости
-    existing_view = NewsView.query \
-        .filter_by(news_id=news_id, user_id=user_id) \
-        .order_by(NewsView.viewed_at.desc()) \
-        .first()
-
-    MIN_INTERVAL_SECONDS = 30
-    now = datetime.utcnow()
-    should_add_new_view = False
-
-    if existing_view:
-        time_diff = now - existing_view.viewed_at
-        logger.info(
-            f"[add_news_view] Последний просмотр: {existing_view.viewed_at}, разница: {time_diff.total_seconds()} сек.")
-
-        # Если прошло больше 10 секунд, добавляем новый просмотр
-        if time_diff.total_seconds() > MIN_INTERVAL_SECONDS:
-            should_add_new_view = True
-        else:
-            logger.info(
-                f"[add_news_view] Повторный просмотр слишком быстро ({time_diff.total_seconds()} сек.), новый не добавляем.")
+    # Просмотр дедуплицируется в памяти (VIEW_MIN_INTERVAL_SECONDS) и пишется в БД
+    # пачкой фоновым потоком (см. db/view_buffer.py)
+    if view_buffer.record(news_id, user_id):
+        logger.info(f"[add_news_view] Просмотр принят в буфер: news_id={news_id}, user_id={user_id}")
     else:
-        should_add_new_view = True
-
-    if should_add_new_view:
-        new_view = NewsView(news_id=news_id, user_id=user_id, viewed_at=now)
-        db.session.add(new_view)
-        try:
-            db.session.commit()
-            logger.info(f"[add_news_view] Добавлен просмотр: news_id={news_id}, user_id={user_id}")
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"[add_news_view] Ошибка при добавлении записи в NewsView: {e}")
-            return jsonify({"error": "Database error"}), 500
-    else:
-        logger.info(f"[add_news_view] Новый просмотр не добавлен, так как прошло меньше {MIN_INTERVAL_SECONDS} сек.")
-
-    # Подсчитываем количество уникальных просмотров
-    viewers_count = NewsView.query.filter_by(news_id=news_id).count()
-    logger.info(f"[add_news_view] Итоговое количество просмотров для news_id={news_id}: {viewers_count}")
+        logger.info("[add_news_view] Повторный просмотр слишком быстро, новый не добавляем")
 
+    viewers_count += view_buffer.pending_for(news_id)
     return jsonify({
         "status": "success",
         "viewers_count": viewers_count
@@ -668,46 +809,29 @@ def get_brands():
 def get_brand(brand_id):
     """Получение данных конкретного бренда по ID"""
     try:
-        brand = Brand.query.get(brand_id)
-        
-        if not brand:
+        members_limit = request.args.get('members_limit', type=int)
+        members_cursor = request.args.get('members_cursor')
+
+        # Участники с пользователями подгружаются одним запросом (см. db/brands.py)
+        brand_data = get_brand_details(brand_id, members_limit, members_cursor)
+
+        if not brand_data:
             logger.warning(f"[get_brand] Бренд с ID {brand_id} не найден")
             return jsonify({
                 "status": "error",
                 "message": f"Бренд с ID {brand_id} не найден"
             }), 404
-            
-        # Получаем данные о членах бренда
-        brand_members = BrandMember.query.filter_by(brand_id=brand_id).all()
-        members_data = []
-        
-        for member in brand_members:
-            user = User.query.get(member.user_id)
-            if user:
-                members_data.append({
-                    "user_id": user.id,
-                    "username": user.username,
-                    "photo_url": user.photo_url,
-                    "role": member.role,
-                    "joined_at": member.joined_at.isoformat() if member.joined_at else None
-                })
-        
-        # Готовим данные бренда
-        brand_data = brand.to_dict()
-        
-        # Добавляем расчетные поля для отображения в интерфейсе
-        brand_data["members"] = members_data
-        brand_data["members_count"] = len(members_data)
-        
-        # Преобразуем поля в проценты для отображения в интерфейсе
-        brand_data["reputation"] = brand.relevance  # процент репутации
-        brand_data["profitability"] = brand.popularity  # процент прибыльности
-        brand_data["innovation"] = brand.innovativeness  # процент инноваций
-        
+
         return jsonify({
             "status": "success",
             "brand": brand_data
         }), 200
+    except InvalidCursor as e:
+        logger.warning(f"[get_brand] {e}")
+        return jsonify({
+            "status": "error",
+            "message": "Некорректный курсор"
+        }), 400
     except Exception as e:
         logger.error(f"[get_brand] Ошибка при получении данных бренда {brand_id}: {e}")
         return jsonify({
@@ -715,6 +839,37 @@ def get_brand(brand_id):
             "message": "Внутренняя ошибка сервера"
         }), 500
 
+@main_bp.route("/api/brands/<int:brand_id>/members", methods=["GET"])
+def get_brand_members(brand_id):
+    """Постраничный список участников бренда (limit, cursor)"""
+    try:
+        if not db.session.query(Brand.id).filter(Brand.id == brand_id).scalar():
+            return jsonify({
+                "status": "error",
+                "message": f"Бренд с ID {brand_id} не найден"
+            }), 404
+
+        members, next_cursor = get_brand_members_page(
+            brand_id, request.args.get('limit', type=int), request.args.get('cursor')
+        )
+        return jsonify({
+            "status": "success",
+            "members": members,
+            "next_cursor": next_cursor
+        }), 200
+    except InvalidCursor as e:
+        logger.warning(f"[get_brand_members] {e}")
+        return jsonify({
+            "status": "error",
+            "message": "Некорректный курсор"
+        }), 400
+    except Exception as e:
+        logger.error(f"[get_brand_members] Ошибка при получении участников бренда {brand_id}: {e}")
+        return jsonify({
+            "status": "error",
+            "message": "Внутренняя ошибка сервера"
+        }), 500
+
 @main_bp.route("/api/brands", methods=["POST"])
 def create_brand():
     """Создание нового бренда"""
@@ -738,39 +893,11 @@ def create_brand():
                 "message": "Название бренда обязательно"
             }), 400
         
-        # Попытка получить user_id из разных источников
-        user_id = request.args.get('user_id') or request.form.get('user_id')
-        logger.info(f"[create_brand] Получен user_id из параметров/формы: {user_id}")
-        
-        # Проверяем заголовок X-User-ID
-        if not user_id:
-            user_id_header = request.headers.get('X-User-ID')
-            if user_id_header:
-                user_id = user_id_header
-                logger.info(f"[create_brand] Получен user_id из заголовка X-User-ID: {user_id}")
-        
-        # Если user_id не найден, проверяем URL реферера
-        if not user_id:
-            referer = request.headers.get('Referer', '')
-            logger.info(f"[create_brand] Реферер: {referer}")
-            
-            if 'user_id=' in referer:
-                # Извлекаем user_id из URL реферера
-                import re
-                matches = re.search(r'user_id=(\d+)', referer)
-                if matches:
-                    user_id = matches.group(1)
-                    logger.info(f"[create_brand] Получен user_id из реферера: {user_id}")
-        
-        # Если по-прежнему нет user_id, пробуем получить из оригинального URL
-        if not user_id:
-            origin_url = request.headers.get('Origin', '')
-            logger.info(f"[create_brand] Origin URL: {origin_url}")
-            
-            for header_name, header_value in request.headers.items():
-                logger.info(f"[create_brand] Заголовок {header_name}: {header_value}")
+        # Пользователь определяется middleware (fck_app/auth.py) по токену сессии
+        user_id = request_user_id()
+        logger.info(f"[create_brand] user_id: {user_id} (токен: {g.user_verified})")
         
-        # Если user_id всё еще не найден
+        # Если user_id не найден
         if not user_id:
             logger.warning("[create_brand] Отсутствует user_id во всех проверенных источниках")
             return jsonify({
@@ -887,30 +1014,11 @@ def get_user_brands(user_id):
                 "message": f"Пользователь с ID {user_id} не найден"
             }), 404
         
-        # Получаем все участия пользователя в брендах
-        brand_memberships = BrandMember.query.filter_by(user_id=user_id).all()
-        
-        if not brand_memberships:
+        # Бренды подгружаются вместе с участием одним запросом (см. db/brands.py)
+        user_brands = get_user_brands_data(user_id)
+        if not user_brands:
             logger.info(f"[get_user_brands] У пользователя {user_id} нет брендов")
-            return jsonify({
-                "status": "success",
-                "brands": []
-            }), 200
-        
-        # Получаем данные о всех брендах пользователя
-        user_brands = []
-        for membership in brand_memberships:
-            brand = Brand.query.get(membership.brand_id)
-            if brand:
-                brand_data = brand.to_dict()
-                brand_data["role"] = membership.role  # роль пользователя в этом бренде
-                brand_data["joined_at"] = membership.joined_at.isoformat() if membership.joined_at else None
-                
-                # Проверка, является ли пользователь создателем бренда
-                brand_data["is_creator"] = (brand.creator_id == user_id)
-                
-                user_brands.append(brand_data)
-        
+
         return jsonify({
             "status": "success",
             "brands": user_brands
@@ -926,8 +1034,7 @@ def get_user_brands(user_id):
 def get_user_inventory():
     """Получение инвентаря пользователя с полной информацией о предметах"""
     try:
-        # Получаем user_id из параметров запроса
-        user_id = request.args.get('user_id')
+        user_id = request_user_id()
         if not user_id:
             logger.error("[get_user_inventory] Не указан user_id")
             return jsonify({"error": "User ID not provided"}), 400
@@ -943,15 +1050,15 @@ def get_user_inventory():
             logger.info(f"[get_user_inventory] Инвентарь пользователя {user_id} пуст")
             return jsonify({"inventory": []})
 
-        # Получаем полную информацию о предметах
-        items = Item.query.filter(Item.id.in_(user.inventory)).all()
-        inventory_items = [item.to_dict() for item in items]
+        # Полная информация о предметах - из кэша каталога, без запроса к БД
+        inventory_items, sprite_sheets = item_previews.with_previews(user.get_inventory_items())
         
         logger.info(f"[get_user_inventory] Найдено {len(inventory_items)} предметов для пользователя {user_id}")
         logger.debug(f"[get_user_inventory] Предметы: {inventory_items}")
 
         return jsonify({
             "inventory": inventory_items,
+            "sprite_sheets": sprite_sheets,
             "total_items": len(inventory_items)
         })
 
@@ -6,6 +6,7 @@ class InventoryManager {
     constructor() {
         this.currentCategory = 'all';
         this.items = [];
+        this.spriteSheets = [];
         this.loadingOverlay = document.getElementById('loadingOverlay');
         this.errorMessage = document.getElementById('errorMessage');
         this.itemsContainer = document.getElementById('inventoryItems');
@@ -87,6 +88,7 @@ class InventoryManager {
 
             const data = await response.json();
             this.items = data.items || [];
+            this.spriteSheets = data.sprite_sheets || [];
             this.filterItems();
         } catch (error) {
             console.error('Ошибка при загрузке инвентаря:', error);
@@ -120,7 +122,7 @@ class InventoryManager {
             itemElement.className = 'item';
             itemElement.innerHTML = `
                 <div class="item-image-container">
-                    <img src="/static/previews/items/${item.id}.png" alt="${item.name}" class="item-image">
+                    ${this.renderPreview(item)}
                 </div>
                 <div class="item-description">
                     <div class="item-checkbox"></div>
@@ -145,6 +147,20 @@ class InventoryManager {
         });
     }
 
+    // Миниатюра с общего спрайт-листа: весь инвентарь - один-два запроса картинок
+    renderPreview(item) {
+        const preview = item.preview;
+        const sheet = preview && this.spriteSheets[preview.sheet];
+        if (!sheet) {
+            const src = preview ? preview.thumb : `/static/previews/items/${item.id}.png`;
+            return `<img src="${src}" alt="${item.name}" class="item-image" loading="lazy">`;
+        }
+        const x = sheet.columns > 1 ? preview.column / (sheet.columns - 1) * 100 : 0;
+        const y = sheet.rows > 1 ? preview.row / (sheet.rows - 1) * 100 : 0;
+        return `<div class="item-image item-sprite" role="img" aria-label="${item.name}"
+                     style="background-image: url('${sheet.url}'); background-size: ${sheet.columns * 100}% ${sheet.rows * 100}%; background-position: ${x}% ${y}%;"></div>`;
+    }
+
     showItemDetails(item) {
         // Здесь можно добавить логику для отображения детальной информации о предмете
         console.log('Показать детали предмета:', item);
@@ -26,6 +26,23 @@ const CONSTANTS = {
     LONG_PRESS_DURATION: 2000
 };
 
+// Уровень детализации 3D-моделей для устройства (сервер выбирает копию, см. /models/...)
+function detectModelTier() {
+    const connection = navigator.connection || {};
+    const memory = navigator.deviceMemory;
+    if (connection.saveData || ['slow-2g', '2g'].includes(connection.effectiveType)) return 'low';
+    if (memory && memory <= 2) return 'low';
+    if (connection.effectiveType === '3g' || (memory && memory <= 4)) return 'medium';
+    return 'high';
+}
+
+const MODEL_TIER = detectModelTier();
+
+// /static/models/clothes/pants.glb -> /models/clothes/pants.glb?tier=low
+function modelUrl(path, tier) {
+    return `${path.replace('/static/models/', '/models/')}?tier=${tier}`;
+}
+
 // Базовый класс для работы с DOM
 class DOMUtils {
     static waitForElement(selector) {
@@ -324,16 +341,11 @@ class SceneManager {
                 environmentTexture: hdrTexture
             });
             
-            // Загружаем модель напрямую из Blender
-            const result = await BABYLON.SceneLoader.ImportMeshAsync(
-                "",
-                CONSTANTS.LIGHTED_STAGE_PATH.substring(0, CONSTANTS.LIGHTED_STAGE_PATH.lastIndexOf('/') + 1),
-                CONSTANTS.LIGHTED_STAGE_PATH.substring(CONSTANTS.LIGHTED_STAGE_PATH.lastIndexOf('/') + 1),
-                this.scene
-            );
-            
-            // Используем все как есть из Blender
-            this.lightedStage = result.meshes[0];
+            // Загружаем модель из Blender (сначала лёгкую копию)
+            await this.importProgressive(CONSTANTS.LIGHTED_STAGE_PATH, result => {
+                // Используем все как есть из Blender
+                this.lightedStage = result.meshes[0];
+            });
             
             // Загружаем одежду
             await this.loadClothes();
@@ -343,6 +355,28 @@ class SceneManager {
         }
     }
 
+    async importModel(path, tier) {
+        const url = modelUrl(path, tier);
+        const slash = url.lastIndexOf('/') + 1;
+        // Расширение указываем явно: в имени файла есть ?tier=
+        return BABYLON.SceneLoader.ImportMeshAsync("", url.substring(0, slash), url.substring(slash), this.scene, null, ".glb");
+    }
+
+    // Сначала показываем лёгкую копию модели, затем в фоне подменяем её копией под устройство
+    async importProgressive(path, attach) {
+        const preview = await this.importModel(path, 'low');
+        attach(preview);
+        if (MODEL_TIER !== 'low') {
+            this.importModel(path, MODEL_TIER)
+                .then(result => {
+                    attach(result);
+                    preview.meshes.forEach(mesh => mesh.dispose(false, true));
+                })
+                .catch(error => console.error(`Ошибка загрузки подробной модели ${path}:`, error));
+        }
+        return preview;
+    }
+
     async loadClothes() {
         this.clothingGroups = {
             shoes: new BABYLON.TransformNode("shoesGroup", this.scene),
@@ -370,25 +404,16 @@ class SceneManager {
 
         for (const item of clothesItems) {
             try {
-                const baseUrl = item.path.substring(0, item.path.lastIndexOf('/') + 1);
-                const fileName = item.path.substring(item.path.lastIndexOf('/') + 1);
-                
-                const result = await BABYLON.SceneLoader.ImportMeshAsync(
-                    "", 
-                    baseUrl, 
-                    fileName, 
-                    this.scene
-                );
-                
                 const clothingItem = new BABYLON.TransformNode(item.name, this.scene);
-                
-                // Базовая привязка к иерархии
-                result.meshes.forEach((mesh, index) => {
-                    if (index === 0) return;
-                    mesh.parent = clothingItem;
-                });
-                
                 clothingItem.parent = this.clothingGroups[item.group];
+
+                await this.importProgressive(item.path, result => {
+                    // Базовая привязка к иерархии
+                    result.meshes.forEach((mesh, index) => {
+                        if (index === 0) return;
+                        mesh.parent = clothingItem;
+                    });
+                });
                 
             } catch (error) {
                 console.error(`Ошибка загрузки элемента одежды ${item.name}:`, error);
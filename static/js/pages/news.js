@@ -16,6 +16,9 @@ const API_ENDPOINTS = {
     COMMENTS_NEWS: (id) => `/api/news/${id}/comments`
 };
 
+// Размер страницы ленты (keyset-пагинация на сервере)
+const NEWS_PAGE_SIZE = 20;
+
 // ----------------------------------------------------------------------------------
 // Утилиты
 // ----------------------------------------------------------------------------------
@@ -38,7 +41,8 @@ const DOMUtils = {
         });
     },
 
-    createMediaCollage(mediaUrls) {
+    // mediaSources - элементы newsItem.media с адаптивными вариантами (в том же порядке, что и mediaUrls)
+    createMediaCollage(mediaUrls, mediaSources = []) {
         const collageDiv = document.createElement("div");
         collageDiv.classList.add("collage");
 
@@ -62,6 +66,21 @@ const DOMUtils = {
             const imgElem = document.createElement("img");
             imgElem.src = fixedUrl;
             imgElem.alt = "News Image";
+            imgElem.loading = "lazy";
+            const source = mediaSources[index];
+            if (source?.srcset) {
+                // WebP поддерживают все WebView Telegram; AVIF - только если WebP не построен
+                const srcset = source.srcset.webp || source.srcset.avif;
+                if (srcset) {
+                    imgElem.srcset = srcset;
+                    imgElem.sizes = mediaUrls.length > 1 ? "50vw" : "100vw";
+                }
+            }
+            if (source?.lqip) {
+                // Размытое превью, пока грузится картинка
+                imgElem.style.backgroundImage = `url("${source.lqip}")`;
+                imgElem.style.backgroundSize = "cover";
+            }
             if (index >= 4) imgElem.style.display = "none";
             collageDiv.appendChild(imgElem);
         });
@@ -181,7 +200,7 @@ class NewsUI {
                     mediaUrls = [image_url];
                 }
             }
-            containerDiv.appendChild(DOMUtils.createMediaCollage(mediaUrls));
+            containerDiv.appendChild(DOMUtils.createMediaCollage(mediaUrls, newsItem.media));
         }
 
         const titleDiv = document.createElement("div");
@@ -360,6 +379,16 @@ class NewsPage {
         this.approvedSection = null;
         this.moderationSection = null;
         this.unapprovedNewsList = null;
+
+        // Состояние бесконечной прокрутки
+        this.approvedCursor = null;
+        this.approvedHasMore = true;
+        this.approvedLoading = false;
+        this.approvedSentinel = null;
+        this.approvedSentinelObserver = null;
+        this.unapprovedCursor = null;
+        this.unapprovedHasMore = true;
+        this.unapprovedLoading = false;
     }
 
     async init() {
@@ -418,25 +447,60 @@ class NewsPage {
     // Загрузка одобренных новостей
     // ==============================
     async fetchApprovedNews() {
-        let url = API_ENDPOINTS.APPROVED_NEWS;
-        if (this.newsState.userId) {
-            url += `?user_id=${this.newsState.userId}`;
-        }
+        this.approvedSection.innerHTML = "";
+        this.approvedCursor = null;
+        this.approvedHasMore = true;
+        this.setupApprovedSentinel();
+        await this.fetchMoreApprovedNews();
+    }
+
+    async fetchMoreApprovedNews() {
+        if (this.approvedLoading || !this.approvedHasMore) return;
+        this.approvedLoading = true;
+
+        const params = new URLSearchParams({ limit: NEWS_PAGE_SIZE });
+        if (this.newsState.userId) params.set("user_id", this.newsState.userId);
+        if (this.approvedCursor) params.set("cursor", this.approvedCursor);
 
         try {
-            const response = await fetch(url);
+            const response = await fetch(`${API_ENDPOINTS.APPROVED_NEWS}?${params}`);
             if (!response.ok) {
                 throw new Error(`Ошибка сервера: ${response.status}`);
             }
-            const newsList = await response.json();
-            this.renderApprovedNews(newsList);
+            const page = await response.json();
+            this.renderApprovedNews(page.items);
+            this.approvedCursor = page.next_cursor;
+            this.approvedHasMore = Boolean(page.next_cursor);
         } catch (error) {
             console.error("[news.js] Ошибка загрузки одобренных новостей:", error);
+        } finally {
+            this.approvedLoading = false;
+        }
+
+        // Держим "датчик" конца ленты последним элементом секции
+        if (this.approvedHasMore) {
+            this.approvedSection.appendChild(this.approvedSentinel);
+        } else {
+            this.approvedSentinel.remove();
         }
     }
 
+    // Невидимый элемент в конце ленты: когда он показывается, подгружаем следующую страницу
+    setupApprovedSentinel() {
+        if (this.approvedSentinelObserver) {
+            this.approvedSentinelObserver.disconnect();
+        }
+        this.approvedSentinel = document.createElement("div");
+        this.approvedSentinel.classList.add("news-feed-sentinel");
+        this.approvedSentinelObserver = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                this.fetchMoreApprovedNews();
+            }
+        }, { rootMargin: "600px 0px" });
+        this.approvedSentinelObserver.observe(this.approvedSentinel);
+    }
+
     renderApprovedNews(newsList) {
-        this.approvedSection.innerHTML = "";
         newsList.forEach(newsItem => {
             const card = this.newsUI.createNewsCard(newsItem, { showModerationButtons: false });
             this.approvedSection.appendChild(card);
@@ -467,20 +531,51 @@ class NewsPage {
     // Загрузка НЕодобренных новостей (модерация)
     // ==============================
     async fetchUnapprovedNews() {
+        this.unapprovedNewsList.innerHTML = "";
+        this.unapprovedCursor = null;
+        this.unapprovedHasMore = true;
+        await this.fetchMoreUnapprovedNews();
+    }
+
+    async fetchMoreUnapprovedNews() {
+        if (this.unapprovedLoading || !this.unapprovedHasMore) return;
+        this.unapprovedLoading = true;
+
+        const params = new URLSearchParams({ limit: NEWS_PAGE_SIZE });
+        if (this.unapprovedCursor) params.set("cursor", this.unapprovedCursor);
+
         try {
-            const response = await fetch(API_ENDPOINTS.UNAPPROVED_NEWS);
+            const response = await fetch(`${API_ENDPOINTS.UNAPPROVED_NEWS}?${params}`);
             if (!response.ok) {
                 throw new Error(`Ошибка сервера: ${response.status}`);
             }
-            const newsList = await response.json();
-            this.renderUnapprovedNews(newsList);
+            const page = await response.json();
+            this.renderUnapprovedNews(page.items);
+            this.unapprovedCursor = page.next_cursor;
+            this.unapprovedHasMore = Boolean(page.next_cursor);
         } catch (error) {
             console.error("[news.js] Ошибка загрузки новостей на модерации:", error);
+        } finally {
+            this.unapprovedLoading = false;
+        }
+
+        if (this.unapprovedHasMore) {
+            this.renderLoadMoreButton();
         }
     }
 
+    renderLoadMoreButton() {
+        const button = document.createElement("button");
+        button.classList.add("load-more-button");
+        button.textContent = "Загрузить ещё";
+        button.addEventListener("click", () => {
+            button.remove();
+            this.fetchMoreUnapprovedNews();
+        });
+        this.unapprovedNewsList.appendChild(button);
+    }
+
     renderUnapprovedNews(newsList) {
-        this.unapprovedNewsList.innerHTML = "";
         newsList.forEach(newsItem => {
             const card = this.newsUI.createNewsCard(newsItem, { showModerationButtons: true });
             this.unapprovedNewsList.appendChild(card);
@@ -513,7 +608,7 @@ class NewsPage {
                     mediaUrls = [newsItem.image_url];
                 }
             }
-            cardContainer.appendChild(DOMUtils.createMediaCollage(mediaUrls));
+            cardContainer.appendChild(DOMUtils.createMediaCollage(mediaUrls, newsItem.media));
         }
 
         const titleDiv = document.createElement("div");
@@ -0,0 +1,82 @@
+// Токен сессии Mini App: initData проверяется сервером один раз (/api/auth/session),
+// дальше запросы к API идут с заголовком Authorization: Bearer <токен>
+(function () {
+    const SESSION_URL = '/api/auth/session';
+    // Статика и шаблоны не требуют авторизации - не ждём токен
+    const PUBLIC_PREFIXES = ['/static/', '/assets/', '/templates/', '/spa/', '/models/', SESSION_URL];
+    const nativeFetch = window.fetch.bind(window);
+
+    let session = null;  // Promise<{token, expiresAt} | null>
+
+    function initData() {
+        return (window.Telegram && window.Telegram.WebApp && window.Telegram.WebApp.initData) || '';
+    }
+
+    function requestSession() {
+        const data = initData();
+        if (!data) {
+            // Открыто не из Telegram - запросы идут по-старому, с user_id
+            return Promise.resolve(null);
+        }
+        return nativeFetch(SESSION_URL, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ initData: data })
+        })
+            .then(response => response.ok ? response.json() : null)
+            .then(result => result && {
+                token: result.token,
+                // Обновляем заранее, чтобы не ловить 401 на истечении
+                expiresAt: Date.now() + result.expires_in * 1000 * 0.9
+            })
+            .catch(error => {
+                console.error('[Session] Не удалось получить токен сессии:', error);
+                return null;
+            });
+    }
+
+    function getSession(refresh) {
+        if (!session || refresh) {
+            session = requestSession();
+        }
+        return session.then(current => {
+            if (current && current.expiresAt < Date.now()) {
+                session = requestSession();
+                return session;
+            }
+            return current;
+        });
+    }
+
+    function needsToken(input) {
+        const url = new URL(typeof input === 'string' ? input : input.url, window.location.href);
+        return url.origin === window.location.origin
+            && !PUBLIC_PREFIXES.some(prefix => url.pathname.startsWith(prefix));
+    }
+
+    async function withToken(input, init, refresh) {
+        const current = await getSession(refresh);
+        if (!current) {
+            return nativeFetch(input, init);
+        }
+        const headers = new Headers((init && init.headers) || (input instanceof Request ? input.headers : undefined));
+        headers.set('Authorization', `Bearer ${current.token}`);
+        return nativeFetch(input, { ...init, headers });
+    }
+
+    window.fetch = async function (input, init) {
+        if (!needsToken(input)) {
+            return nativeFetch(input, init);
+        }
+        const response = await withToken(input, init, false);
+        // Токен отклонён (просрочен, сменился ключ) - один повтор с новым токеном.
+        // Request одноразовый, поэтому повторяем только запросы по строковому URL
+        if (response.status === 401 && typeof input === 'string' && initData()) {
+            return withToken(input, init, true);
+        }
+        return response;
+    };
+
+    window.AppSession = { getSession };
+    getSession(false);
+})();
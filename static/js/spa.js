@@ -75,9 +75,30 @@ class DeviceDetector {
     }
 }
 
+// Все экраны одним ответом (/spa/templates.json), запрашивается один раз за сессию
+const TEMPLATE_BUNDLE_URL = '/spa/templates.json';
+let templateBundle = null;
+
 // Класс для управления шаблонами
 class TemplateManager {
+    static loadBundle() {
+        if (!templateBundle) {
+            templateBundle = fetch(TEMPLATE_BUNDLE_URL)
+                .then(response => response.ok ? response.json() : null)
+                .then(data => (data && data.templates) || null)
+                .catch(error => {
+                    console.warn('[TemplateManager] Пакет шаблонов недоступен, загружаем по одному:', error);
+                    return null;
+                });
+        }
+        return templateBundle;
+    }
+
     static async loadTemplate(templateName) {
+        const templates = await this.loadBundle();
+        if (templates && templateName in templates) {
+            return templates[templateName];
+        }
         console.log(`[TemplateManager] Загружаем шаблон: ${templateName}.html`);
         try {
             const response = await fetch(`/templates/${templateName}.html`);
@@ -0,0 +1,10 @@
+# wsgi.py
+"""
+Точка входа WSGI для боевых серверов:
+    gunicorn -c gunicorn.conf.py wsgi:app        (Linux)
+    python main.py web                            (выбирает сервер сам, в том числе на Windows)
+"""
+from app_factory import configure_logging, create_app
+
+configure_logging()
+app = create_app()